@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Benchmark storing edits to a large file, whole and in chunks.
+
+Stores a large random file, then a copy with one byte changed and a copy
+with data appended, and reports the time taken and the bytes added to the
+database by each, with chunking off and on.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from config import Config  # noqa: E402
+from database.database import Database  # noqa: E402
+
+
+def database_size(path: Path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def measure(label: str, database: Database, data: bytes) -> None:
+    before = database_size(database.pathname)
+    start = time.perf_counter()
+    database.store_stream(io.BytesIO(data), len(data))
+    elapsed = time.perf_counter() - start
+    added = database_size(database.pathname) - before
+    print(f"{label:>22}: {elapsed * 1000:9.1f} ms {added / (1 << 20):9.2f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=256 << 20)
+    args = parser.parse_args()
+
+    original = os.urandom(args.size)
+    edited = bytearray(original)
+    edited[args.size // 2] ^= 0xFF
+    appended = original + os.urandom(1 << 16)
+
+    for mode, threshold in (("whole", None), ("chunked", "1m")):
+        with tempfile.TemporaryDirectory() as tmp:
+            # The threshold is a setting of the repository the objects are in
+            objects = Path(tmp).joinpath("objects")
+            objects.mkdir()
+            if threshold:
+                config = Config(Path(tmp).joinpath("config"))
+                config.load()
+                config.set(*Database.CHUNK_THRESHOLD_SETTING, threshold)
+            database = Database(objects)
+            measure(f"{mode}, first", database, original)
+            measure(f"{mode}, one byte", database, bytes(edited))
+            measure(f"{mode}, append", database, appended)
+
+
+if __name__ == "__main__":
+    main()
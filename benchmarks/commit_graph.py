@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark history walks with and without the commit-graph.
+
+Creates a repository with a long line of commits, then times counting them
+with `pyg rev-list --count` and listing them with `pyg log --oneline`, first
+reading every commit object and then through the commit-graph.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+PYG_DIR = Path(__file__).resolve().parents[1].joinpath("pyg")
+sys.path.insert(0, str(PYG_DIR))
+
+from database.author import Author  # noqa: E402
+from database.commit import Commit  # noqa: E402
+from database.database import Database  # noqa: E402
+from graph.graph import GRAPHS_DIR  # noqa: E402
+from graph.writer import Writer  # noqa: E402
+from refs import Refs  # noqa: E402
+
+
+def measure(label: str, root: Path, args: List[str], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(PYG_DIR.joinpath("main.py")), *args],
+            cwd=root,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>32}: {best * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        git_path = root.joinpath(".git")
+        database = Database(git_path.joinpath("objects"))
+        git_path.joinpath("objects").mkdir(parents=True)
+
+        # Every commit points at the empty tree; only the history matters
+        tree = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+        parent = None
+        start = int(time.time()) - args.commits
+        for i in range(args.commits):
+            author = Author("A U Thor", "author@example.com", time.gmtime(start + i))
+            commit = Commit(parent, tree, author, f"commit {i}\n")
+            database.store(commit)
+            parent = commit.oid
+        Refs(git_path).update_head(parent)
+        print(f"history: {args.commits} commits")
+
+        for label, command in (
+            ("rev-list --count", ["rev-list", "--count"]),
+            ("log --oneline", ["log", "--oneline"]),
+        ):
+            measure(f"{label}, objects", root, command, 1)
+
+        Writer(database).write([parent])
+        graphs_dir = Path(database.pathname).joinpath(*GRAPHS_DIR)
+        size = sum(path.stat().st_size for path in graphs_dir.iterdir())
+        print(f"commit-graph: {size} bytes")
+
+        for label, command in (
+            ("rev-list --count", ["rev-list", "--count"]),
+            ("log --oneline", ["log", "--oneline"]),
+        ):
+            measure(f"{label}, commit-graph", root, command, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Compare two reports of the benchmark suite.
+
+Prints each scenario's wall time, CPU time and peak RSS in the baseline
+report and the other one, with the ratio of the second to the first, so a
+ratio above 1 is a regression.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = (("wall_ms", "ms"), ("cpu_ms", "ms"), ("max_rss_kb", "KiB"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("other", type=Path)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    other = json.loads(args.other.read_text())
+    if baseline["shape"] != other["shape"]:
+        print("warning: the reports were made on workspaces of different shapes")
+
+    for name, before in baseline["scenarios"].items():
+        after = other["scenarios"].get(name)
+        if after is None:
+            continue
+        for metric, unit in METRICS:
+            ratio = after[metric] / before[metric] if before[metric] else 0.0
+            print(
+                f"{name:>14} {metric:>10}: {before[metric]:10.1f} {unit:>3}"
+                f" -> {after[metric]:10.1f} {unit:>3} {ratio:6.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
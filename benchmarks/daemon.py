@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Benchmark the latency of no-op commands with and without the pyg daemon.
+
+Creates a repository with many files and adds and commits them all, then
+times `pyg add .` and `pyg status` with nothing changed, reporting the median
+and 90th percentile of `--repeat` runs: first with every command loading the
+repository itself, then through the daemon, and then through the daemon with
+the fsmonitor daemon running as well, which spares the walk of the workspace.
+The time to start an interpreter that does nothing is given for comparison,
+as every client pays it.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+PYG = Path(__file__).resolve().parents[1].joinpath("pyg", "main.py")
+
+ENVIRONMENT = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "A U Thor",
+    "GIT_AUTHOR_EMAIL": "author@example.com",
+}
+
+
+def pyg(root: Path, *args: str, stdin: bytes = b"") -> None:
+    subprocess.run(
+        [sys.executable, str(PYG), *args],
+        cwd=root,
+        env=ENVIRONMENT,
+        input=stdin,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def measure(label: str, root: Path, args: List[str], repeat: int) -> None:
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=root, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    p50 = statistics.median(times) * 1000
+    p90 = statistics.quantiles(times, n=10)[-1] * 1000
+    print(f"{label:>28}: p50 {p50:7.1f} ms   p90 {p90:7.1f} ms")
+
+
+def measure_commands(label: str, root: Path, repeat: int) -> None:
+    for command in ("add", "status"):
+        args = [sys.executable, str(PYG), command] + (["."] if command == "add" else [])
+        measure(f"{label} {command}", root, args, repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--fanout", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        pyg(root, "init", str(root))
+        for i in range(args.files):
+            directory = root.joinpath(
+                f"d{i % args.fanout}", f"e{i // args.fanout % 20}"
+            )
+            directory.mkdir(parents=True, exist_ok=True)
+            directory.joinpath(f"f{i}").write_text(f"{i}\n")
+
+        # Age the workspace, so that every entry and listing is trusted
+        old = time.time() - 3600
+        for directory, _, files in os.walk(root):
+            for name in files:
+                os.utime(os.path.join(directory, name), (old, old))
+            os.utime(directory, (old, old))
+        pyg(root, "add", ".")
+        pyg(root, "commit", stdin=b"Add files\n")
+        pyg(root, "add", ".")
+        print(f"workspace: {args.files} files")
+
+        measure("interpreter", root, [sys.executable, "-c", "pass"], args.repeat)
+        measure_commands("no daemon", root, args.repeat)
+
+        pyg(root, "daemon", "start")
+        try:
+            measure_commands("daemon", root, args.repeat)
+            pyg(root, "fsmonitor", "start")
+            try:
+                pyg(root, "add", ".")
+                measure_commands("daemon and fsmonitor", root, args.repeat)
+            finally:
+                pyg(root, "fsmonitor", "stop")
+        finally:
+            pyg(root, "daemon", "stop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark delta compression in packfiles on a synthetic history.
+
+Generates a few files that change by a handful of lines per revision, stores
+every revision in a scratch object database, and packs it with and without
+deltas, reporting the compression ratio and throughput of each.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from database.blob import Blob  # noqa: E402
+from database.database import Database  # noqa: E402
+from database.tree_writer import TreeWriter  # noqa: E402
+from pack.writer import Writer  # noqa: E402
+
+
+def generate_history(
+    database: Database, files: int, lines: int, revisions: int, changes: int
+) -> int:
+    """Store every revision of every file, returning the total bytes stored."""
+    rng = random.Random(0)
+    contents = [
+        [f"setting_{f}_{i} = {rng.random()}\n" for i in range(lines)]
+        for f in range(files)
+    ]
+
+    total = 0
+    for _ in range(revisions):
+        blobs = {}
+        for f, content in enumerate(contents):
+            for _ in range(changes):
+                content[rng.randrange(lines)] = f"changed = {rng.random()}\n"
+            blob = Blob("".join(content).encode("utf-8"))
+            database.store(blob)
+            total += len(blob.data)
+            blobs[f"file{f}.conf"] = str(blob.oid)
+
+        # Entries go into each tree in order, as CacheTree adds them
+        writer = TreeWriter(database.store)
+        writer.enter("config")
+        for name in sorted(blobs):
+            writer.add(name, blobs[name], "100644")
+        writer.leave()
+        writer.leave()
+    return total
+
+
+def run(database: Database, window: int, depth: int) -> tuple:
+    """Pack every loose object, returning (pack size, seconds)."""
+    oids = list(database.list_objects())
+    start = time.perf_counter()
+    pack_path = Writer(database, window, depth).write(oids)
+    elapsed = time.perf_counter() - start
+    size = pack_path.stat().st_size
+    pack_path.with_suffix(".idx").unlink()
+    pack_path.unlink()
+    return size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--revisions", type=int, default=50)
+    parser.add_argument("--changes", type=int, default=5, help="lines per revision")
+    parser.add_argument("--window", type=int, default=Writer.DEFAULT_WINDOW)
+    parser.add_argument("--depth", type=int, default=Writer.DEFAULT_DEPTH)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(Path(tmp))
+        total = generate_history(
+            database, args.files, args.lines, args.revisions, args.changes
+        )
+        print(f"history: {total / 1e6:.1f} MB of blobs")
+
+        for label, window in (("no deltas", 0), ("deltas", args.window)):
+            size, elapsed = run(database, window, args.depth)
+            print(
+                f"{label:>10}: {size / 1e6:8.2f} MB pack, "
+                f"ratio {total / size:6.1f}x, "
+                f"{total / 1e6 / elapsed:7.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
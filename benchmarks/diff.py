@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark diffing large, mostly identical files.
+
+Generates a file of source-like lines, with repeated braces and blank lines
+among unique signatures and statements, and a copy with a few scattered
+edits, then times each algorithm producing the unified diff between them.
+With --git, the same diff from `git diff --no-index` is timed alongside and
+the hunks compared.
+"""
+
+import argparse
+import io
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from diff.diff import Diff  # noqa: E402
+from diff.writer import Side, UnifiedWriter  # noqa: E402
+
+GIT_FLAGS = {Diff.MYERS: "--diff-algorithm=myers", Diff.HISTOGRAM: "--histogram"}
+
+
+def source(lines: int, rng: random.Random) -> List[bytes]:
+    out: List[bytes] = []
+    function = 0
+    while len(out) < lines:
+        out.append(b"def function_%d(value):\n" % function)
+        for statement in range(rng.randint(2, 12)):
+            out.append(b"    value = value + %d\n" % rng.randrange(1000))
+            if rng.random() < 0.2:
+                out.append(b"    if value:\n        return None\n")
+        out.append(b"    return value\n")
+        out.append(b"\n")
+        function += 1
+    return out[:lines]
+
+
+def edit(lines: List[bytes], edits: int, rng: random.Random) -> List[bytes]:
+    lines = list(lines)
+    for n in range(edits):
+        i = rng.randrange(len(lines))
+        kind = rng.random()
+        if kind < 0.4:
+            lines[i:i] = [b"    added_%d = True\n" % n, b"\n"]
+        elif kind < 0.7:
+            del lines[i : i + rng.randint(1, 5)]
+        else:
+            lines[i] = b"    value = changed_%d\n" % n
+    return lines
+
+
+def patch(old: bytes, new: bytes, algorithm: str) -> bytes:
+    out = io.BytesIO()
+    UnifiedWriter(out, algorithm).write(
+        "file", Side("1" * 40, "100644", old), Side("2" * 40, "100644", new)
+    )
+    return out.getvalue()
+
+
+def hunks(patch: bytes) -> List[bytes]:
+    return patch[patch.index(b"@@") :].splitlines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--git", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lines = source(args.lines, rng)
+    old = b"".join(lines)
+    new = b"".join(edit(lines, args.edits, rng))
+    print(f"file: {args.lines} lines, {len(old) / 1e6:.1f} MB, {args.edits} edits")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, "old").write_bytes(old)
+        Path(tmp, "new").write_bytes(new)
+        for algorithm in (Diff.MYERS, Diff.HISTOGRAM):
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                ours = patch(old, new, algorithm)
+                times.append(time.perf_counter() - start)
+            line = f"{algorithm:>10}: {min(times) * 1000:9.1f} ms"
+
+            if args.git:
+                start = time.perf_counter()
+                theirs = subprocess.run(
+                    ["git", "diff", "--no-index", GIT_FLAGS[algorithm], "old", "new"],
+                    cwd=tmp,
+                    capture_output=True,
+                ).stdout
+                elapsed = time.perf_counter() - start
+                same = "same" if hunks(ours) == hunks(theirs) else "DIFFERENT"
+                line += f"   git {elapsed * 1000:9.1f} ms   hunks {same}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Benchmark add with and without the fsmonitor daemon.
+
+Creates a repository with many files and adds them all, then changes one file
+and times `pyg add .`, first with a full walk of the workspace and then with
+the daemon reporting what changed.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PYG = Path(__file__).resolve().parents[1].joinpath("pyg", "main.py")
+
+
+def pyg(root: Path, *args: str) -> None:
+    subprocess.run(
+        [sys.executable, str(PYG), *args],
+        cwd=root,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def measure(label: str, root: Path, change: Path, repeat: int) -> None:
+    best = float("inf")
+    for i in range(repeat):
+        change.write_text(f"{label} {i}\n")
+        start = time.perf_counter()
+        pyg(root, "add", ".")
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>22}: {best * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=50_000)
+    parser.add_argument("--fanout", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        pyg(root, "init", str(root))
+        for i in range(args.files):
+            directory = root.joinpath(
+                f"d{i % args.fanout}", f"e{i // args.fanout % 20}"
+            )
+            directory.mkdir(parents=True, exist_ok=True)
+            directory.joinpath(f"f{i}").write_text(f"{i}\n")
+        print(f"workspace: {args.files} files")
+
+        # Age the workspace, so that the untracked cache holds every listing
+        old = time.time() - 3600
+        for directory, _, files in os.walk(root):
+            for name in files:
+                os.utime(os.path.join(directory, name), (old, old))
+            os.utime(directory, (old, old))
+        pyg(root, "add", ".")
+
+        change = root.joinpath("d0", "e0", "f0")
+        measure("full walk", root, change, args.repeat)
+
+        pyg(root, "fsmonitor", "start")
+        try:
+            pyg(root, "add", ".")
+            measure("fsmonitor", root, change, args.repeat)
+        finally:
+            pyg(root, "fsmonitor", "stop")
+
+
+if __name__ == "__main__":
+    main()
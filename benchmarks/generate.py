@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Generate a synthetic workspace of a given shape.
+
+Files are spread evenly over a tree of directories `--depth` levels deep with
+`--fanout` subdirectories each, with sizes drawn from a log-uniform
+distribution between `--min-size` and `--max-size`, and a `--binary` fraction
+of them filled with random bytes instead of lines of text. Everything is
+drawn from a generator seeded with `--seed`, so the same arguments always
+give the same files, byte for byte.
+"""
+
+import argparse
+import math
+import random
+from pathlib import Path
+from typing import List, NamedTuple
+
+WORDS = (
+    "def class return import from self None True False if else for in while "
+    "with as try except raise pass yield lambda and or not is path data index "
+    "tree blob commit oid entry stat mode size name value result"
+).split()
+
+
+class Shape(NamedTuple):
+    files: int = 10_000
+    depth: int = 3
+    fanout: int = 10
+    min_size: int = 100
+    max_size: int = 64 << 10
+    binary: float = 0.1
+    seed: int = 0
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        for name, default in cls._field_defaults.items():
+            parser.add_argument(
+                "--" + name.replace("_", "-"), type=type(default), default=default
+            )
+
+    @classmethod
+    def from_arguments(cls, args: argparse.Namespace) -> "Shape":
+        return cls(**{name: getattr(args, name) for name in cls._fields})
+
+
+class Generator:
+    """Writes and changes the files of a workspace of a given shape."""
+
+    def __init__(self, root: Path, shape: Shape) -> None:
+        self.root: Path = root
+        self.shape: Shape = shape
+
+    def paths(self) -> List[Path]:
+        """Return the path of every file, spread evenly over the directories."""
+        shape: Shape = self.shape
+        leaves: int = shape.fanout**shape.depth
+        paths: List[Path] = []
+        for i in range(shape.files):
+            leaf: int = i % leaves
+            parts: List[str] = []
+            for _ in range(shape.depth):
+                leaf, digit = divmod(leaf, shape.fanout)
+                parts.append(f"d{digit}")
+            paths.append(self.root.joinpath(*parts, f"f{i}"))
+        return paths
+
+    def contents(self, rng: random.Random) -> bytes:
+        """Draw the contents of one file."""
+        low: float = math.log(max(self.shape.min_size, 1))
+        high: float = math.log(max(self.shape.max_size, self.shape.min_size, 1))
+        size: int = int(math.exp(rng.uniform(low, high)))
+        if rng.random() < self.shape.binary:
+            return rng.randbytes(size)
+
+        lines: List[str] = []
+        length: int = 0
+        while length < size:
+            line: str = " ".join(rng.choices(WORDS, k=rng.randint(1, 12))) + "\n"
+            lines.append(line)
+            length += len(line)
+        return "".join(lines).encode("ascii")[:size]
+
+    def generate(self) -> List[Path]:
+        """Write every file of the workspace and return their paths."""
+        rng: random.Random = random.Random(self.shape.seed)
+        paths: List[Path] = self.paths()
+        for path in paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(self.contents(rng))
+        return paths
+
+    def change(self, percent: float, revision: int = 1) -> List[Path]:
+        """
+        Rewrite a percentage of the files, at least one, and return their
+        paths. Each revision picks and rewrites a different set of files.
+        """
+        rng: random.Random = random.Random(f"{self.shape.seed}:{revision}")
+        paths: List[Path] = self.paths()
+        count: int = max(1, min(len(paths), round(len(paths) * percent / 100)))
+        changed: List[Path] = rng.sample(paths, count)
+        for path in changed:
+            path.write_bytes(self.contents(rng))
+        return changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root", type=Path)
+    Shape.add_arguments(parser)
+    args = parser.parse_args()
+
+    shape = Shape.from_arguments(args)
+    paths = Generator(args.root, shape).generate()
+    size = sum(path.stat().st_size for path in paths)
+    print(f"workspace: {len(paths)} files, {size / (1 << 20):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Benchmark loading the index.
+
+Writes a synthetic index with many entries and times the previous loader,
+which read through Checksum a few bytes at a time and parsed every entry
+with a BytesIO, against Index.load, both on its own and followed by a walk
+that parses every entry.
+"""
+
+import argparse
+import struct
+import sys
+import tempfile
+import time
+from hashlib import sha1
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from index.entry import ENTRY_BLOCK, ENTRY_FORMAT, ENTRY_MIN_SIZE, Entry  # noqa: E402
+from index.index import Index  # noqa: E402
+
+
+def legacy_load(path: Path) -> dict:
+    """The loader Index used before reading the file in one go."""
+    entries = {}
+    with open(path, "rb") as f:
+        digest = sha1()
+
+        def read(size: int) -> bytes:
+            data = f.read(size)
+            digest.update(data)
+            return data
+
+        _, _, count = struct.unpack(">4s2I", read(12))
+        for _ in range(count):
+            binary = read(ENTRY_MIN_SIZE)
+            while binary[-1] != 0:
+                binary = binary + read(ENTRY_BLOCK)
+
+            with BytesIO(binary) as bio:
+                fields = struct.unpack(ENTRY_FORMAT, bio.read(62))
+                name = b"".join(iter(lambda: bio.read(1), b"\0")).decode("utf-8")
+            entries[Path(name)] = (fields, fields[10].hex())
+
+        if f.read(20) != digest.digest():
+            raise Exception("Checksum does not match value stored on disk")
+    return entries
+
+
+def generate_index(path: Path, count: int) -> None:
+    """Write an index of count entries spread over a few directory levels."""
+    index = Index(path)
+    for i in range(count):
+        pathname = Path(f"dir{i % 97}/sub{i % 13}/file{i}.txt")
+        oid = sha1(str(i).encode()).hexdigest()
+        index.store_entry(
+            Entry(
+                pathname, oid, 0o100644, len(str(pathname)), 0, 0, 0, 0, 0, i, 0, 0, i
+            )
+        )
+    index.write_updates()
+
+
+def measure(label: str, fn, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>24}: {best * 1000:9.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp).joinpath("index")
+        generate_index(path, args.entries)
+        print(f"index: {args.entries} entries, {path.stat().st_size / 1e6:.1f} MB")
+
+        def load() -> Index:
+            index = Index(path)
+            index.load()
+            return index
+
+        def load_and_walk() -> None:
+            for _ in load().each_entry():
+                pass
+
+        measure("legacy loader", lambda: legacy_load(path), args.repeat)
+        measure("Index.load", load, args.repeat)
+        measure("Index.load + each_entry", load_and_walk, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Benchmark the memory held by a loaded index.
+
+Writes a synthetic index with many entries and measures, with tracemalloc,
+the memory held once it is loaded into the previous layout, a dict of Entry
+named tuples keyed by Path, against the compact columns of Index.load.
+"""
+
+import argparse
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from index.entry import Entry  # noqa: E402
+from index.index import Index  # noqa: E402
+from index_load import generate_index  # noqa: E402
+
+
+def legacy_load(path: Path) -> dict:
+    """Load every entry as a named tuple keyed by Path, as Index used to."""
+    data = path.read_bytes()
+    entries = {}
+    offset = Index.HEADER_SIZE
+    for _ in range(Index(path).read_header(bytearray(data))):
+        entry = Entry.parse(data, offset)
+        entries[entry.pathname] = entry
+        offset += len(bytes(entry))
+    return entries
+
+
+def measure(label: str, fn: Callable[[], object]) -> int:
+    """Return the bytes still allocated by fn's result after it returns."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{label:>14}: {size / 1e6:8.1f} MB")
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp).joinpath("index")
+        generate_index(path, args.entries)
+        print(f"index: {args.entries} entries, {path.stat().st_size / 1e6:.1f} MB")
+
+        def load() -> Index:
+            index = Index(path)
+            index.load()
+            return index
+
+        legacy = measure("legacy layout", lambda: legacy_load(path))
+        columns = measure("Index.load", load)
+        print(f"{'ratio':>14}: {legacy / columns:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Benchmark status on a workspace of unchanged files.
+
+Creates a repository with many files and adds them all, then times
+`pyg status` on a clean workspace: first right after the add, then after
+touching every file, which makes the first run hash them all and the runs
+after it reuse the refreshed index, and finally with the fsmonitor daemon
+reporting that nothing changed.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PYG = Path(__file__).resolve().parents[1].joinpath("pyg", "main.py")
+
+
+def pyg(root: Path, *args: str) -> None:
+    subprocess.run(
+        [sys.executable, str(PYG), *args],
+        cwd=root,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def measure(label: str, root: Path, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pyg(root, "status")
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>22}: {best * 1000:9.1f} ms")
+
+
+def age(root: Path, seconds: float) -> None:
+    """Move the mtime of every file and directory into the past."""
+    old = time.time() - seconds
+    for directory, dirs, files in os.walk(root):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for name in files:
+            os.utime(os.path.join(directory, name), (old, old))
+        os.utime(directory, (old, old))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--fanout", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        pyg(root, "init", str(root))
+        for i in range(args.files):
+            directory = root.joinpath(
+                f"d{i % args.fanout}", f"e{i // args.fanout % 20}"
+            )
+            directory.mkdir(parents=True, exist_ok=True)
+            directory.joinpath(f"f{i}").write_text(f"{i}\n")
+        print(f"workspace: {args.files} files")
+
+        age(root, 3600)
+        pyg(root, "add", ".")
+        measure("unchanged", root, args.repeat)
+
+        # Touching every file leaves its contents but not its stat as it was
+        age(root, 1800)
+        measure("touched, first run", root, 1)
+        measure("touched, refreshed", root, args.repeat)
+
+        pyg(root, "fsmonitor", "start")
+        try:
+            pyg(root, "status")
+            measure("fsmonitor", root, args.repeat)
+        finally:
+            pyg(root, "fsmonitor", "stop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Run the benchmark suite against a checkout of pyg and report it as JSON.
+
+Generates a workspace with generate.py, then runs each scenario in it:
+
+    cold-add        `pyg add .` into a new repository
+    noop-add        `pyg add .` again with nothing changed
+    commit-one      `pyg add .` and `pyg commit` after changing one file
+    commit-changed  the same after changing `--changed` percent of the files
+    index-load      Index.load on the index of the workspace
+    checkout-back   `pyg checkout` of the commit before commit-changed
+
+Commands run as child processes, and each scenario reports the best of
+`--repeat` runs: its wall time, the CPU time and peak RSS of its processes as
+given by wait4, and the objects written per second; for index-load, whose
+times are taken around the load alone, the index entries read per second;
+and for checkout-back, the files it wrote.
+
+Running the suite on two checkouts with `--pyg` and the same arguments, and
+passing both reports to compare.py, shows what changed between them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from generate import Generator, Shape
+
+# Loads the index named by the first argument in a checkout's pyg directory,
+# named by the second, and prints the time taken and the entries read
+INDEX_LOAD = """
+import struct, sys, time
+from pathlib import Path
+sys.path.insert(0, sys.argv[2])
+from index.index import Index
+start, cpu = time.perf_counter(), time.process_time()
+Index(Path(sys.argv[1])).load()
+wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+with open(sys.argv[1], "rb") as f:
+    entries = struct.unpack(">I", f.read(12)[8:])[0]
+print(wall, cpu, entries)
+"""
+
+# The wall time, CPU time, peak RSS in KiB and objects or entries of a run
+Result = Dict[str, float]
+
+
+class Runner:
+    """Runs commands in a workspace, adding up what they cost."""
+
+    ENVIRONMENT = {
+        "GIT_AUTHOR_NAME": "A U Thor",
+        "GIT_AUTHOR_EMAIL": "author@example.com",
+    }
+
+    def __init__(self, checkout: Path, root: Path) -> None:
+        self.pyg_dir: Path = checkout.joinpath("pyg")
+        self.root: Path = root
+        self.environment: Dict[str, str] = {**os.environ, **self.ENVIRONMENT}
+
+    def run(self, args: List[str], stdin: bytes = b"") -> Tuple[str, float, int]:
+        """Run a command to completion, returning its output, CPU time and RSS."""
+        with tempfile.TemporaryFile() as output:
+            process = subprocess.Popen(
+                args,
+                cwd=self.root,
+                env=self.environment,
+                stdin=subprocess.PIPE,
+                stdout=output,
+            )
+            process.stdin.write(stdin)
+            process.stdin.close()
+
+            # wait4 gives the usage of this child alone, where getrusage would
+            # give the total of every child waited for so far
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, args)
+
+            output.seek(0)
+            cpu: float = usage.ru_utime + usage.ru_stime
+            return output.read().decode(), cpu, usage.ru_maxrss
+
+    def pyg(self, *commands: Tuple[str, ...]) -> Result:
+        """Run pyg commands one after the other, measuring them as a whole."""
+        before: int = self.count_objects()
+        cpu: float = 0.0
+        rss: int = 0
+        start: float = time.perf_counter()
+        for command in commands:
+            stdin: bytes = b"benchmark\n" if command[0] == "commit" else b""
+            _, used, peak = self.run(
+                [sys.executable, str(self.pyg_dir.joinpath("main.py")), *command],
+                stdin,
+            )
+            cpu += used
+            rss = max(rss, peak)
+        wall: float = time.perf_counter() - start
+        return self.result(wall, cpu, rss, self.count_objects() - before)
+
+    def index_load(self) -> Result:
+        index: Path = self.root.joinpath(".git", "index")
+        output, _, rss = self.run(
+            [sys.executable, "-c", INDEX_LOAD, str(index), str(self.pyg_dir)]
+        )
+        wall, cpu, entries = output.split()
+        return self.result(float(wall), float(cpu), rss, int(entries))
+
+    def count_objects(self) -> int:
+        """Count the loose objects in the repository."""
+        objects: Path = self.root.joinpath(".git", "objects")
+        if not objects.exists():
+            return 0
+        return sum(
+            len(os.listdir(directory))
+            for directory in objects.iterdir()
+            if len(directory.name) == 2
+        )
+
+    @staticmethod
+    def result(wall: float, cpu: float, rss: int, objects: int) -> Result:
+        return {
+            "wall_ms": round(wall * 1000, 1),
+            "cpu_ms": round(cpu * 1000, 1),
+            "max_rss_kb": rss,
+            "objects": objects,
+            "objects_per_sec": round(objects / wall, 1) if wall else 0.0,
+        }
+
+
+def snapshot(root: Path) -> Dict[str, Tuple[int, int]]:
+    """Return the inode and mtime of every file, which change when it is written."""
+    files: Dict[str, Tuple[int, int]] = {}
+    for directory, dirs, names in os.walk(root):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for name in names:
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            files[path] = (stat.st_ino, stat.st_mtime_ns)
+    return files
+
+
+def age(root: Path, seconds: float) -> None:
+    """Move the mtime of every file and directory into the past."""
+    old = time.time() - seconds
+    for directory, dirs, files in os.walk(root):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for name in files:
+            os.utime(os.path.join(directory, name), (old, old))
+        os.utime(directory, (old, old))
+
+
+def revision(checkout: Path) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=checkout,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def best(results: Dict[str, List[Result]]) -> Dict[str, Result]:
+    return {
+        name: min(runs, key=lambda result: result["wall_ms"])
+        for name, runs in results.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--pyg", type=Path, default=Path(__file__).resolve().parents[1])
+    parser.add_argument("--changed", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path)
+    Shape.add_arguments(parser)
+    args = parser.parse_args()
+
+    shape = Shape.from_arguments(args)
+    checkout = args.pyg.resolve()
+    results: Dict[str, List[Result]] = {
+        name: []
+        for name in (
+            "cold-add",
+            "noop-add",
+            "commit-one",
+            "commit-changed",
+            "index-load",
+            "checkout-back",
+        )
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generator = Generator(root, shape)
+        generator.generate()
+        runner = Runner(checkout, root)
+
+        for i in range(args.repeat):
+            # Start from the same files in a new repository each time, old
+            # enough that no index entry is racy
+            shutil.rmtree(root.joinpath(".git"), ignore_errors=True)
+            if i:
+                generator.generate()
+            age(root, 3600)
+            runner.run(
+                [sys.executable, str(runner.pyg_dir.joinpath("main.py")), "init", tmp]
+            )
+
+            results["cold-add"].append(runner.pyg(("add", ".")))
+            results["noop-add"].append(runner.pyg(("add", ".")))
+            runner.pyg(("commit",))
+
+            generator.change(0, 2 * i + 1)
+            results["commit-one"].append(runner.pyg(("add", "."), ("commit",)))
+            previous = root.joinpath(".git", "HEAD").read_text().strip()
+            generator.change(args.changed, 2 * i + 2)
+            results["commit-changed"].append(runner.pyg(("add", "."), ("commit",)))
+            results["index-load"].append(runner.index_load())
+
+            before = snapshot(root)
+            result = runner.pyg(("checkout", previous))
+            after = snapshot(root)
+            result["files_written"] = sum(
+                before.get(path) != stat for path, stat in after.items()
+            )
+            results["checkout-back"].append(result)
+
+    report = {
+        "pyg": str(checkout),
+        "revision": revision(checkout),
+        "python": platform.python_version(),
+        "shape": shape._asdict(),
+        "changed": args.changed,
+        "repeat": args.repeat,
+        "scenarios": best(results),
+    }
+    text = json.dumps(report, indent=2) + "\n"
+    if args.output:
+        args.output.write_text(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark building the trees of a large workspace.
+
+Generates the sorted paths of many files spread over nested directories, and
+compares the time and peak memory of the previous builder, which made a Tree
+of every directory from each entry's parent directories before storing any
+of them, with CacheTree.update, which walks the index's sorted entries and
+has TreeWriter store each tree as soon as its directory ends. Trees are
+hashed but not written, so only building them is measured.
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from hashlib import sha1
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from database.tree import Tree  # noqa: E402
+from entry import Entry  # noqa: E402
+from index.cache_tree import CacheTree  # noqa: E402
+from index.entry import Entry as IndexEntry  # noqa: E402
+from index.store import EntryStore  # noqa: E402
+
+OID = "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+def store(tree: Tree) -> None:
+    tree.oid = sha1(b"tree %d\0" % len(bytes(tree)) + bytes(tree)).hexdigest()
+
+
+def legacy_build(paths: List[bytes]) -> str:
+    """Build every tree in memory, then store them depth first, as Tree did."""
+    entries = [Entry(Path(path.decode()), OID, 0o644) for path in paths]
+    entries.sort(key=lambda x: bytes(x.pathname))
+    root = Tree()
+    for entry in entries:
+        parents = list(entry.pathname.parents)[:-1]
+        parents.reverse()
+        tree = root
+        for parent in parents:
+            tree = tree.entries.setdefault(parent.name, Tree())
+        tree.entries[entry.name] = entry
+
+    def traverse(tree: Tree) -> None:
+        for child in tree.entries.values():
+            if isinstance(child, Tree):
+                traverse(child)
+        store(tree)
+
+    traverse(root)
+    return str(root.oid)
+
+
+def index_entries(paths: List[bytes]) -> EntryStore:
+    """Make the entries of an index for every path."""
+    entries = EntryStore()
+    for path in paths:
+        entries.put(IndexEntry(Path(path.decode()), OID, 0o100644, 0, *[0] * 9))
+    return entries
+
+
+def streaming_build(entries: EntryStore) -> str:
+    return CacheTree().update(entries, store)
+
+
+def measure(label: str, fn: Callable[[], str]) -> Tuple[str, int]:
+    gc.collect()
+    start = time.perf_counter()
+    oid = fn()
+    elapsed = time.perf_counter() - start
+
+    # Tracing allocations slows everything down, so peaks come from a second run
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>14}: {elapsed * 1000:9.1f} ms {peak / 1e3:10.1f} KB peak")
+    return oid, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=10)
+    args = parser.parse_args()
+
+    paths = []
+    for i in range(args.files):
+        parts = []
+        leaf = i
+        for _ in range(args.depth):
+            leaf, digit = divmod(leaf, args.fanout)
+            parts.append(f"d{digit}")
+        paths.append("/".join([*parts, f"f{i}"]).encode())
+    paths.sort()
+    print(f"workspace: {args.files} files, {args.depth} levels of directories")
+
+    legacy, legacy_peak = measure("legacy build", lambda: legacy_build(paths))
+    entries = index_entries(paths)
+    streaming, streaming_peak = measure("CacheTree", lambda: streaming_build(entries))
+    if legacy != streaming:
+        raise Exception(f"Root trees differ: {legacy} and {streaming}")
+    print(f"{'ratio':>14}: {legacy_peak / streaming_peak:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
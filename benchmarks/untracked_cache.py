@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark scanning the workspace with the untracked cache.
+
+Generates a tree with many directories, then times a scan that lists every
+directory against a scan that reuses the listings cached by the first one,
+and against a bare stat of every directory for reference.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from index.untracked_cache import UntrackedCache  # noqa: E402
+from workspace import Workspace  # noqa: E402
+
+
+def generate_tree(root: Path, dirs: int, fanout: int, files: int) -> List[str]:
+    """Write dirs directories, each holding a few files, and age their mtimes."""
+    paths: List[str] = []
+    for i in range(dirs):
+        directory = root.joinpath(f"d{i % fanout}", f"e{i // fanout % fanout}", str(i))
+        directory.mkdir(parents=True, exist_ok=True)
+        for j in range(files):
+            directory.joinpath(f"f{j}").write_bytes(b"")
+        paths.append(str(directory))
+    root.joinpath(".git").mkdir()
+
+    # Move every mtime out of the window in which listings are not cached
+    old = time.time() - 3600
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (old, old))
+    return paths
+
+
+def measure(label: str, fn: Callable[[], int], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>22}: {best * 1000:9.1f} ms, {count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dirs", type=int, default=100_000)
+    parser.add_argument("--fanout", type=int, default=40)
+    parser.add_argument("--files", type=int, default=2, help="files per directory")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        dirs = generate_tree(root, args.dirs, args.fanout, args.files)
+        workspace = Workspace(root)
+
+        cache = UntrackedCache()
+        sum(1 for _ in workspace.scan(None, cache))
+
+        measure("scan", lambda: sum(1 for _ in workspace.scan()), args.repeat)
+        measure(
+            "scan with cache",
+            lambda: sum(1 for _ in workspace.scan(None, cache)),
+            args.repeat,
+        )
+        measure("stat every directory", lambda: len(list(map(os.stat, dirs))), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark walking the workspace.
+
+Generates a tree of tracked source files next to an ignored directory of
+build output, and times the previous walker, which listed every directory
+with listdir, checked each entry with is_dir and stat'ed every file again,
+against Workspace.walk.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("pyg")))
+
+from workspace import Workspace  # noqa: E402
+
+
+def legacy_walk(root: Path) -> List[tuple]:
+    """The walker Workspace used before scandir, followed by stat_file."""
+
+    def list_files(path: Path) -> List[Path]:
+        if path.is_dir():
+            filenames = os.listdir(path)
+            if ".git" in filenames:
+                filenames.remove(".git")
+            r = []
+            for name in filenames:
+                for f in list_files(Path(path).joinpath(name)):
+                    r.append(f)
+            return r
+        return [path.relative_to(root)]
+
+    return [(path, root.joinpath(path).stat()) for path in list_files(root)]
+
+
+def generate_tree(root: Path, files: int, ignored: int, fanout: int) -> None:
+    """Write files spread over directories, plus an ignored output directory."""
+    for name, count in (("src", files), ("node_modules", ignored)):
+        for i in range(count):
+            directory = root.joinpath(
+                name, f"d{i % fanout}", f"e{i // fanout % fanout}"
+            )
+            directory.mkdir(parents=True, exist_ok=True)
+            directory.joinpath(f"f{i}").write_bytes(b"")
+    root.joinpath(".git").mkdir()
+    root.joinpath(".gitignore").write_text("node_modules/\n")
+
+
+def measure(label: str, fn, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(fn())
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:>16}: {best * 1000:9.1f} ms, {count} files")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--ignored", type=int, default=80_000)
+    parser.add_argument("--fanout", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_tree(root, args.files, args.ignored, args.fanout)
+        workspace = Workspace(root)
+
+        measure("legacy walker", lambda: legacy_walk(root), args.repeat)
+        measure("Workspace.walk", lambda: list(workspace.walk()), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from os import stat_result
+from pathlib import Path
+from stat import S_ISDIR
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from database.database import Database
+from database.entry import Entry as DatabaseEntry
+from diff.changes import Change
+from index.index import Index
+from status import Status
+import tracing
+from workspace import Workspace
+
+# A path and what its file should become, or None for no file
+Update = Tuple[str, Optional[DatabaseEntry]]
+
+# A path that was written, the entry it was written from and its new stat
+Written = Tuple[str, DatabaseEntry, stat_result]
+
+
+class Checkout:
+    """
+    Writes the files of tree entries into the workspace.
+
+    Only the paths given are touched, so moving between trees that share
+    most of their files costs what their differences do. Files that go away
+    are removed first, along with the directories they leave empty, which
+    clears the way for a file to replace a directory or the other way round.
+    The directories the new files need are then made in one pass over their
+    sorted paths, and the files are written in batches on a pool of threads,
+    as inflating objects and writing files both release the GIL.
+
+    Every file is written afresh, taking its executable bit from its entry,
+    and its stat is returned for the index, so that the next status finds it
+    clean without reading it.
+    """
+
+    EXECUTABLE_MODE = "100755"
+
+    BATCH_SIZE = 64
+
+    def __init__(
+        self, workspace: Workspace, database: Database, jobs: Optional[int] = None
+    ) -> None:
+        self.workspace: Workspace = workspace
+        self.database: Database = database
+        self.jobs: int = jobs or os.cpu_count() or 1
+
+    def switch(
+        self, index: Index, changes: Iterable[Change]
+    ) -> Tuple[List[Update], List[str], List[str]]:
+        """
+        Return the updates that carry the index and workspace along some
+        changes between the current tree and another, as in Git, with the
+        paths whose local changes and whose untracked files they would
+        overwrite.
+
+        A path whose entry already matches the other tree is left alone, as
+        is every path the changes do not name, so staged and unstaged
+        changes elsewhere are kept. Otherwise its entry must still match the
+        current tree, and its file the entry.
+        """
+        updates: List[Update] = []
+        local: List[str] = []
+        untracked: List[str] = []
+        tracked: List[str] = []
+        for change in changes:
+            entry = index.entry_for_path(Path(change.path))
+            current: Optional[DatabaseEntry] = (
+                DatabaseEntry(entry.oid, f"{entry.mode:o}") if entry else None
+            )
+            if current == change.new:
+                continue
+            if current != change.old:
+                local.append(change.path)
+                continue
+
+            if current is not None:
+                tracked.append(change.path)
+            elif self._in_the_way(index, change.path):
+                untracked.append(change.path)
+                continue
+            updates.append((change.path, change.new))
+
+        # Files deleted from the workspace are not local changes to lose
+        status: Status = Status(self.workspace, index, self.database, self.jobs)
+        positions: List[int] = [
+            bisect_left(status.paths, os.fsencode(path)) for path in tracked
+        ]
+        status.check_tracked(positions)
+        modified: Set[str] = {
+            path for path, code in status.changed.items() if code == Status.MODIFIED
+        }
+        if modified:
+            local.extend(modified)
+            updates = [update for update in updates if update[0] not in modified]
+        return updates, sorted(local), untracked
+
+    def _in_the_way(self, index: Index, path: str) -> bool:
+        """
+        Check whether an untracked file is where a new file is to be written.
+
+        A directory there is only in the way if it holds untracked files, as
+        the tracked ones go with the changes that make way for the file.
+        """
+        root: str = str(self.workspace.pathname)
+        try:
+            stat: stat_result = os.lstat(os.path.join(root, path))
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        if not S_ISDIR(stat.st_mode):
+            return True
+
+        for directory, _, names in os.walk(os.path.join(root, path)):
+            for name in names:
+                tracked = os.path.relpath(os.path.join(directory, name), root)
+                if index.entry_for_path(Path(tracked)) is None:
+                    return True
+        return False
+
+    @tracing.traced("checkout.run")
+    def run(self, updates: Sequence[Update]) -> List[Written]:
+        """Bring the files at some paths to their entries, in path order."""
+        removed: List[Path] = [Path(path) for path, entry in updates if entry is None]
+        for path in removed:
+            self.workspace.remove_file(path)
+        self.workspace.remove_empty_directories(removed)
+
+        writes: List[Tuple[str, DatabaseEntry]] = [
+            (path, entry) for path, entry in updates if entry is not None
+        ]
+        self.workspace.make_directories(Path(path) for path, _ in writes)
+
+        batches: List[Sequence[Tuple[str, DatabaseEntry]]] = [
+            writes[n : n + self.BATCH_SIZE]
+            for n in range(0, len(writes), self.BATCH_SIZE)
+        ]
+        if self.jobs == 1 or len(batches) < 2:
+            return [written for batch in batches for written in self._write(batch)]
+
+        with ThreadPoolExecutor(self.jobs) as pool:
+            return [
+                written
+                for results in pool.map(self._write, batches)
+                for written in results
+            ]
+
+    def _write(self, batch: Sequence[Tuple[str, DatabaseEntry]]) -> List[Written]:
+        """Write the files of some entries."""
+        written: List[Written] = []
+        for path, entry in batch:
+            stat: stat_result = self.workspace.write_file(
+                Path(path),
+                self.database.blob_contents(entry.oid),
+                entry.mode == self.EXECUTABLE_MODE,
+            )
+            written.append((path, entry, stat))
+        return written
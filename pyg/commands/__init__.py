@@ -0,0 +1,54 @@
+"""
+The commands of pyg, each in a module of its own.
+
+A command's module is only imported when the command is run, so that
+starting pyg costs what the command uses rather than what every command
+uses. Each module has a `run` function taking the arguments after the
+command's name, which exits through sys.exit like the rest of pyg.
+"""
+
+import importlib
+import os
+import sys
+from types import ModuleType
+from typing import Dict, List
+
+# The script that starts pyg, for commands that start it again in the background
+MAIN_PATH: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "main.py")
+
+# The module in this package that runs each command
+COMMANDS: Dict[str, str] = {
+    "init": "init",
+    "commit": "commit",
+    "add": "add",
+    "status": "status",
+    "fsmonitor": "fsmonitor",
+    "daemon": "daemon",
+    "diff": "diff",
+    "checkout": "checkout",
+    "restore": "restore",
+    "log": "log",
+    "rev-list": "rev_list",
+    "merge-base": "merge_base",
+    "commit-graph": "commit_graph",
+    "repack": "repack",
+    "hash-object": "hash_object",
+    "cat-file": "cat_file",
+    "gc": "gc",
+}
+
+
+def load(command: str) -> ModuleType:
+    """Import the module of a command."""
+    return importlib.import_module(f"{__name__}.{COMMANDS[command]}")
+
+
+def run(argv: List[str]) -> None:
+    """Run a command line, given without the program's name."""
+    if not argv:
+        sys.stderr.write("usage: pyg <command> [<args>]\n")
+        sys.exit(129)
+    if argv[0] not in COMMANDS:
+        sys.stderr.write(f"pyg: '{argv[0]}' is not a command.\n")
+        sys.exit(1)
+    load(argv[0]).run(argv[1:])
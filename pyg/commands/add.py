@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from database.database import Database
+from database.ingest import Ingest
+from fsmonitor.client import Client
+from fsmonitor.protocol import SOCKET_NAME
+from index.index import Index
+from index.monitor_state import MonitorState
+import tracing
+from workspace import Workspace
+
+from .common import parse_jobs, workspace_prefix
+
+
+def run(args: List[str]) -> None:
+    # Setup paths to Git files and database
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+
+    # Setup handlers
+    workspace: Workspace = Workspace(root_path)
+    database: Database = Database(git_path.joinpath("objects"))
+    index: Index = Index(git_path.joinpath("index"))
+
+    # Load the existing index into memory
+    index.load_for_update()
+
+    jobs, paths = parse_jobs(args)
+
+    # If the fsmonitor daemon is running, ask it what changed since the last
+    # add, so that only those paths have to be looked at
+    monitor: MonitorState = index.monitor_state()
+    client: Client = Client(git_path.joinpath(SOCKET_NAME))
+    monitor.update(client.query(monitor.token), workspace.exclude_key())
+
+    # Collect the files whose contents need to be hashed
+    pending: List[Tuple[Path, os.stat_result]] = []
+    looked: List[Tuple[str, List[str]]] = []
+    walked: Set[bytes] = set()
+    with tracing.span("add.walk"):
+        for path in paths:
+            target: Path = Path(path).resolve()
+            prefix: str = workspace_prefix(root_path, path)
+
+            # Find the files below the path that are not ignored: only those that
+            # changed if the daemon has kept track, otherwise every one of them,
+            # reusing the listings of directories that have not changed
+            if monitor.is_valid():
+                candidates: List[str] = monitor.candidates(prefix)
+                files = workspace.walk_paths(candidates)
+            else:
+                candidates = [prefix]
+                files = workspace.walk(target, index.untracked_cache())
+            looked.append((prefix, candidates))
+
+            for pathname, stat in files:
+                walked.add(bytes(pathname))
+
+                # Skip reading and hashing files whose index entry is still fresh
+                entry = index.entry_for_path(pathname)
+                if entry and index.is_fresh(entry, stat):
+                    continue
+
+                pending.append((pathname, stat))
+
+    # Update database, hashing files in parallel, and queue files in index;
+    # the blobs are made durable as one batch before the index refers to them
+    with tracing.span("add.ingest", files=len(pending)), database.batch():
+        for pathname, oid, stat in Ingest(database, jobs).run(pending):
+            index.add(pathname, oid, stat)
+
+    # Everything below the paths now matches the index, except the tracked
+    # paths that were looked for and not found, whose entries add keeps
+    tracked: List[bytes] = index.entries.sorted_paths()
+    for prefix, candidates in looked:
+        missing: List[str] = [
+            os.fsdecode(tracked[i])
+            for i in index.entries.positions_below(map(os.fsencode, candidates))
+            if tracked[i] not in walked
+        ]
+        monitor.settle(prefix, missing)
+
+    # If no entry changed, the index file is left as it is
+    if index.changed or index.checksum is None:
+        index.write_updates()
+    else:
+        index.write_caches()
@@ -0,0 +1,130 @@
+import signal
+import sys
+from io import BufferedIOBase
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from database.chunked import Manifest
+from database.database import Database
+from database.tree import Tree
+from refs import Refs
+
+from .common import read_lines, resolve_revision
+
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+USAGE = (
+    "usage: pyg cat-file (-t | -s | -e | -p) <object>\n"
+    "   or: pyg cat-file (--batch | --batch-check)\n"
+)
+
+HEX_DIGITS = frozenset(b"0123456789abcdef")
+
+# The type of each mode in a tree
+TREE_MODE = 0o40000
+COMMIT_MODE = 0o160000
+
+
+def object_name(refs: Refs, name: bytes) -> Optional[str]:
+    """Turn HEAD or a full oid into an oid, or None if it is neither."""
+    if name == b"HEAD":
+        return refs.read_head()
+    if len(name) == 40 and HEX_DIGITS.issuperset(name):
+        return name.decode("ascii")
+    return None
+
+
+def pretty_tree(data: bytes) -> bytes:
+    """List a tree's entries as `git ls-tree` does."""
+    lines: List[bytes] = []
+    for name, entry in Tree.parse(data).entries.items():
+        mode: int = int(entry.mode, 8)
+        kind: str = (
+            "tree" if mode == TREE_MODE else "commit" if mode == COMMIT_MODE else "blob"
+        )
+        lines.append(f"{mode:06o} {kind} {entry.oid}\t{name}\n".encode("utf-8"))
+    return b"".join(lines)
+
+
+def chunked_size(database: Database, oid: str) -> int:
+    """Return the size of the file a chunked blob's manifest stands for."""
+    data: bytes = database.read_object(oid)[1]
+    return sum(size for _, size in Manifest.parse(data).chunks)
+
+
+def batch(database: Database, refs: Refs, contents: bool) -> None:
+    """
+    Answer each object named on standard input with its type and size, and
+    its contents too if asked for, as `git cat-file --batch` does. A
+    chunked blob is answered with the file it stands for.
+    """
+    out: BufferedIOBase = open(
+        sys.stdout.fileno(), "wb", OUTPUT_BUFFER_SIZE, closefd=False
+    )
+    for lines in read_lines(sys.stdin.fileno()):
+        for line in lines:
+            # The whole line names the object
+            oid: Optional[str] = object_name(refs, line)
+            found: Optional[Tuple[str, bytes]] = None
+            info: Optional[Tuple[str, int]] = None
+            chunked: bool = oid is not None and database.is_chunked(oid)
+            if oid and chunked:
+                info = ("blob", chunked_size(database, oid))
+            elif oid and contents:
+                found = database.find_object(oid)
+                info = found and (found[0], len(found[1]))
+            elif oid:
+                info = database.read_info(oid)
+            if not oid or not info:
+                out.write(b"%s missing\n" % line)
+                continue
+
+            out.write(b"%s %s %d\n" % (oid.encode("ascii"), info[0].encode(), info[1]))
+            if oid and chunked and contents:
+                for chunk in database.blob_contents(oid):
+                    out.write(chunk)
+                out.write(b"\n")
+            elif found:
+                out.write(found[1])
+                out.write(b"\n")
+        out.flush()
+
+
+def run(args: List[str]) -> None:
+    # Stop quietly once a pager or head has read enough
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    git_path: Path = Path.cwd().joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    refs: Refs = Refs(git_path)
+
+    if args in (["--batch"], ["--batch-check"]):
+        batch(database, refs, args[0] == "--batch")
+        return
+    if len(args) != 2 or args[0] not in ("-t", "-s", "-e", "-p"):
+        sys.stderr.write(USAGE)
+        sys.exit(129)
+
+    option, name = args
+    oid: str = resolve_revision(refs, name)
+    info: Optional[Tuple[str, int]] = database.read_info(oid)
+    if info is None:
+        if option == "-e":
+            sys.exit(1)
+        sys.stderr.write(f"fatal: Not a valid object name {name}\n")
+        sys.exit(128)
+
+    # A chunked blob is shown as the file it stands for
+    obj_type, size = info
+    if option == "-t":
+        print(obj_type)
+    elif option == "-s":
+        print(chunked_size(database, oid) if database.is_chunked(oid) else size)
+    elif option == "-p" and obj_type == "blob":
+        for chunk in database.blob_contents(oid):
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.flush()
+    elif option == "-p":
+        data: bytes = database.read_object(oid)[1]
+        sys.stdout.buffer.write(pretty_tree(data) if obj_type == "tree" else data)
+        sys.stdout.flush()
@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+from typing import List
+
+from checkout import Checkout
+from database.database import Database
+from diff.changes import TreeChanges
+from index.index import Index
+from refs import Refs
+import tracing
+from workspace import Workspace
+
+from .common import commit_tree, parse_jobs, resolve_revision
+
+
+def run(args: List[str]) -> None:
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    workspace: Workspace = Workspace(root_path)
+    database: Database = Database(git_path.joinpath("objects"))
+    index: Index = Index(git_path.joinpath("index"))
+    refs: Refs = Refs(git_path)
+
+    jobs, args = parse_jobs(args)
+    if len(args) != 1:
+        sys.stderr.write("usage: pyg checkout <commit>\n")
+        sys.exit(129)
+    target_oid: str = resolve_revision(refs, args[0])
+
+    if not index.load_for_update():
+        sys.stderr.write("fatal: Unable to lock the index\n")
+        sys.exit(1)
+
+    # The lock is given up however checking out ends, unless the index was
+    # written
+    try:
+        # Only the paths that differ between HEAD and the target are looked at,
+        # and subtrees they share are never read
+        checkout: Checkout = Checkout(workspace, database, jobs)
+        tree_changes = TreeChanges(database).between(
+            commit_tree(database, refs.read_head()), commit_tree(database, target_oid)
+        )
+        updates, local, untracked = checkout.switch(index, tree_changes)
+        if local or untracked:
+            if local:
+                sys.stderr.write(
+                    "error: Your local changes to the following files would be "
+                    "overwritten by checkout:\n"
+                    + "".join(f"\t{path}\n" for path in local)
+                    + "Please commit your changes or stash them before you switch "
+                    "branches.\n"
+                )
+            if untracked:
+                sys.stderr.write(
+                    "error: The following untracked working tree files would be "
+                    "overwritten by checkout:\n"
+                    + "".join(f"\t{path}\n" for path in untracked)
+                    + "Please move or remove them before you switch branches.\n"
+                )
+            sys.stderr.write("Aborting\n")
+            sys.exit(1)
+
+        with tracing.span("checkout.write", files=len(updates)):
+            written = checkout.run(updates)
+        for pathname, entry in updates:
+            if entry is None:
+                index.remove(Path(pathname))
+        for pathname, entry, stat in written:
+            index.add(Path(pathname), entry.oid, stat)
+
+        # The new stat data lets the next status pass over the written files
+        index.write_updates()
+        refs.update_head(target_oid)
+        sys.stderr.write(f"HEAD is now at {target_oid[:7]}\n")
+    finally:
+        index.release_lock()
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from database.author import Author
+from database.commit import Commit
+from database.database import Database
+from graph.writer import Writer as GraphWriter
+from index.index import Index
+from refs import Refs
+import tracing
+
+
+def run(args: List[str]) -> None:
+    # Setup paths to Git files and database
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    db_path: Path = git_path.joinpath("objects")
+
+    # Setup handlers
+    database: Database = Database(db_path)
+    index: Index = Index(git_path.joinpath("index"))
+    refs: Refs = Refs(git_path)
+
+    # The index written by `add` already records each file's oid and mode,
+    # and caches the trees of directories that have not changed since the
+    # last commit, so only the trees above changed files are built and stored
+    if not index.load_for_update():
+        sys.stderr.write("fatal: Unable to lock the index\n")
+        sys.exit(1)
+
+    # Gather information for the commit
+    parent: Optional[str] = refs.read_head()
+    name: str = os.environ["GIT_AUTHOR_NAME"]
+    email: str = os.environ["GIT_AUTHOR_EMAIL"]
+    author: Author = Author(name, email, time.localtime())
+    message: str = sys.stdin.read()
+
+    # Store the trees and the commit as one batch, which is made durable
+    # before the index and HEAD refer to any of them
+    with database.batch():
+        tree_oid: str = index.write_tree(database.store)
+        commit: Commit = Commit(parent, tree_oid, author, message)
+        database.store(commit)
+    index.write_updates()
+    refs.update_head(commit.oid)
+
+    # Add the commit to the commit-graph, so history walks need not open it
+    with tracing.span("commit-graph.write"):
+        GraphWriter(database).write([commit.oid])
+
+    # Signify root-commit on first commit only
+    is_root = "(root-commit) " if not parent else ""
+    print("[{}{}] {}".format(is_root, commit.oid, message.split("\n", 1)[0]))
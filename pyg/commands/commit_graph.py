@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from database.database import Database
+from graph.writer import Writer as GraphWriter
+from refs import Refs
+
+
+def run(args: List[str]) -> None:
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    refs: Refs = Refs(git_path)
+
+    if args != ["write"]:
+        sys.stderr.write("usage: pyg commit-graph write\n")
+        sys.exit(129)
+
+    # Add any commits made before the graph was kept, such as by older pyg
+    head: Optional[str] = refs.read_head()
+    if head and not GraphWriter(database).write([head]):
+        sys.stderr.write("fatal: Unable to lock the commit-graph\n")
+        sys.exit(1)
@@ -0,0 +1,82 @@
+import os
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from database.database import Database
+from graph.graph import read_commit
+from refs import Refs
+
+# Bytes of standard input read at a time by commands that answer each line
+READ_SIZE = 1 << 16
+
+
+def parse_jobs(args: List[str]) -> Tuple[Optional[int], List[str]]:
+    """Separate a -j/--jobs option from the rest of the arguments."""
+    jobs: Optional[int] = None
+    rest: List[str] = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-j", "--jobs"):
+            i += 1
+            jobs = int(args[i])
+        elif arg.startswith("--jobs="):
+            jobs = int(arg[len("--jobs=") :])
+        elif arg.startswith("-j"):
+            jobs = int(arg[len("-j") :])
+        else:
+            rest.append(arg)
+        i += 1
+    return jobs, rest
+
+
+def resolve_revision(refs: Refs, name: str) -> str:
+    """Turn HEAD or a full commit oid into an oid, exiting if it is neither."""
+    if name == "HEAD":
+        head: Optional[str] = refs.read_head()
+        if not head:
+            sys.stderr.write(
+                "fatal: your current branch does not have any commits yet\n"
+            )
+            sys.exit(128)
+        return head
+    if len(name) == 40 and all(c in "0123456789abcdef" for c in name):
+        return name
+    sys.stderr.write(f"fatal: bad revision '{name}'\n")
+    sys.exit(128)
+
+
+def commit_tree(database: Database, oid: Optional[str]) -> Optional[str]:
+    """Return the oid of a commit's tree, or None for no commit."""
+    if oid is None:
+        return None
+    return read_commit(database.read_object(oid)[1])[0]
+
+
+def workspace_prefix(root_path: Path, path: str) -> str:
+    """Turn a path given on the command line into a prefix of workspace paths."""
+    target: Path = Path(path).resolve()
+    return "" if target == root_path else target.relative_to(root_path).as_posix()
+
+
+def read_lines(fd: int) -> Iterator[List[bytes]]:
+    """
+    Yield the lines read from a file descriptor, without their newlines, as
+    many as each read returns.
+
+    Commands that answer each line flush their answers after each batch, so
+    a process that writes one line and waits gets its answer straight away,
+    while a large input is answered in large writes.
+    """
+    rest: bytes = b""
+    while True:
+        data: bytes = os.read(fd, READ_SIZE)
+        if not data:
+            break
+        lines: List[bytes] = (rest + data).split(b"\n")
+        rest = lines.pop()
+        if lines:
+            yield lines
+    if rest:
+        yield [rest]
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from daemon.client import Client
+from daemon.protocol import SOCKET_NAME
+from daemon.server import Server
+
+from . import COMMANDS, MAIN_PATH, load, run as run_command
+
+
+def run(args: List[str]) -> None:
+    root_path: Path = Path.cwd()
+    socket_path: Path = root_path.joinpath(".git", SOCKET_NAME)
+    client: Client = Client(str(socket_path))
+    action: str = args[0] if args else "status"
+    running: bool = client.ping()
+
+    if action in ("start", "run") and running:
+        print("daemon is already running")
+    elif action == "run":
+        # Every command's modules are imported once, for every child to share
+        for command in COMMANDS:
+            load(command)
+
+        # A socket left behind by a daemon that did not exit cleanly
+        socket_path.unlink(missing_ok=True)
+        Server(root_path, socket_path, run_command).run()
+    elif action == "start":
+        socket_path.unlink(missing_ok=True)
+        daemon: subprocess.Popen = subprocess.Popen(
+            [sys.executable, MAIN_PATH, "daemon", "run"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+        # Wait for the daemon to load the repository
+        while not client.ping():
+            if daemon.poll() is not None:
+                sys.stderr.write("fatal: daemon failed to start\n")
+                sys.exit(1)
+            time.sleep(0.05)
+        print("daemon started")
+    elif action == "stop":
+        print("daemon stopped" if client.quit() else "daemon is not running")
+    elif action == "status":
+        print("daemon is running" if running else "daemon is not running")
+    else:
+        sys.stderr.write(f"pyg: unknown daemon action '{action}'\n")
+        sys.exit(1)
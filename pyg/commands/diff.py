@@ -0,0 +1,170 @@
+import os
+import signal
+import sys
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from database.database import Database
+from database.entry import Entry as DatabaseEntry
+from diff.changes import TreeChanges
+from diff.diff import Diff
+from diff.writer import Side, UnifiedWriter
+from index.entry import mode_for_stat
+from index.index import Index
+from refs import Refs
+from status import Status
+from workspace import Workspace
+
+from .common import READ_SIZE, commit_tree, resolve_revision
+
+# A version of a file: its blob's oid, its mode, and how to read its contents
+Version = Tuple[str, str, Callable[[], Iterator[bytes]]]
+
+
+def blob_version(
+    database: Database, entry: Optional[DatabaseEntry]
+) -> Optional[Version]:
+    """The version of a file held by a tree or index entry, if any."""
+    if entry is None:
+        return None
+    return entry.oid, entry.mode, lambda: database.blob_contents(entry.oid)
+
+
+def file_version(database: Database, path: Path) -> Version:
+    """
+    The version of a file in the workspace, hashed as it is streamed, so
+    that its contents are only held if they are to be diffed.
+    """
+
+    def contents() -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(READ_SIZE), b"")
+
+    with open(path, "rb") as f:
+        stat: os.stat_result = os.fstat(f.fileno())
+        oid: str = database.hash_stream(f, stat.st_size)
+    return oid, f"{mode_for_stat(stat):o}", contents
+
+
+def write_diff(
+    writer: UnifiedWriter, path: str, old: Optional[Version], new: Optional[Version]
+) -> None:
+    """
+    Write the diff of a file between two versions, reading no contents if
+    only its mode changed, and only the start of each version, enough to
+    tell, if either is binary, as a binary file's lines are never diffed.
+    """
+    versions: List[Optional[Version]] = [old, new]
+    same: bool = old is not None and new is not None and old[0] == new[0]
+    streams: List[Iterator[bytes]] = [
+        version[2]() if version and not same else iter(()) for version in versions
+    ]
+    data: List[bytearray] = []
+    for stream in streams:
+        head: bytearray = bytearray()
+        for chunk in stream:
+            head += chunk
+            if len(head) >= UnifiedWriter.BINARY_CHECK_SIZE:
+                break
+        data.append(head)
+    if not any(UnifiedWriter.is_binary(head) for head in data):
+        for head, stream in zip(data, streams):
+            for chunk in stream:
+                head += chunk
+
+    sides: List[Optional[Side]] = [
+        Side(version[0], version[1], bytes(contents)) if version else None
+        for version, contents in zip(versions, data)
+    ]
+    writer.write(path, sides[0], sides[1])
+
+
+def run(args: List[str]) -> None:
+    # Stop quietly once a pager or head has read enough
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    workspace: Workspace = Workspace(root_path)
+    database: Database = Database(git_path.joinpath("objects"))
+    index: Index = Index(git_path.joinpath("index"))
+    refs: Refs = Refs(git_path)
+
+    algorithm: str = Diff.MYERS
+    cached: bool = False
+    revisions: List[str] = []
+    for arg in args:
+        if arg in ("--cached", "--staged"):
+            cached = True
+        elif arg == "--histogram":
+            algorithm = Diff.HISTOGRAM
+        elif arg.startswith("--diff-algorithm="):
+            algorithm = arg[len("--diff-algorithm=") :]
+            if algorithm not in Diff.ALGORITHMS:
+                sys.stderr.write(f"fatal: unknown diff algorithm '{algorithm}'\n")
+                sys.exit(128)
+        else:
+            revisions.append(resolve_revision(refs, arg))
+
+    writer: UnifiedWriter = UnifiedWriter(sys.stdout.buffer, algorithm)
+    changes: TreeChanges = TreeChanges(database)
+    trees: List[Optional[str]] = [commit_tree(database, oid) for oid in revisions]
+
+    if len(trees) == 2 and not cached:
+        for change in changes.between(trees[0], trees[1]):
+            write_diff(
+                writer,
+                change.path,
+                blob_version(database, change.old),
+                blob_version(database, change.new),
+            )
+
+    elif cached and len(trees) < 2:
+        # Compare the index with a commit, HEAD by default
+        index.load()
+        tree: Optional[str] = (
+            trees[0] if trees else commit_tree(database, refs.read_head())
+        )
+        for change in changes.to_index(tree, index):
+            write_diff(
+                writer,
+                change.path,
+                blob_version(database, change.old),
+                blob_version(database, change.new),
+            )
+
+    elif not trees:
+        # Compare the workspace with the index: files whose stat matches
+        # their entry are skipped, and files whose contents hash to the
+        # entry's oid have their entries refreshed, as in status
+        locked: bool = index.load_for_update()
+        if not locked:
+            index.load()
+        status: Status = Status(workspace, index, database)
+        status.check_tracked()
+        for pathname, code in status.changed.items():
+            entry = index.entry_for_path(Path(pathname))
+            if entry is None:
+                continue
+            write_diff(
+                writer,
+                pathname,
+                blob_version(database, DatabaseEntry(entry.oid, f"{entry.mode:o}")),
+                (
+                    file_version(database, root_path.joinpath(pathname))
+                    if code == Status.MODIFIED
+                    else None
+                ),
+            )
+
+        if locked and index.changed:
+            index.write_updates()
+        elif locked:
+            index.release_lock()
+
+    else:
+        sys.stderr.write(
+            "usage: pyg diff [--cached [<commit>]]\n   or: pyg diff <commit> <commit>\n"
+        )
+        sys.exit(129)
+    sys.stdout.flush()
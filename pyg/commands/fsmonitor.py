@@ -0,0 +1,57 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from fsmonitor.client import Client
+from fsmonitor.daemon import Daemon
+from fsmonitor.protocol import LOG_NAME, SOCKET_NAME
+
+from . import MAIN_PATH
+
+
+def run(args: List[str]) -> None:
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    socket_path: Path = git_path.joinpath(SOCKET_NAME)
+    client: Client = Client(socket_path)
+    action: str = args[0] if args else "status"
+    running: bool = client.query(None) is not None
+
+    if action in ("start", "run") and running:
+        print("fsmonitor is already running")
+    elif action == "run":
+        # A socket left behind by a daemon that did not exit cleanly
+        socket_path.unlink(missing_ok=True)
+        Daemon(root_path, socket_path).run()
+    elif action == "start":
+        socket_path.unlink(missing_ok=True)
+
+        # The daemon's warnings are kept in a log, and those from watching
+        # the workspace at the start are shown here too
+        log_path: Path = git_path.joinpath(LOG_NAME)
+        with open(log_path, "w") as log:
+            daemon: subprocess.Popen = subprocess.Popen(
+                [sys.executable, MAIN_PATH, "fsmonitor", "run"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=log,
+                start_new_session=True,
+            )
+
+        # Wait for the daemon to watch the whole workspace
+        while client.query(None) is None:
+            if daemon.poll() is not None:
+                sys.stderr.write("fatal: fsmonitor failed to start\n")
+                sys.exit(1)
+            time.sleep(0.05)
+        sys.stderr.write(log_path.read_text())
+        print("fsmonitor started")
+    elif action == "stop":
+        print("fsmonitor stopped" if client.quit() else "fsmonitor is not running")
+    elif action == "status":
+        print("fsmonitor is running" if running else "fsmonitor is not running")
+    else:
+        sys.stderr.write(f"pyg: unknown fsmonitor action '{action}'\n")
+        sys.exit(1)
@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from database.database import Database
+from index.cache_tree import CacheTree
+from index.index import Index
+from pack.bitmap import write_bitmaps
+from pack.pack import BITMAP_SUFFIX, BITMAP_TYPES, TYPE_CODES
+from pack.reader import Reader
+from pack.writer import Writer
+from reachable import Reachable
+from refs import Refs
+
+USAGE = "usage: pyg gc [--prune=<date> | --no-prune]\n"
+
+# Unreachable objects are kept until they are this old, as a command that
+# has just written them may be about to make them reachable
+DEFAULT_EXPIRY = "2.weeks.ago"
+NEVER = "never"
+NOW = "now"
+UNITS: Dict[str, int] = {
+    "second": 1,
+    "minute": 60,
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+}
+
+# Commits are given bitmaps at this interval back from HEAD, so that a walk
+# from any commit soon reaches one
+BITMAP_INTERVAL = 100
+
+
+def parse_expiry(value: str) -> Optional[float]:
+    """
+    Turn "now", "never" or "<n>.<unit>.ago" into the time before which
+    unreachable objects are pruned, or None to prune none.
+    """
+    if value == NEVER:
+        return None
+    if value == NOW:
+        return time.time()
+    parts: List[str] = value.split(".")
+    if len(parts) != 3 or parts[2] != "ago" or not parts[0].isdigit():
+        raise ValueError(value)
+    unit: Optional[int] = UNITS.get(parts[1].rstrip("s"))
+    if unit is None:
+        raise ValueError(value)
+    return time.time() - int(parts[0]) * unit
+
+
+def cache_tree_oids(node: CacheTree) -> Iterator[str]:
+    """Yield the trees the index has cached for its directories."""
+    if node.entry_count >= 0 and node.oid:
+        yield node.oid
+    for child in node.children.values():
+        yield from cache_tree_oids(child)
+
+
+def write_pack_bitmaps(pack: Reader, reachable: Reachable) -> int:
+    """
+    Write bitmaps for the commits of a pack holding everything they reach,
+    returning how many commits have one.
+    """
+    positions: Dict[str, int] = {}
+    index_positions: Dict[str, int] = {}
+    for i in range(pack.count):
+        oid: str = pack.oid(i)
+        positions[oid] = pack.pack_position(i)
+        index_positions[oid] = i
+
+    commits: List[str] = reachable.commits()
+    if not commits:
+        return 0
+
+    # Chunks are blobs, which only pyg knows to be reachable
+    size: int = pack.count
+    marks: Dict[int, bytearray] = {
+        type_code: bytearray((size + 7) // 8) for type_code in BITMAP_TYPES
+    }
+    for oid, position in positions.items():
+        type_code: int = TYPE_CODES[reachable.types.get(oid, "blob")]
+        marks[type_code][position >> 3] |= 1 << (position & 7)
+
+    # HEAD is the last commit, so counting back from it
+    selected: List[str] = commits[::-1][::BITMAP_INTERVAL][::-1]
+    bitmaps: Dict[str, int] = reachable.bitmaps(selected, positions, size)
+
+    write_bitmaps(
+        pack.idx_path.with_suffix(BITMAP_SUFFIX),
+        pack.checksum(),
+        size,
+        [int.from_bytes(marks[type_code], "little") for type_code in BITMAP_TYPES],
+        [(index_positions[commit], bitmaps[commit]) for commit in selected],
+        Writer.MODE,
+    )
+    return len(selected)
+
+
+def run(args: List[str]) -> None:
+    expiry: str = DEFAULT_EXPIRY
+    for arg in args:
+        if arg.startswith("--prune="):
+            expiry = arg[len("--prune=") :]
+        elif arg == "--no-prune":
+            expiry = NEVER
+        else:
+            sys.stderr.write(USAGE)
+            sys.exit(129)
+    try:
+        cutoff: Optional[float] = parse_expiry(expiry)
+    except ValueError:
+        sys.stderr.write(f"fatal: invalid prune date '{expiry}'\n")
+        sys.exit(128)
+
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    refs: Refs = Refs(git_path)
+    index: Index = Index(git_path.joinpath("index"))
+    index.load()
+
+    # Objects the index points at are kept too: blobs that are staged but
+    # not yet committed, and the trees it will reuse for the next commit
+    head: Optional[str] = refs.read_head()
+    roots: List[str] = [head] if head else []
+    roots.extend(entry.oid for entry in index.each_entry())
+    roots.extend(cache_tree_oids(index.cache_tree))
+
+    reachable: Reachable = Reachable(database)
+    reachable.mark(roots)
+    kept: Set[str] = set(reachable.types) | reachable.chunks
+
+    loose: Set[str] = set(database.list_objects())
+    database.refresh_packs()
+    old_packs: List[Reader] = list(database.packs or [])
+
+    # Everything reachable goes into one pack, written before any other is
+    # removed, so that every object stays readable throughout
+    idx_path: Optional[Path] = None
+    bitmapped: int = 0
+    written: List[Path] = []
+    if kept:
+        pack_path: Path = Writer(database).write(sorted(kept))
+        idx_path = pack_path.with_suffix(".idx")
+        bitmapped = write_pack_bitmaps(Reader(idx_path, database.cache), reachable)
+        written.extend([pack_path, idx_path])
+
+    # Unreachable objects of the old packs are written out loose, aged as
+    # their pack is, unless their pack is old enough for them to be pruned
+    old_packs = [pack for pack in old_packs if pack.idx_path != idx_path]
+    for pack in old_packs:
+        mtime: float = os.stat(pack.idx_path.with_suffix(".pack")).st_mtime
+        if cutoff is None or mtime > cutoff:
+            for i in range(pack.count):
+                oid: str = pack.oid(i)
+                if oid not in kept and oid not in loose:
+                    written.append(
+                        database.loosen(oid, *database.read_object(oid), mtime)
+                    )
+                    loose.add(oid)
+
+    # Nothing is deleted until what now holds it is sure to outlast it
+    database.make_durable(written)
+    for pack in old_packs:
+        database.remove_pack(pack)
+    database.remove_objects(loose & kept)
+    pruned: int = 0 if cutoff is None else database.prune(loose - kept, cutoff)
+
+    if idx_path:
+        print(
+            f"Packed {len(kept)} objects into {idx_path.with_suffix('.pack').name}"
+            f" with {bitmapped} bitmaps"
+        )
+    print(f"Pruned {pruned} unreachable objects")
@@ -0,0 +1,87 @@
+import io
+import os
+import signal
+import sys
+from contextlib import nullcontext
+from io import BufferedIOBase
+from pathlib import Path
+from typing import Callable, ContextManager, List, Optional
+
+from database.database import Database
+
+from .common import read_lines
+
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+USAGE = "usage: pyg hash-object [-w] [--stdin] [--stdin-paths | <file>...]\n"
+
+OPTIONS = ("-w", "--stdin", "--stdin-paths")
+
+
+def run(args: List[str]) -> None:
+    # Stop quietly once the reader of the oids has gone
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    options: List[str] = [arg for arg in args if arg.startswith("-")]
+    paths: List[str] = [arg for arg in args if arg not in options]
+    if any(option not in OPTIONS for option in options):
+        sys.stderr.write(USAGE)
+        sys.exit(129)
+    write: bool = "-w" in options
+    stdin: bool = "--stdin" in options
+    stdin_paths: bool = "--stdin-paths" in options
+    if stdin_paths and (stdin or paths):
+        sys.stderr.write("fatal: Can't use --stdin-paths with --stdin or paths\n")
+        sys.exit(129)
+
+    git_path: Path = Path.cwd().joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    hash_file: Callable[[BufferedIOBase, int], str] = (
+        database.store_stream if write else database.hash_stream
+    )
+
+    # Objects written for each batch of paths are made durable before their
+    # oids are, so that every oid read back names an object that can be read
+    def batch() -> ContextManager[None]:
+        return database.batch() if write else nullcontext()
+
+    out: BufferedIOBase = open(
+        sys.stdout.fileno(), "wb", OUTPUT_BUFFER_SIZE, closefd=False
+    )
+    error: Optional[str] = None
+
+    def hash_paths(paths: List[bytes]) -> bool:
+        """Write the oids of some files, stopping at any that cannot be read."""
+        nonlocal error
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    oid: str = hash_file(f, os.fstat(f.fileno()).st_size)
+            except OSError as e:
+                error = (
+                    f"could not open '{os.fsdecode(path)}' for reading: {e.strerror}"
+                )
+                return False
+            out.write(b"%s\n" % oid.encode("ascii"))
+        return True
+
+    if stdin:
+        data: bytes = sys.stdin.buffer.read()
+        with batch():
+            oid: str = hash_file(io.BytesIO(data), len(data))
+        out.write(b"%s\n" % oid.encode("ascii"))
+    if stdin_paths:
+        for lines in read_lines(sys.stdin.fileno()):
+            with batch():
+                hashed: bool = hash_paths(lines)
+            out.flush()
+            if not hashed:
+                break
+    else:
+        with batch():
+            hash_paths([os.fsencode(path) for path in paths])
+    out.flush()
+
+    if error:
+        sys.stderr.write(f"fatal: {error}\n")
+        sys.exit(128)
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from config import Config
+from database.database import Database
+
+USAGE = "usage: pyg init [--chunk-threshold=<size>] [<directory>]\n"
+
+
+def run(args: List[str]) -> None:
+    # Files of at least this size are stored in chunks; a repository setting,
+    # so that every command hashes a file to the same oid
+    chunk_threshold: Optional[str] = None
+    paths: List[str] = []
+    for arg in args:
+        if arg.startswith("--chunk-threshold="):
+            chunk_threshold = arg[len("--chunk-threshold=") :]
+            try:
+                Database.parse_size(chunk_threshold)
+            except ValueError:
+                sys.stderr.write(
+                    f"fatal: invalid chunk threshold '{chunk_threshold}'\n"
+                )
+                sys.exit(129)
+        elif arg.startswith("-") or paths:
+            sys.stderr.write(USAGE)
+            sys.exit(129)
+        else:
+            paths.append(arg)
+
+    # Get path, defaulting to current working directory
+    path: str = paths[0] if paths else str(Path.cwd())
+
+    # Setup absolute paths to working directory and Git directory
+    root_path: Path = Path(path).resolve()
+    git_path: Path = root_path.joinpath(".git")
+
+    # Setup needed Git directories
+    for d in ["objects", "refs"]:
+        try:
+            git_path.joinpath(d).mkdir(parents=True)
+        except Exception as e:
+            sys.stderr.write(f"fatal: {e}\n")
+            sys.exit(1)
+
+    if chunk_threshold is not None:
+        config: Config = Config(git_path.joinpath("config"))
+        config.load()
+        config.set(*Database.CHUNK_THRESHOLD_SETTING, chunk_threshold)
+
+    print(f"Initialized empty Pyg repository in {git_path}")
@@ -0,0 +1,67 @@
+import signal
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from database.commit import Commit
+from database.database import Database
+from graph.reader import CommitGraph
+from refs import Refs
+from rev_list import RevList
+
+from .common import resolve_revision
+
+
+def run(args: List[str]) -> None:
+    # Stop quietly once a pager or head has read enough
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    refs: Refs = Refs(git_path)
+
+    oneline: bool = False
+    max_count: Optional[int] = None
+    revision: str = "HEAD"
+    args = list(args)
+    while args:
+        arg: str = args.pop(0)
+        if arg == "--oneline":
+            oneline = True
+        elif arg == "-n":
+            max_count = int(args.pop(0))
+        elif arg.startswith("--max-count="):
+            max_count = int(arg[len("--max-count=") :])
+        elif arg.startswith("-") and arg[1:].isdigit():
+            max_count = int(arg[1:])
+        else:
+            revision = arg
+
+    # Parents and commit times come from the commit-graph; only the commits
+    # that are shown are opened, for their author and message
+    rev_list: RevList = RevList(database, CommitGraph.load(database.pathname))
+    for n, oid in enumerate(rev_list.each(resolve_revision(refs, revision))):
+        if max_count is not None and n >= max_count:
+            break
+        if oneline:
+            # Only the title is needed, so the author is left unparsed
+            _, data = database.read_object(oid)
+            message: bytes = data.split(b"\n\n", 1)[-1]
+            title: str = message.split(b"\n", 1)[0].decode("utf-8")
+            print(f"{oid[:7]} {title}")
+            continue
+
+        logged = database.load(oid)
+        if not isinstance(logged, Commit):
+            raise Exception(f"{oid} is not a commit")
+
+        if n:
+            print()
+        print(f"commit {oid}")
+        print(f"Author: {logged.author.name} <{logged.author.email}>")
+        date: str = time.strftime("%a %b %-d %H:%M:%S %Y %z", logged.author.time)
+        print(f"Date:   {date}")
+        print()
+        for line in logged.message.rstrip("\n").split("\n"):
+            print(f"    {line}" if line else "")
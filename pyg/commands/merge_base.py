@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+from typing import List
+
+from database.database import Database
+from graph.reader import CommitGraph
+from refs import Refs
+from rev_list import RevList
+
+from .common import resolve_revision
+
+
+def run(args: List[str]) -> None:
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    refs: Refs = Refs(git_path)
+
+    if len(args) != 3 or args[0] != "--is-ancestor":
+        sys.stderr.write("usage: pyg merge-base --is-ancestor <commit> <commit>\n")
+        sys.exit(129)
+
+    # Exit with 0 if the first commit is an ancestor of the second, else 1
+    rev_list: RevList = RevList(database, CommitGraph.load(database.pathname))
+    ancestor: str = resolve_revision(refs, args[1])
+    descendant: str = resolve_revision(refs, args[2])
+    sys.exit(0 if rev_list.is_ancestor(ancestor, descendant) else 1)
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+from typing import List
+
+from database.database import Database
+from pack.writer import Writer
+
+USAGE = "usage: pyg repack [-d] [--window=<n>] [--depth=<n>]\n"
+
+
+def run(args: List[str]) -> None:
+    # Delta search options, with Git's names and defaults
+    window: int = Writer.DEFAULT_WINDOW
+    depth: int = Writer.DEFAULT_DEPTH
+    delete: bool = False
+    for arg in args:
+        name, _, value = arg.partition("=")
+        if arg == "-d":
+            delete = True
+        elif name == "--window" and value.isdigit():
+            window = int(value)
+        elif name == "--depth" and value.isdigit():
+            depth = int(value)
+        else:
+            sys.stderr.write(USAGE)
+            sys.exit(129)
+
+    # Setup paths to Git files and database
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+
+    # Consolidate every loose object into a single pack
+    oids: List[str] = list(database.list_objects())
+    if not oids:
+        print("Nothing new to pack.")
+        sys.exit(0)
+
+    pack_path: Path = Writer(database, window, depth).write(oids)
+
+    # Optionally remove the loose copies now that the pack holds them, once
+    # the pack is sure to outlast them
+    if delete:
+        database.make_durable([pack_path, pack_path.with_suffix(".idx")])
+        database.remove_objects(oids)
+
+    print(f"Packed {len(oids)} objects into {pack_path.name}")
@@ -0,0 +1,102 @@
+import os
+import sys
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from checkout import Checkout
+from database.database import Database
+from database.entry import Entry as DatabaseEntry
+from diff.changes import TreeChanges
+from index.index import Index
+from refs import Refs
+from status import Status
+import tracing
+from workspace import Workspace
+
+from .common import commit_tree, parse_jobs, resolve_revision, workspace_prefix
+
+
+def below(path: str, prefix: str) -> bool:
+    return not prefix or path == prefix or path.startswith(f"{prefix}/")
+
+
+def run(args: List[str]) -> None:
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    workspace: Workspace = Workspace(root_path)
+    database: Database = Database(git_path.joinpath("objects"))
+    index: Index = Index(git_path.joinpath("index"))
+    refs: Refs = Refs(git_path)
+
+    jobs, args = parse_jobs(args)
+    source: Optional[str] = None
+    pathspecs: List[str] = []
+    for arg in args:
+        if arg.startswith("--source="):
+            source = resolve_revision(refs, arg[len("--source=") :])
+        elif arg != "--":
+            pathspecs.append(arg)
+    if not pathspecs:
+        sys.stderr.write("fatal: you must specify path(s) to restore\n")
+        sys.exit(128)
+    prefixes: List[str] = [workspace_prefix(root_path, path) for path in pathspecs]
+
+    locked: bool = index.load_for_update()
+    if not locked:
+        index.load()
+
+    # The lock is given up however restoring ends, unless the index was written
+    try:
+        status: Status = Status(workspace, index, database, jobs)
+
+        # Paths whose entry differs from the source take the source's version;
+        # the rest are restored from the index where the workspace differs
+        updates: List[Tuple[str, Optional[DatabaseEntry]]] = []
+        if source:
+            for change in TreeChanges(database).to_index(
+                commit_tree(database, source), index
+            ):
+                if any(below(change.path, prefix) for prefix in prefixes):
+                    updates.append((change.path, change.old))
+
+        for prefix, pathspec in zip(prefixes, pathspecs):
+            if (
+                prefix
+                and not status.positions_below([prefix])
+                and not any(below(path, prefix) for path, _ in updates)
+            ):
+                sys.stderr.write(
+                    f"error: pathspec '{pathspec}' did not match any file(s) known to git\n"
+                )
+                sys.exit(1)
+
+        from_source = {os.fsencode(path) for path, _ in updates}
+        positions: List[int] = [
+            i
+            for i in (
+                range(len(status.paths))
+                if "" in prefixes
+                else status.positions_below(prefixes)
+            )
+            if status.paths[i] not in from_source
+        ]
+        status.check_tracked(positions)
+        for pathname in status.changed:
+            entry = index.entry_for_path(Path(pathname))
+            if entry:
+                updates.append((pathname, DatabaseEntry(entry.oid, f"{entry.mode:o}")))
+
+        with tracing.span("restore.write", files=len(updates)):
+            written = Checkout(workspace, database, jobs).run(sorted(updates))
+
+        # Files restored from the index have their entries refreshed; files taken
+        # from the source show as changed, as the index keeps its own versions
+        for pathname, entry, stat in written:
+            if pathname in status.changed:
+                index.refresh(bisect_left(status.paths, os.fsencode(pathname)), stat)
+
+        if locked and index.changed:
+            index.write_updates()
+    finally:
+        index.release_lock()
@@ -0,0 +1,31 @@
+import signal
+from pathlib import Path
+from typing import List
+
+from database.database import Database
+from graph.reader import CommitGraph
+from refs import Refs
+from rev_list import RevList
+
+from .common import resolve_revision
+
+
+def run(args: List[str]) -> None:
+    # Stop quietly once a pager or head has read enough
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+    refs: Refs = Refs(git_path)
+
+    count: bool = "--count" in args
+    revisions: List[str] = [arg for arg in args if arg != "--count"]
+    start: str = resolve_revision(refs, revisions[0] if revisions else "HEAD")
+
+    rev_list: RevList = RevList(database, CommitGraph.load(database.pathname))
+    if count:
+        print(rev_list.count(start))
+    else:
+        for oid in rev_list.each(start):
+            print(oid)
@@ -0,0 +1,57 @@
+from pathlib import Path
+from typing import List, Optional
+
+from database.database import Database
+from fsmonitor.client import Client
+from fsmonitor.protocol import SOCKET_NAME
+from index.index import Index
+from index.monitor_state import MonitorState
+from status import Status
+import tracing
+from workspace import Workspace
+
+from .common import parse_jobs
+
+
+def run(args: List[str]) -> None:
+    # Setup paths to Git files and database
+    root_path: Path = Path.cwd()
+    git_path: Path = root_path.joinpath(".git")
+
+    # Setup handlers
+    workspace: Workspace = Workspace(root_path)
+    database: Database = Database(git_path.joinpath("objects"))
+    index: Index = Index(git_path.joinpath("index"))
+
+    # Refreshed stat data is written back if the index can be locked, but
+    # status still works while another process holds the lock
+    locked: bool = index.load_for_update()
+    if not locked:
+        index.load()
+
+    jobs, _ = parse_jobs(args)
+
+    monitor: MonitorState = index.monitor_state()
+    token: Optional[str] = monitor.token
+    client: Client = Client(git_path.joinpath(SOCKET_NAME))
+    monitor.update(client.query(monitor.token), workspace.exclude_key())
+
+    status: Status = Status(workspace, index, database, jobs)
+    with tracing.span("status.run"):
+        status.run(monitor)
+
+    for pathname, code in status.changed.items():
+        print(f" {code} {pathname}")
+    for pathname in status.untracked:
+        print(f"?? {pathname}")
+
+    # Every path now matches the index except those just reported
+    monitor.settle("", [*status.changed, *status.untracked])
+    untracked_changed: bool = bool(index.untracked and index.untracked.changed)
+    caches_changed: bool = monitor.token != token or untracked_changed
+    if locked and (index.changed or (caches_changed and index.checksum is None)):
+        index.write_updates()
+    elif locked and caches_changed:
+        index.write_caches()
+    elif locked:
+        index.release_lock()
@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from lockfile import Lockfile
+
+
+class Config:
+    """
+    The settings of a repository, in .git/config.
+
+    The file is in Git's format, and only as much of it is understood as pyg
+    needs: sections, with keys and values. Names are matched without regard
+    to case, as Git matches them. Setting a key rewrites its line, or adds
+    one, leaving every other line of the file as it was, so the settings
+    Git keeps there are untouched. Git ignores sections it does not know,
+    so pyg keeps its own settings under [pyg].
+    """
+
+    class LockDenied(Exception):
+        pass
+
+    def __init__(self, pathname: Path) -> None:
+        self.pathname: Path = pathname
+        self.lines: List[str] = []
+
+    def load(self) -> None:
+        """Read the file, if there is one."""
+        try:
+            with open(self.pathname, "r") as f:
+                self.lines = f.read().splitlines()
+        except FileNotFoundError:
+            self.lines = []
+
+    def get(self, section: str, key: str) -> Optional[str]:
+        """Return the last value set for a key, or None if it is not set."""
+        value: Optional[str] = None
+        for _, line_section, line_key, line_value in self._entries():
+            if (line_section, line_key) == (section.lower(), key.lower()):
+                value = line_value
+        return value
+
+    def set(self, section: str, key: str, value: str) -> None:
+        """Set a key and write the file."""
+        line: str = f"\t{key} = {value}"
+        found: Optional[int] = None
+        end: Optional[int] = None
+        for i, line_section, line_key, _ in self._entries():
+            if line_section == section.lower():
+                end = i + 1
+                if line_key == key.lower():
+                    found = i
+
+        if found is not None:
+            self.lines[found] = line
+        elif end is not None:
+            self.lines.insert(end, line)
+        else:
+            self.lines.extend([f"[{section}]", line])
+
+        lockfile: Lockfile = Lockfile(self.pathname)
+        if not lockfile.hold_for_update():
+            raise self.LockDenied(f"Could not acquire lock on file: {self.pathname}")
+        lockfile.write("".join(f"{line}\n" for line in self.lines))
+        lockfile.commit()
+
+    def _entries(self) -> List[Tuple[int, str, str, str]]:
+        """
+        Return the line number, section, key and value of every setting, and
+        a line with an empty key for every section header.
+        """
+        entries: List[Tuple[int, str, str, str]] = []
+        section: str = ""
+        for i, line in enumerate(self.lines):
+            text: str = line.strip()
+            if not text or text[0] in "#;":
+                continue
+            if text.startswith("["):
+                # A subsection, as in [remote "origin"], is part of the name
+                name, _, subsection = text[1 : text.index("]")].partition(" ")
+                section = name.lower()
+                if subsection:
+                    section += "." + subsection.strip('"')
+                entries.append((i, section, "", ""))
+                continue
+            key, _, value = text.partition("=")
+            entries.append((i, section, key.strip().lower(), value.strip()))
+        return entries
@@ -0,0 +1,98 @@
+import _socket  # the socket module's own imports would double pyg's startup
+import os
+import sys
+
+from .protocol import OK, PING, QUIT, STREAMS, encode_run
+
+
+class Client:
+    """
+    Has the pyg daemon of a repository run commands, if one is running.
+
+    The command runs in the daemon with this process's working directory,
+    environment and standard streams, which are passed over the socket, so
+    it reads and writes just as if it ran here.
+    """
+
+    RECEIVE_SIZE = 4096
+
+    def __init__(self, socket_path: str) -> None:
+        self.socket_path: str = socket_path
+
+    def run(self, argv: "list[str]") -> "int | None":
+        """
+        Run a command line in the daemon and return its exit status.
+
+        Returns None if no daemon answers, in which case the caller runs the
+        command itself. Once the daemon has taken the command, its status is
+        returned even if the daemon failed to run it.
+        """
+        connection = self._connect()
+        if connection is None:
+            return None
+        try:
+            message = encode_run(os.getcwd(), argv, dict(os.environ))
+            fds = b"".join(fd.to_bytes(4, sys.byteorder) for fd in STREAMS)
+            try:
+                sent = connection.sendmsg(
+                    [message], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)]
+                )
+                connection.sendall(message[sent:])
+                connection.shutdown(_socket.SHUT_WR)
+            except OSError:
+                # A partial message is never run
+                return None
+            answer = self._receive(connection)
+        finally:
+            connection.close()
+
+        try:
+            return int(answer)
+        except ValueError:
+            sys.stderr.write("fatal: the pyg daemon did not finish the command\n")
+            return 128
+
+    def ping(self) -> bool:
+        """Check whether a daemon is running."""
+        return self.request(PING) == OK
+
+    def quit(self) -> bool:
+        """Ask the daemon to stop, returning whether one was running."""
+        return self.request(QUIT) == OK
+
+    def request(self, message: bytes) -> "bytes | None":
+        """Send a request and return the whole answer, or None if none came."""
+        connection = self._connect()
+        if connection is None:
+            return None
+        try:
+            connection.sendall(message)
+            connection.shutdown(_socket.SHUT_WR)
+            return self._receive(connection)
+        except OSError:
+            return None
+        finally:
+            connection.close()
+
+    def _connect(self) -> "_socket.socket | None":
+        connection = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        try:
+            # Relative paths get around the short limit on socket paths
+            connection.connect(os.path.relpath(self.socket_path))
+        except OSError:
+            connection.close()
+            return None
+        return connection
+
+    def _receive(self, connection: "_socket.socket") -> bytes:
+        """Read an answer, which ends with a newline."""
+        chunks = []
+        while not chunks or not chunks[-1].endswith(b"\n"):
+            try:
+                chunk = connection.recv(self.RECEIVE_SIZE)
+            except OSError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
@@ -0,0 +1,39 @@
+# Only the standard library's builtins are used here and in the client, as
+# everything they import adds to the startup of every command
+
+import os
+
+# Where the daemon listens, within the .git directory
+SOCKET_NAME = "pyg-daemon.sock"
+
+# The kinds of request, each the first field of its message
+RUN = b"run"
+PING = b"ping"
+QUIT = b"quit"
+
+OK = b"ok\n"
+
+# The standard streams a client passes to have a command run on them
+STREAMS = (0, 1, 2)
+
+# Fields of a message are separated by NULs, which no path, argument or
+# environment variable can hold
+SEPARATOR = b"\0"
+
+
+def encode_run(cwd: str, argv: "list[str]", environ: "dict[str, str]") -> bytes:
+    """Make the message asking for a command line to be run."""
+    fields = [RUN, os.fsencode(cwd), b"%d" % len(argv)]
+    fields.extend(os.fsencode(arg) for arg in argv)
+    fields.extend(os.fsencode(f"{key}={value}") for key, value in environ.items())
+    return SEPARATOR.join(fields)
+
+
+def decode_run(fields: "list[bytes]") -> "tuple[str, list[str], dict[str, str]]":
+    """Read the working directory, arguments and environment of a command."""
+    count = int(fields[2])
+    argv = [os.fsdecode(arg) for arg in fields[3 : 3 + count]]
+    environ = dict(
+        os.fsdecode(variable).split("=", 1) for variable in fields[3 + count :]
+    )
+    return os.fsdecode(fields[1]), argv, environ
@@ -0,0 +1,244 @@
+import gc
+import os
+import selectors
+import socket
+import sys
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database.database import Database
+from database.tree import Tree
+from graph.graph import read_commit
+from graph.reader import CommitGraph
+from index.index import Index
+from refs import Refs
+import warm
+
+from .protocol import OK, PING, QUIT, RUN, SEPARATOR, STREAMS, decode_run
+
+# A child running a command, and the connection of the client waiting on it
+Child = Tuple[int, socket.socket]
+
+
+class Server:
+    """
+    Runs commands for clients with the repository already loaded.
+
+    Between commands the daemon keeps the index, its untracked cache and
+    fsmonitor state, the commit-graph and the open packs parsed in memory,
+    along with the inflated trees of HEAD, as described in warm.py, and
+    every command's modules imported. Each command runs in a child forked
+    for it, which has a copy of all of that, so it starts with nothing left
+    to load but what changed since, and whatever it does to its copy stays
+    in the child. The child takes the client's standard streams, working
+    directory and environment, and its exit status goes back to the client.
+
+    Children are watched through pidfds alongside the listening socket. Once
+    one has exited and its status has been sent, whatever the command wrote
+    is loaded again, so that the next command finds it warm.
+    """
+
+    BACKLOG = 16
+    RECEIVE_SIZE = 1 << 16
+    TIMEOUT = 5.0
+
+    def __init__(
+        self, root: Path, socket_path: Path, command: Callable[[List[str]], None]
+    ) -> None:
+        self.root: Path = root
+        self.socket_path: Path = socket_path
+        self.command: Callable[[List[str]], None] = command
+
+        git_path: Path = root.joinpath(".git")
+        self.refs: Refs = Refs(git_path)
+        self.index_path: Path = git_path.joinpath("index")
+
+        warm.keeping = True
+        self.database: Database = Database(git_path.joinpath("objects"))
+        self.head: Optional[str] = None
+
+        # Running children, by pidfd
+        self.children: Dict[int, Child] = {}
+        self.running: bool = False
+
+    def run(self) -> None:
+        """Serve commands until asked to quit and every command has finished."""
+        self.refresh()
+
+        server: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(os.path.relpath(self.socket_path))
+        server.listen(self.BACKLOG)
+        self.server: socket.socket = server
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(server, selectors.EVENT_READ)
+
+        self.running = True
+        try:
+            while self.running or self.children:
+                for key, _ in self.selector.select():
+                    if key.fileobj is server:
+                        self._serve(server)
+                    else:
+                        self._finish(key.fd)
+                if not self.running and server.fileno() >= 0:
+                    # Stop taking commands, but see running ones through
+                    self.selector.unregister(server)
+                    server.close()
+                    self.socket_path.unlink(missing_ok=True)
+        finally:
+            self.selector.close()
+            server.close()
+            if self.running:
+                self.socket_path.unlink(missing_ok=True)
+
+    def refresh(self) -> None:
+        """Load whatever changed since it was kept."""
+        # What was kept is let go of by the collector again, so that what the
+        # reload replaces can be freed, instead of piling up frozen
+        gc.unfreeze()
+
+        index: Index = Index(self.index_path)
+        if not all(
+            warm.is_current(path)
+            for path in (self.index_path, index.untracked_path, index.monitor_path)
+        ):
+            # The fsmonitor state only holds for the index it was written with
+            index.load()
+            index.untracked_cache()
+            index.monitor_state()
+
+        CommitGraph.load(self.database.pathname)
+        self.database.refresh_packs()
+
+        head: Optional[str] = self.refs.read_head()
+        if head and head != self.head:
+            self._load_tree(read_commit(self.database.read_object(head)[1])[0])
+            self.head = head
+
+        # Keep the collector from touching, and so copying, what children share
+        gc.collect()
+        gc.freeze()
+
+    def _load_tree(self, oid: str) -> None:
+        """Read a tree and its subtrees into the object cache."""
+        if self.database.cache.get(oid):
+            return
+        for entry in Tree.parse(self.database.read_object(oid)[1]).entries.values():
+            if entry.is_tree():
+                self._load_tree(entry.oid)
+
+    def _serve(self, server: socket.socket) -> None:
+        """Answer a request, starting a child for a command."""
+        connection, _ = server.accept()
+        connection.settimeout(self.TIMEOUT)
+        fds: List[int] = []
+        try:
+            data, fds, _, _ = socket.recv_fds(
+                connection, self.RECEIVE_SIZE, len(STREAMS)
+            )
+            chunks: List[bytes] = [data]
+            while chunks[-1]:
+                chunks.append(connection.recv(self.RECEIVE_SIZE))
+            fields: List[bytes] = b"".join(chunks).split(SEPARATOR)
+
+            if fields[0] == RUN and len(fds) == len(STREAMS):
+                self._start(connection, fields, fds)
+                return
+            if fields[0] == PING:
+                connection.sendall(OK)
+            elif fields[0] == QUIT:
+                self.running = False
+                connection.sendall(OK)
+        except OSError:
+            pass
+        finally:
+            for fd in fds:
+                os.close(fd)
+        connection.close()
+
+    def _start(
+        self, connection: socket.socket, fields: List[bytes], fds: List[int]
+    ) -> None:
+        """Fork a child to run a command, and watch for it to exit."""
+        pid: int = os.fork()
+        if pid == 0:
+            self._child(connection, fields, fds)
+        pidfd: int = os.pidfd_open(pid)
+        self.children[pidfd] = (pid, connection)
+        self.selector.register(pidfd, selectors.EVENT_READ)
+
+    def _finish(self, pidfd: int) -> None:
+        """Send the exit status of a child to its client."""
+        self.selector.unregister(pidfd)
+        os.close(pidfd)
+        pid, connection = self.children.pop(pidfd)
+        _, status = os.waitpid(pid, 0)
+
+        # A child killed by a signal exits as a shell reports it
+        code: int = os.waitstatus_to_exitcode(status)
+        with connection:
+            try:
+                connection.sendall(b"%d\n" % (code if code >= 0 else 128 - code))
+            except OSError:
+                pass
+
+        if self.running:
+            self.refresh()
+
+    def _child(
+        self, connection: socket.socket, fields: List[bytes], fds: List[int]
+    ) -> None:
+        """Run a command in a forked child on the client's behalf, then exit."""
+        code: int = 1
+        try:
+            # Nothing of the daemon's is left open but what the command uses
+            self.selector.close()
+            self.server.close()
+            for fd, (_, other) in self.children.items():
+                os.close(fd)
+                other.close()
+            connection.close()
+            for fd, stream in zip(fds, STREAMS):
+                os.dup2(fd, stream)
+                os.close(fd)
+            sys.stdin = open(0, "r", closefd=False)
+            sys.stdout = open(1, "w", 1 if os.isatty(1) else -1, closefd=False)
+            sys.stderr = open(2, "w", 1, errors="backslashreplace", closefd=False)
+
+            cwd, argv, environ = decode_run(fields)
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+            sys.argv = [sys.argv[0], *argv]
+            warm.keeping = False
+
+            code = self._run_command(argv)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+
+    def _run_command(self, argv: List[str]) -> int:
+        """Run a command as the interpreter would, returning its exit status."""
+        code: int = 0
+        try:
+            self.command(argv)
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                sys.stderr.write(f"{e.code}\n")
+                code = 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+        return code
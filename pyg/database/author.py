@@ -1,7 +1,13 @@
-from time import strftime, struct_time
+import re
+from time import localtime, strftime, struct_time
+from typing import Type, TypeVar
+
+T = TypeVar("T", bound="Author")
 
 
 class Author:
+    PATTERN = re.compile(r"(?P<name>.*) <(?P<email>.*)> (?P<timestamp>\d+) [+-]\d{4}")
+
     def __init__(self, name: str, email: str, time: struct_time) -> None:
         self.name: str = name
         self.email: str = email
@@ -10,3 +16,17 @@ class Author:
     def __str__(self) -> str:
         timestamp: str = strftime("%s %z", self.time)
         return f"{self.name} <{self.email}> {timestamp}"
+
+    @classmethod
+    def parse(cls: Type[T], string: str) -> T:
+        """
+        Reads an Author back from its serialized form.
+
+        The time is converted to local time, so the original time zone offset
+        is not preserved.
+        """
+        match = cls.PATTERN.fullmatch(string)
+        if not match:
+            raise Exception(f"Malformed author: {string}")
+        time: struct_time = localtime(int(match.group("timestamp")))
+        return cls(match.group("name"), match.group("email"), time)
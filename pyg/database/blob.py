@@ -1,4 +1,6 @@
-from typing import Optional
+from typing import Optional, Type, TypeVar
+
+T = TypeVar("T", bound="Blob")
 
 
 class Blob:
@@ -9,3 +11,8 @@ class Blob:
 
     def __bytes__(self) -> bytes:
         return self.data
+
+    @classmethod
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Reads a Blob back from its serialized form."""
+        return cls(data)
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Optional, Tuple
+
+
+class Cache:
+    """
+    A least-recently-used cache of inflated objects, bounded by total bytes.
+
+    Values are (type, data) pairs; only the size of the data counts towards
+    the limit. A lock keeps the cache consistent when threads share a
+    database, as checkout's writers do.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit: int = limit
+        self.size: int = 0
+        self.items: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self.lock: Lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        """Return a cached value, marking it as recently used."""
+        with self.lock:
+            value: Optional[Tuple[str, bytes]] = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Tuple[str, bytes]) -> None:
+        """Cache a value, evicting the least recently used ones over the limit."""
+        size: int = len(value[1])
+        if size > self.limit:
+            return
+
+        with self.lock:
+            old: Optional[Tuple[str, bytes]] = self.items.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+
+            self.items[key] = value
+            self.size += size
+            while self.size > self.limit:
+                _, (_, data) = self.items.popitem(last=False)
+                self.size -= len(data)
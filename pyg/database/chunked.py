@@ -0,0 +1,157 @@
+from hashlib import sha1
+from io import BufferedIOBase
+from typing import Iterator, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T", bound="Manifest")
+
+# The value each byte takes in the rolling hash: the byte values in an order
+# picked by their SHA-1. Boundaries, and so oids, depend on it, so it must
+# never change.
+GEAR: bytes = bytes(sorted(range(256), key=lambda b: sha1(bytes([b])).digest()))
+
+
+class Chunker:
+    """
+    Splits a stream into chunks at content-defined boundaries.
+
+    A boundary falls after a byte where a gear hash of the WINDOW bytes up to
+    it has some bits all zero, so it depends only on the bytes around it: an
+    edit moves the boundaries near it, but the chunks before and after come
+    out the same as they were, whatever the bytes are. As in FastCDC,
+    boundaries are never placed within MIN_SIZE of the last one, and more
+    bits must be zero before AVERAGE_SIZE than after it, which keeps sizes
+    close to the average.
+
+    Rolling the hash a byte at a time would be far too slow in Python, so it
+    is found for every byte of a piece at once. Each byte's gear value is put
+    in a 32-bit lane of one large integer, and multiplying that by a bit at
+    every 33rd place adds up each window's values, each shifted left by its
+    distance from the window's end, as a gear hash does. A window is short
+    enough that no lane overflows into the next, and the bytes whose hash
+    has the bits zero are then found with bytearray.find.
+    """
+
+    MIN_SIZE = 256 << 10
+    AVERAGE_SIZE = 1 << 20
+    MAX_SIZE = 4 << 20
+
+    # Bytes read from the stream at a time, enough for several chunks, and
+    # hashed at a time, small enough to keep the lanes in memory
+    READ_SIZE = 16 << 20
+    HASH_SIZE = 1 << 20
+
+    # Eight-bit values shifted by up to 23 sum to under 32 bits
+    WINDOW = 24
+    LANES: int = sum(1 << (33 * k) for k in range(WINDOW))
+
+    def split(self, f: BufferedIOBase) -> Iterator[bytes]:
+        """Yield the chunks of a stream in order."""
+        data: bytearray = bytearray()
+        strict: bytearray = bytearray()
+        loose: bytearray = bytearray()
+        tail: bytes = b""
+        start: int = 0
+        eof: bool = False
+        while True:
+            if not eof and len(data) - start < self.MAX_SIZE:
+                del data[:start], strict[:start], loose[:start]
+                start = 0
+                block: bytes = f.read(self.READ_SIZE)
+                eof = not block
+                for offset in range(0, len(block), self.HASH_SIZE):
+                    piece: bytes = tail + block[offset : offset + self.HASH_SIZE]
+                    marks: Tuple[bytes, bytes] = self._marks(piece)
+                    strict += marks[0][len(tail) :]
+                    loose += marks[1][len(tail) :]
+                    tail = piece[1 - self.WINDOW :]
+                data += block
+                continue
+            if start == len(data):
+                return
+
+            end: int = self._boundary(
+                strict, loose, start, min(len(data), start + self.MAX_SIZE)
+            )
+            yield bytes(data[start:end])
+            start = end
+
+    def _marks(self, piece: bytes) -> Tuple[bytes, bytes]:
+        """
+        Hash the window ending at each byte of a piece, returning for each
+        byte whether its strict and its loose bits are all zero, as a zero.
+        """
+        size: int = len(piece)
+        lanes: bytearray = bytearray(4 * size)
+        lanes[::4] = piece.translate(GEAR)
+        hashes: bytes = (int.from_bytes(lanes, "little") * self.LANES).to_bytes(
+            4 * (size + self.WINDOW), "little"
+        )
+
+        # The strict bits are the low three bytes of a hash, all zero once in
+        # 16M bytes, and the loose bits the two above the lowest, once in 64K
+        first, second, third = (
+            int.from_bytes(hashes[i : 4 * size : 4], "little") for i in range(3)
+        )
+        return (
+            (first | second | third).to_bytes(size, "little"),
+            (second | third).to_bytes(size, "little"),
+        )
+
+    def _boundary(
+        self, strict: bytearray, loose: bytearray, start: int, limit: int
+    ) -> int:
+        """Return where the chunk starting at an offset ends."""
+        low: int = start + self.MIN_SIZE
+        if low >= limit:
+            return limit
+        middle: int = min(start + self.AVERAGE_SIZE, limit)
+
+        found: int = strict.find(0, low, middle)
+        if found >= 0:
+            return found + 1
+        found = loose.find(0, middle, limit)
+        if found >= 0:
+            return found + 1
+        return limit
+
+
+class Manifest:
+    """
+    The list of chunks that make up a large file, stored as a blob.
+
+    Like a Git LFS pointer, it is a short text file that stands in for the
+    file's contents in trees and the index:
+
+        pyg chunked blob 1
+        size <size of the whole file>
+        <oid of a chunk> <size of the chunk>
+        ...
+    """
+
+    HEADER = b"pyg chunked blob 1\n"
+
+    def __init__(self, chunks: Optional[List[Tuple[str, int]]] = None) -> None:
+        self.chunks: List[Tuple[str, int]] = chunks or []
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size in self.chunks)
+
+    def __bytes__(self) -> bytes:
+        lines: List[bytes] = [self.HEADER, f"size {self.size}\n".encode("ascii")]
+        lines.extend(f"{oid} {size}\n".encode("ascii") for oid, size in self.chunks)
+        return b"".join(lines)
+
+    @classmethod
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Reads a Manifest back from its serialized form."""
+        if not data.startswith(cls.HEADER):
+            raise Exception("Chunked blob manifest has no header")
+        lines: List[bytes] = data[len(cls.HEADER) :].splitlines()
+        manifest: T = cls()
+        for line in lines[1:]:
+            oid, size = line.split(b" ")
+            manifest.chunks.append((oid.decode("ascii"), int(size)))
+        if lines[:1] != [f"size {manifest.size}".encode("ascii")]:
+            raise Exception("Chunked blob manifest does not match its chunks")
+        return manifest
@@ -1,7 +1,9 @@
-from typing import Optional
+from typing import Dict, Optional, Type, TypeVar
 
 from .author import Author
 
+T = TypeVar("T", bound="Commit")
+
 
 class Commit:
     def __init__(
@@ -25,3 +27,21 @@ class Commit:
         lines.append(self.message)
 
         return b"\n".join([bytes(line, "utf-8") for line in lines])
+
+    @classmethod
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Reads a Commit back from its serialized form."""
+        text: str = data.decode("utf-8")
+        headers_text, _, message = text.partition("\n\n")
+
+        headers: Dict[str, str] = {}
+        for line in headers_text.split("\n"):
+            key, _, value = line.partition(" ")
+            headers.setdefault(key, value)
+
+        return cls(
+            headers.get("parent"),
+            headers["tree"],
+            Author.parse(headers["author"]),
+            message,
+        )
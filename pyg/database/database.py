@@ -1,19 +1,261 @@
+import ctypes
+import os
 import random
+import re
 import string
 import zlib
+from contextlib import contextmanager
 from hashlib import sha1
+from io import BufferedIOBase
 from pathlib import Path
-from typing import BinaryIO, Union
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from config import Config
+from pack.pack import BITMAP_SUFFIX
+from pack.reader import Reader
+import tracing
+import warm
 
 from .blob import Blob
+from .cache import Cache
+from .chunked import Chunker, Manifest
 from .commit import Commit
 from .tree import Tree
 
 
 class Database:
+    # Files up to this size are read into memory in one go; larger files are
+    # streamed through a buffer of STREAM_BUFFER_SIZE bytes
+    BIG_FILE_THRESHOLD = 1 << 20
+    STREAM_BUFFER_SIZE = 1 << 16
+
+    # Bytes read and inflated at a time when only an object's header is wanted
+    HEADER_READ_SIZE = 64
+
+    OBJECT_DIR = re.compile(r"[0-9a-f]{2}")
+    OBJECT_NAME = re.compile(r"[0-9a-f]{38}")
+
+    # Bytes of inflated objects and delta bases kept in memory
+    CACHE_SIZE = 64 << 20
+
+    # Files of at least this many bytes, with a k, m or g suffix, are stored
+    # as chunks and a manifest; chunking is off unless the repository sets
+    # it, which it does when it is created, so every command hashes a file
+    # to the same oid
+    CHUNK_THRESHOLD_SETTING = ("pyg", "chunkThreshold")
+    SIZE_SUFFIXES = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+
+    # The oids of the manifests of chunked blobs, one per line. A manifest
+    # is an ordinary blob, and only being listed here makes it stand for the
+    # chunks it lists, so no file is ever taken for a manifest because of
+    # what it holds.
+    CHUNKED_LIST = ("info", "pyg-chunked")
+
+    # How objects are made durable, like Git's core.fsync and fsyncMethod:
+    # not at all, with a barrier for each batch of objects, or one by one.
+    # Objects stored outside a batch are synced one by one in batch mode.
+    FSYNC_VARIABLE = "PYG_FSYNC"
+    FSYNC_NONE = "none"
+    FSYNC_BATCH = "batch"
+    FSYNC_OBJECT = "object"
+    FSYNC_MODES = (FSYNC_NONE, FSYNC_BATCH, FSYNC_OBJECT)
+
+    TEMP_PREFIX = "tmp_obj_"
+
+    TYPES: Dict[str, Type[Union[Blob, Commit, Tree]]] = {
+        "blob": Blob,
+        "commit": Commit,
+        "tree": Tree,
+    }
+
     def __init__(self, pathname: Path) -> None:
         self.pathname: Path = pathname
+        self.directory: str = os.fspath(pathname)
+
+        # Objects never change, so the inflated objects and open packs of a
+        # database kept by the daemon can be used for as long as it runs
+        kept: Optional[Database] = warm.take(pathname)
+        self.cache: Cache = kept.cache if kept else Cache(self.CACHE_SIZE)
+        self.packs: Optional[List[Reader]] = kept.packs if kept else None
+        warm.keep(pathname, self)
+        self.chunk_threshold: Optional[int] = self._chunk_threshold()
+        self.chunked: Optional[Set[str]] = None
+        self.fsync: str = self._fsync_mode()
+
+        # Objects written during a batch, by oid, at their temporary paths
+        self.pending: Optional[Dict[str, Path]] = None
+
+    def _chunk_threshold(self) -> Optional[int]:
+        config: Config = Config(Path(self.pathname).parent.joinpath("config"))
+        config.load()
+        value: Optional[str] = config.get(*self.CHUNK_THRESHOLD_SETTING)
+        return None if value is None else self.parse_size(value)
+
+    @classmethod
+    def parse_size(cls, value: str) -> int:
+        """Turn a size in bytes, with an optional k, m or g suffix, into bytes."""
+        value = value.strip().lower()
+        scale: int = cls.SIZE_SUFFIXES.get(value[-1:], 1)
+        number: str = value[:-1] if value[-1:] in cls.SIZE_SUFFIXES else value
+        if not number.isdigit():
+            raise ValueError(f"Invalid size: {value}")
+        return int(number) * scale
+
+    def is_chunked(self, oid: str) -> bool:
+        """Check whether a blob is the manifest of a chunked blob."""
+        if self.chunked is None:
+            self.chunked = set()
+            try:
+                with open(self._chunked_path(), "r") as f:
+                    self.chunked.update(f.read().split())
+            except FileNotFoundError:
+                pass
+        return oid in self.chunked
+
+    def _register_chunked(self, oid: str) -> None:
+        """
+        List a manifest as standing for a chunked blob, before the manifest
+        itself is stored, so that nothing can point at it unlisted.
+        """
+        if self.is_chunked(oid):
+            return
+        path: Path = self._chunked_path()
+        path.parent.mkdir(exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(f"{oid}\n".encode("ascii"))
+            self._sync_file(f)
+        if self.chunked is not None:
+            self.chunked.add(oid)
+
+    def _chunked_path(self) -> Path:
+        return Path(self.pathname).joinpath(*self.CHUNKED_LIST)
+
+    def _fsync_mode(self) -> str:
+        mode: str = os.environ.get(self.FSYNC_VARIABLE, self.FSYNC_BATCH).strip()
+        if mode not in self.FSYNC_MODES:
+            raise Exception(f"Unknown {self.FSYNC_VARIABLE} mode: {mode}")
+        return mode
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Store objects as one batch that is made durable as a whole.
+
+        In batch mode, objects are written to temporary files and left there,
+        so none of them can be seen until the end of the batch. Then a single
+        barrier makes every one durable before they are renamed into place,
+        and a second makes the renames durable, so that refs updated after
+        the batch never point at objects a crash could lose or leave empty.
+        If the batch fails, its temporary files are removed.
+        """
+        if self.fsync != self.FSYNC_BATCH or self.pending is not None:
+            yield
+            return
+
+        self.pending = {}
+        try:
+            yield
+            if self.pending:
+                self._barrier()
+                for oid, temp_path in self.pending.items():
+                    self._rename_object(temp_path, self._object_path(oid))
+                self._barrier()
+        except BaseException:
+            for temp_path in self.pending.values():
+                temp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            self.pending = None
 
+    def take_pending(self) -> Dict[str, Path]:
+        """Hand over the objects written so far in a batch to another database."""
+        pending: Dict[str, Path] = self.pending or {}
+        if self.pending is not None:
+            self.pending = {}
+        return pending
+
+    def adopt_pending(self, pending: Dict[str, Path]) -> None:
+        """Add objects written by another database to the current batch."""
+        for oid, temp_path in pending.items():
+            if self.pending is None:
+                self._rename_object(temp_path, self._object_path(oid))
+            elif oid in self.pending:
+                # Another worker wrote the same object
+                temp_path.unlink()
+            else:
+                self.pending[oid] = temp_path
+
+    @tracing.traced("database.barrier")
+    def _barrier(self) -> None:
+        """Flush everything written to the filesystem of the database to disk."""
+        fd: int = os.open(self.pathname, os.O_RDONLY)
+        try:
+            syncfs = getattr(ctypes.CDLL(None, use_errno=True), "syncfs", None)
+            if syncfs is None:
+                os.sync()
+            elif syncfs(fd) != 0:
+                errno: int = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno))
+        finally:
+            os.close(fd)
+
+    def _sync_file(self, f: BinaryIO) -> None:
+        """Make a file durable if objects are synced one by one."""
+        if self.fsync == self.FSYNC_OBJECT or (
+            self.fsync == self.FSYNC_BATCH and self.pending is None
+        ):
+            with tracing.span("database.fsync"):
+                f.flush()
+                os.fsync(f.fileno())
+
+    @tracing.traced("database.make_durable")
+    def make_durable(self, paths: Iterable[Path]) -> None:
+        """
+        Make files written in place of others durable, along with the renames
+        that put them there, before what they replace is deleted; otherwise a
+        crash could lose both. Packs and objects loosened from them are
+        written this way, and the objects they hold deleted afterwards.
+        """
+        if self.fsync == self.FSYNC_NONE:
+            return
+        if self.fsync == self.FSYNC_BATCH:
+            self._barrier()
+            return
+
+        dirnames: Set[Path] = set()
+        for path in paths:
+            dirnames.add(path.parent)
+            fd: int = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        for dirname in dirnames:
+            fd = os.open(dirname, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _publish(self, temp_path: Path, oid: str) -> None:
+        """Move a written object into place, or leave it for the end of the batch."""
+        if self.pending is not None:
+            self.pending[oid] = temp_path
+        else:
+            self._rename_object(temp_path, self._object_path(oid))
+
+    @tracing.traced("database.store")
     def store(self, obj: Union[Blob, Commit, Tree]) -> None:
         string: bytes = bytes(obj)
         length: str = str(len(string))
@@ -23,30 +265,439 @@ class Database:
         obj.oid = sha1(content).hexdigest()
         self._write_object(obj.oid, content)
 
+    def load(self, oid: str) -> Union[Blob, Commit, Tree]:
+        """Read an object from the database and parse it."""
+        obj_type, data = self.read_object(oid)
+        if obj_type == "blob" and self.is_chunked(oid):
+            data = b"".join(self.blob_contents(oid))
+        obj: Union[Blob, Commit, Tree] = self.TYPES[obj_type].parse(data)
+        obj.oid = oid
+        return obj
+
+    def read_object(self, oid: str) -> Tuple[str, bytes]:
+        """
+        Read the type and contents of an object.
+
+        Loose objects are checked first, then every pack. Results are kept in a
+        least-recently-used cache bounded to CACHE_SIZE bytes.
+        """
+        result: Optional[Tuple[str, bytes]] = self.find_object(oid)
+        if result is None:
+            raise Exception(f"Object {oid} not found")
+        return result
+
+    def find_object(self, oid: str) -> Optional[Tuple[str, bytes]]:
+        """Read the type and contents of an object, or None if it is not stored."""
+        cached: Optional[Tuple[str, bytes]] = self.cache.get(oid)
+        if cached:
+            return cached
+
+        try:
+            with open(self._object_file(oid), "rb") as f:
+                content: bytes = zlib.decompress(f.read())
+            header, data = content.split(b"\0", 1)
+            obj_type: str = header.decode("utf-8").split(" ")[0]
+            result: Tuple[str, bytes] = (obj_type, data)
+        except FileNotFoundError:
+            found: Optional[Tuple[Reader, int]] = self._find_packed(oid)
+            if not found:
+                return None
+            pack, offset = found
+            result = pack.read(offset)
+
+        self.cache.put(oid, result)
+        return result
+
+    def read_info(self, oid: str) -> Optional[Tuple[str, int]]:
+        """
+        Read the type and size of an object, or None if it is not stored.
+
+        Only as much of the object is inflated as its header needs, and
+        nothing is added to the cache.
+        """
+        cached: Optional[Tuple[str, bytes]] = self.cache.get(oid)
+        if cached:
+            return cached[0], len(cached[1])
+
+        try:
+            with open(self._object_file(oid), "rb") as f:
+                decompressor = zlib.decompressobj()
+                head: bytes = b""
+                while b"\0" not in head:
+                    data: bytes = decompressor.unconsumed_tail or f.read(
+                        self.HEADER_READ_SIZE
+                    )
+                    if not data:
+                        raise Exception(f"Object {oid} has no header")
+                    head += decompressor.decompress(data, self.HEADER_READ_SIZE)
+        except FileNotFoundError:
+            found: Optional[Tuple[Reader, int]] = self._find_packed(oid)
+            if not found:
+                return None
+            pack, offset = found
+            return pack.read_info(offset)
+
+        obj_type, size = head.split(b"\0", 1)[0].decode("utf-8").split(" ")
+        return obj_type, int(size)
+
+    def blob_contents(self, oid: str) -> Iterator[bytes]:
+        """
+        Yield the contents of a blob in pieces, putting a chunked blob back
+        together, so that a reader that stops early reads no more.
+        """
+        if self.is_chunked(oid):
+            data: bytes = self.read_object(oid)[1]
+            for chunk_oid, _ in Manifest.parse(data).chunks:
+                yield self.read_object(chunk_oid)[1]
+            return
+        with self.open_object(oid) as (obj_type, _, contents):
+            if obj_type != "blob":
+                raise Exception(f"{oid} is a {obj_type}, not a blob")
+            yield from contents
+
+    def has_object(self, oid: str) -> bool:
+        """Check whether an object is stored, either loose or in a pack."""
+        if self.pending and oid in self.pending:
+            return True
+        return (
+            os.path.exists(self._object_file(oid)) or self._find_packed(oid) is not None
+        )
+
+    def _is_written(self, oid: str) -> bool:
+        """
+        Check whether an object about to be written is stored already.
+
+        Unlike has_object, the pack directory is not scanned again when the
+        object is not found, as nearly every object written is new; at worst
+        an object packed meanwhile is written loose as well.
+        """
+        if self.pending and oid in self.pending:
+            return True
+        return (
+            os.path.exists(self._object_file(oid))
+            or self._find_packed(oid, rescan=False) is not None
+        )
+
+    def _find_packed(
+        self, oid: str, rescan: bool = True
+    ) -> Optional[Tuple[Reader, int]]:
+        """Find the pack holding an object, rescanning once for new packs."""
+        binary: bytes = bytes.fromhex(oid)
+        for reload in (False, True) if rescan else (False,):
+            for pack in self._load_packs(reload):
+                offset: Optional[int] = pack.lookup(binary)
+                if offset is not None:
+                    return pack, offset
+        return None
+
+    def _load_packs(self, reload: bool = False) -> List[Reader]:
+        """Open every pack in the database, keeping packs that are already open."""
+        if self.packs is not None and not reload:
+            return self.packs
+
+        opened: Dict[Path, Reader] = {pack.idx_path: pack for pack in self.packs or []}
+        pack_dir: Path = Path(self.pathname).joinpath("pack")
+        idx_paths: List[Path] = sorted(pack_dir.glob("pack-*.idx"))
+        self.packs = [
+            opened.get(path) or Reader(path, self.cache) for path in idx_paths
+        ]
+        return self.packs
+
+    def bitmapped_pack(self) -> Optional[Reader]:
+        """Return the pack with reachability bitmaps, if there is one."""
+        for pack in self._load_packs():
+            if pack.bitmaps():
+                return pack
+        return None
+
+    def remove_pack(self, pack: Reader) -> None:
+        """
+        Delete a pack, with its index first, as that is what makes the pack
+        visible to readers, and its bitmaps.
+        """
+        for suffix in (".idx", ".pack", BITMAP_SUFFIX):
+            pack.idx_path.with_suffix(suffix).unlink(missing_ok=True)
+        if self.packs is not None and pack in self.packs:
+            self.packs.remove(pack)
+
+    def refresh_packs(self) -> None:
+        """Open packs added since the packs were opened, and close removed ones."""
+        self._load_packs(reload=True)
+
+    @tracing.traced("database.store_stream")
+    def store_stream(self, f: BufferedIOBase, size: int) -> str:
+        """
+        Store the contents of a file as a blob and return its oid.
+
+        Large files are hashed and compressed incrementally, so memory use is
+        bounded by the buffer size rather than by the size of the file.
+        """
+        if self.chunk_threshold is not None and size >= self.chunk_threshold:
+            return self._store_chunked(f, write=True)
+        if size <= self.BIG_FILE_THRESHOLD:
+            blob: Blob = Blob(f.read())
+            self.store(blob)
+            if not isinstance(blob.oid, str):
+                raise Exception(f"Blob {blob} does not have a valid oid")
+            return blob.oid
+
+        header: bytes = bytes(f"blob {size}", "utf-8") + b"\0"
+        digest = sha1(header)
+        compressor = zlib.compressobj(level=1)
+
+        # The oid is only known at the end, so write to a temporary file at the
+        # top of the database and move it into place afterwards
+        temp_path: Path = Path(self.pathname).joinpath(
+            f"{self.TEMP_PREFIX}{self._generate_temp_name()}"
+        )
+        buffer: bytearray = bytearray(self.STREAM_BUFFER_SIZE)
+        view: memoryview = memoryview(buffer)
+        total: int = 0
+        try:
+            with open(temp_path, "xb") as out:
+                out.write(compressor.compress(header))
+                while True:
+                    n: int = f.readinto(buffer)
+                    if not n:
+                        break
+                    digest.update(view[:n])
+                    out.write(compressor.compress(view[:n]))
+                    total += n
+                out.write(compressor.flush())
+                written: int = out.tell()
+                self._sync_file(out)
+
+            if total != size:
+                raise Exception(f"Expected {size} bytes but read {total}")
+        except BaseException:
+            temp_path.unlink()
+            raise
+
+        oid: str = digest.hexdigest()
+        if self._is_written(oid):
+            temp_path.unlink()
+        else:
+            self._publish(temp_path, oid)
+            tracing.count(objects=1, bytes=written)
+        return oid
+
+    def hash_stream(self, f: BufferedIOBase, size: int) -> str:
+        """Return the oid a file would have as a blob, without storing it."""
+        if self.chunk_threshold is not None and size >= self.chunk_threshold:
+            return self._store_chunked(f, write=False)
+        if size <= self.BIG_FILE_THRESHOLD:
+            data: bytes = f.read()
+            return sha1(bytes(f"blob {len(data)}", "utf-8") + b"\0" + data).hexdigest()
+
+        digest = sha1(bytes(f"blob {size}", "utf-8") + b"\0")
+        buffer: bytearray = bytearray(self.STREAM_BUFFER_SIZE)
+        view: memoryview = memoryview(buffer)
+        total: int = 0
+        while True:
+            n: int = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+            total += n
+        if total != size:
+            raise Exception(f"Expected {size} bytes but read {total}")
+        return digest.hexdigest()
+
+    def _store_chunked(self, f: BufferedIOBase, write: bool) -> str:
+        """
+        Store a file as content-defined chunks and a manifest, returning its oid.
+
+        Chunks are ordinary blobs, so those the database already has, which
+        after an edit is all but the few around it, are neither compressed
+        nor written again.
+        """
+        manifest: Manifest = Manifest()
+        for chunk in Chunker().split(f):
+            content: bytes = b"blob %d\0" % len(chunk) + chunk
+            oid: str = sha1(content).hexdigest()
+            if write:
+                self._write_object(oid, content)
+            manifest.chunks.append((oid, len(chunk)))
+
+        blob: Blob = Blob(bytes(manifest))
+        oid = sha1(b"blob %d\0" % len(blob.data) + blob.data).hexdigest()
+        if write:
+            self._register_chunked(oid)
+            self.store(blob)
+        return oid
+
+    def list_objects(self) -> Iterator[str]:
+        """Yield the oids of all loose objects in sorted order."""
+        for dirname in sorted(os.listdir(self.pathname)):
+            if not self.OBJECT_DIR.fullmatch(dirname):
+                continue
+            for name in sorted(os.listdir(Path(self.pathname).joinpath(dirname))):
+                if self.OBJECT_NAME.fullmatch(name):
+                    yield dirname + name
+
+    def loosen(self, oid: str, obj_type: str, data: bytes, mtime: float) -> Path:
+        """
+        Write an object as a loose object, even if a pack has it, and give it
+        a modification time, so that it ages from when it was packed. Returns
+        the path of the loose object.
+        """
+        object_path: Path = self._object_path(oid)
+        if object_path.exists():
+            return object_path
+        temp_path: Path = Path(self.pathname).joinpath(
+            f"{self.TEMP_PREFIX}{self._generate_temp_name()}"
+        )
+        with open(temp_path, "xb") as f:
+            content: bytes = b"%s %d\0" % (obj_type.encode("utf-8"), len(data)) + data
+            f.write(zlib.compress(content, level=1))
+            self._sync_file(f)
+        os.utime(temp_path, (mtime, mtime))
+        self._rename_object(temp_path, object_path)
+        return object_path
+
+    def remove_objects(self, oids: Iterable[str]) -> None:
+        """Delete loose objects, and any fanout directories left empty."""
+        dirnames: Set[Path] = set()
+        for oid in oids:
+            object_path: Path = self._object_path(oid)
+            object_path.unlink(missing_ok=True)
+            dirnames.add(object_path.parent)
+
+        for dirname in dirnames:
+            try:
+                dirname.rmdir()
+            except OSError:
+                pass
+
+    def prune(self, oids: Iterable[str], cutoff: float) -> int:
+        """
+        Delete those of some loose objects last modified no later than a
+        cutoff time, returning how many went, along with any temporary files
+        as old, which writes that failed left behind.
+        """
+        expired: List[str] = []
+        for oid in oids:
+            try:
+                if os.stat(self._object_file(oid)).st_mtime <= cutoff:
+                    expired.append(oid)
+            except FileNotFoundError:
+                pass
+        self.remove_objects(expired)
+
+        for dirname in [self.directory] + [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if self.OBJECT_DIR.fullmatch(name)
+        ]:
+            for name in os.listdir(dirname):
+                if not name.startswith(self.TEMP_PREFIX):
+                    continue
+                path: str = os.path.join(dirname, name)
+                try:
+                    if os.stat(path).st_mtime <= cutoff:
+                        os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+        return len(expired)
+
+    @contextmanager
+    def open_object(self, oid: str) -> Iterator[Tuple[str, int, Iterator[bytes]]]:
+        """
+        Open an object, yielding its type, size and a stream of its contents.
+
+        The contents are inflated in pieces of at most STREAM_BUFFER_SIZE bytes,
+        so objects of any size can be read with bounded memory. An object
+        that is only in a pack is read whole, as packs are read.
+        """
+        try:
+            f: BinaryIO = open(self._object_file(oid), "rb")
+        except FileNotFoundError:
+            obj_type, data = self.read_object(oid)
+            yield obj_type, len(data), iter((data,))
+            return
+
+        with f:
+            chunks: Iterator[bytes] = self._inflate(f)
+
+            # The header is "<type> <size>\0", found within the first chunks
+            head: bytes = b""
+            while b"\0" not in head:
+                chunk: Optional[bytes] = next(chunks, None)
+                if chunk is None:
+                    raise Exception(f"Object {oid} has no header")
+                head += chunk
+            header, rest = head.split(b"\0", 1)
+            obj_type, size = header.decode("utf-8").split(" ")
+
+            def contents() -> Iterator[bytes]:
+                if rest:
+                    yield rest
+                yield from chunks
+
+            yield obj_type, int(size), contents()
+
+    def _inflate(self, f: BinaryIO) -> Iterator[bytes]:
+        """Decompress a zlib stream from a file in bounded pieces."""
+        decompressor = zlib.decompressobj()
+        while not decompressor.eof:
+            data: bytes = decompressor.unconsumed_tail or f.read(
+                self.STREAM_BUFFER_SIZE
+            )
+            if not data:
+                raise Exception("Unexpected end of compressed data")
+            chunk: bytes = decompressor.decompress(data, self.STREAM_BUFFER_SIZE)
+            if chunk:
+                yield chunk
+
+    def _object_file(self, oid: str) -> str:
+        """
+        Returns the path of a loose object as a string, which is much cheaper
+        to make than a Path when the object is only to be opened.
+        """
+        return f"{self.directory}/{oid[0:2]}/{oid[2:]}"
+
+    def _object_path(self, oid: str) -> Path:
+        """Returns the path of a loose object on disk."""
+        return Path(self.pathname).joinpath(oid[0:2]).joinpath(oid[2:])
+
+    def _rename_object(self, temp_path: Path, object_path: Path) -> None:
+        """Atomically move a fully written temporary file to an object's path."""
+        try:
+            temp_path.rename(object_path)
+        except FileNotFoundError:
+            object_path.parent.mkdir(exist_ok=True)
+            temp_path.rename(object_path)
+
+    @tracing.traced("database.write_object")
     def _write_object(self, oid: str, content: bytes) -> None:
         # Create the path of the object on disk
-        object_path: Path = Path(self.pathname).joinpath(oid[0:2]).joinpath(oid[2:])
+        object_path: Path = self._object_path(oid)
 
         # Save time writing the object if it already exists on disk
-        if object_path.exists():
+        if self._is_written(oid):
             return
 
         # Write to a temporary file so that the "write" to the object's path is atomic
         dirname: Path = object_path.parent
-        temp_path: Path = dirname.joinpath(self._generate_temp_name())
+        temp_path: Path = dirname.joinpath(
+            f"{self.TEMP_PREFIX}{self._generate_temp_name()}"
+        )
         try:
             f: BinaryIO = open(temp_path, "xb")
         except FileNotFoundError:
-            Path(dirname).mkdir()
+            Path(dirname).mkdir(exist_ok=True)
             f = open(temp_path, "xb")
 
         # Write compressed object to temporary file using fastest speed (level=1)
         compressed: bytes = zlib.compress(content, level=1)
         f.write(compressed)
+        self._sync_file(f)
         f.close()
 
         # Atomically "write" to object's path
-        temp_path.rename(object_path)
+        self._publish(temp_path, oid)
+        tracing.count(objects=1, bytes=len(compressed))
 
     def _generate_temp_name(self) -> str:
         return "".join(random.choices(string.ascii_letters + string.digits, k=6))
@@ -0,0 +1,14 @@
+from typing import NamedTuple
+
+from entry import Entry as WorkspaceEntry
+
+
+class Entry(NamedTuple):
+    """An entry of a Tree that has been read back from the database."""
+
+    oid: str
+    mode: str
+
+    def is_tree(self) -> bool:
+        """Returns whether the entry points at another Tree."""
+        return self.mode == WorkspaceEntry.DIRECTORY_MODE
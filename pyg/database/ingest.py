@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from os import stat_result
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .database import Database
+
+# Database handle of a worker process, set up once by _init_worker
+_database: Optional[Database] = None
+
+
+def _init_worker(pathname: Path, batch: bool) -> None:
+    global _database
+    _database = Database(pathname)
+
+    # Objects are left for the parent to publish with the rest of its batch
+    if batch:
+        _database.pending = {}
+
+
+def _store_file(item: Tuple[Path, int]) -> Tuple[str, Dict[str, Path]]:
+    """
+    Hash, compress and store a single file in a worker process, returning its
+    oid and the objects written for it that are pending in a batch.
+    """
+    pathname, size = item
+    if not _database:
+        raise Exception("Worker process was not initialized with a database")
+    with open(pathname, "rb") as f:
+        oid: str = _database.store_stream(f, size)
+    return oid, _database.take_pending()
+
+
+class Ingest:
+    """
+    Stores the blobs of many files, spreading the work over worker processes.
+
+    SHA-1 and zlib keep one core busy per file, so a pool of processes lets a
+    large add scale with the number of cores, while a small one is stored
+    without the cost of starting the pool. Results come back in the same
+    order the files were given, so callers see a deterministic sequence.
+    """
+
+    # Number of batches handed to each worker, balancing scheduling overhead
+    # against uneven file sizes
+    BATCHES_PER_JOB = 4
+    MAX_BATCH_SIZE = 64
+
+    # Starting a pool takes tens of milliseconds, about as long as storing a
+    # hundred small files or a few MiB, so smaller adds are stored inline
+    MIN_POOL_FILES = 128
+    MIN_POOL_BYTES = 4 << 20
+
+    def __init__(self, database: Database, jobs: Optional[int] = None) -> None:
+        self.database: Database = database
+        self.jobs: int = jobs or os.cpu_count() or 1
+
+    def run(
+        self, files: Sequence[Tuple[Path, stat_result]]
+    ) -> Iterator[Tuple[Path, str, stat_result]]:
+        """Store every (path, stat) pair, yielding (path, oid, stat) in order."""
+        if (
+            self.jobs == 1
+            or len(files) < 2
+            or (
+                len(files) < self.MIN_POOL_FILES
+                and sum(stat.st_size for _, stat in files) < self.MIN_POOL_BYTES
+            )
+        ):
+            for pathname, stat in files:
+                with open(pathname, "rb") as f:
+                    yield pathname, self.database.store_stream(f, stat.st_size), stat
+            return
+
+        items: List[Tuple[Path, int]] = [(path, stat.st_size) for path, stat in files]
+        jobs: int = min(self.jobs, len(items))
+        batch: int = len(items) // (jobs * self.BATCHES_PER_JOB)
+        batch = max(1, min(batch, self.MAX_BATCH_SIZE))
+
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(self.database.pathname, self.database.pending is not None),
+        ) as executor:
+            results = executor.map(_store_file, items, chunksize=batch)
+            for (pathname, stat), (oid, pending) in zip(files, results):
+                self.database.adopt_pending(pending)
+                yield pathname, oid, stat
@@ -1,9 +1,8 @@
 from collections import OrderedDict
-from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, TypeVar, Type, Union
+from typing import Dict, List, Optional, TypeVar, Type, Union
 
-from .blob import Blob
 from .commit import Commit
+from .entry import Entry as DatabaseEntry
 
 from entry import Entry
 
@@ -13,7 +12,7 @@ T = TypeVar("T", bound="Tree")
 class Tree:
     def __init__(self) -> None:
         self.oid = None
-        self.entries: Dict[str, Union[Entry, Tree, None]] = OrderedDict()
+        self.entries: Dict[str, Union[Entry, DatabaseEntry, Tree, None]] = OrderedDict()
         self.type = "tree"
 
     def __str__(self) -> str:
@@ -49,52 +48,19 @@ class Tree:
         return b"".join(bytes_entries)
 
     @classmethod
-    def build(cls: Type[T], entries: List[Entry]) -> T:
-        """Constructs a set of Tree objects that reflect the entries list."""
-        entries.sort(key=lambda x: x.pathname)
-        root: T = cls()
-
-        for entry in entries:
-            parent_directories: List[Path] = entry.parent_directories()
-            root._add_entry(parent_directories, entry)
-
-        return root
-
-    def _add_entry(self, parents: List[Path], entry: Entry) -> None:
-        """Inserts Entry at the right point in the tree."""
-
-        # Add entry to tree if it has no parent directories
-        # Otherwise, add a tree to the tree and recurse
-        if not parents:
-            name: str = entry.name
-            self.entries[name] = entry
-        else:
-            # Get or create the tree for the top-most directory of parents
-            name = parents[0].name
-            tree: Union[Entry, Tree, None] = self.entries.get(name)
-            if not tree:
-                tree = Tree()
-                self.entries[name] = tree
-            elif not isinstance(tree, Tree):
-                raise Exception(f"{tree} is not a Tree")
-
-            # Call add_entry again, excluding the first element of parents
-            tree._add_entry(parents[1:], entry)
-
-    def traverse(self, store: Callable[[Any], None]) -> None:
-        """
-        Depth-first iteration over all self.entries. Call function on each node.
-        """
-        # Iterate over children first
-        for name, entry in self.entries.items():
-            # Has children
-            if isinstance(entry, Tree):
-                entry.traverse(store)
-            # Leaf node
-            elif isinstance(entry, Blob):
-                store(entry)
-        # Then store current node
-        store(self)
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Reads a Tree back from its serialized form."""
+        tree: T = cls()
+        offset: int = 0
+        while offset < len(data):
+            space: int = data.index(b" ", offset)
+            null: int = data.index(b"\0", space)
+            mode: str = data[offset:space].decode("utf-8")
+            name: str = data[space + 1 : null].decode("utf-8")
+            oid: str = data[null + 1 : null + 21].hex()
+            tree.entries[name] = DatabaseEntry(oid, mode)
+            offset = null + 21
+        return tree
 
     @property
     def mode(self) -> str:
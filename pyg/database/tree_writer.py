@@ -0,0 +1,46 @@
+from typing import Callable, List
+
+from entry import Entry as WorkspaceEntry
+
+from .entry import Entry as DatabaseEntry
+from .tree import Tree
+
+
+class TreeWriter:
+    """
+    Builds and stores trees from entries given in sorted order, bottom up.
+
+    Only the directories above the latest entry are open, each as a Tree of
+    the entries added to it so far. A directory is stored as soon as it is
+    left, and its oid added to its parent, so memory grows with the depth and
+    width of the directories rather than with the size of the whole tree.
+
+    Entries must be added in the order of their full paths' bytes, which is
+    also Git's order of the entries within every tree.
+    """
+
+    def __init__(self, store: Callable[[Tree], None]) -> None:
+        self.store: Callable[[Tree], None] = store
+
+        # The open directories, the root first, and their names
+        self.trees: List[Tree] = [Tree()]
+        self.names: List[str] = []
+
+    def add(self, name: str, oid: str, mode: str) -> None:
+        """Add an entry to the innermost open directory."""
+        self.trees[-1].entries[name] = DatabaseEntry(oid, mode)
+
+    def enter(self, name: str) -> None:
+        """Open a subdirectory of the innermost open directory."""
+        self.trees.append(Tree())
+        self.names.append(name)
+
+    def leave(self) -> str:
+        """Store the innermost open directory and return its tree's oid."""
+        tree: Tree = self.trees.pop()
+        self.store(tree)
+        if not isinstance(tree.oid, str):
+            raise Exception(f"Tree {tree} does not have oid")
+        if self.trees:
+            self.add(self.names.pop(), tree.oid, WorkspaceEntry.DIRECTORY_MODE)
+        return tree.oid
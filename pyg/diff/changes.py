@@ -0,0 +1,113 @@
+from bisect import bisect_left
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from database.database import Database
+from database.entry import Entry as DatabaseEntry
+from database.tree import Tree
+from index.cache_tree import CacheTree
+from index.index import Index
+
+
+class Change(NamedTuple):
+    """A file that differs between two versions, either of which may be missing."""
+
+    path: str
+    old: Optional[DatabaseEntry]
+    new: Optional[DatabaseEntry]
+
+
+class TreeChanges:
+    """
+    Finds the files that differ between trees, or between a tree and the index.
+
+    Subtrees with the same oid on both sides are never read, and neither are
+    the trees of directories whose cached tree in the index matches, so the
+    cost follows the size of the change rather than the size of the tree.
+    """
+
+    def __init__(self, database: Database) -> None:
+        self.database: Database = database
+
+    def _entries(self, oid: Optional[str]) -> Dict[str, DatabaseEntry]:
+        if oid is None:
+            return {}
+        return dict(Tree.parse(self.database.read_object(oid)[1]).entries)
+
+    def between(
+        self, old: Optional[str], new: Optional[str], prefix: str = ""
+    ) -> Iterator[Change]:
+        """Yield the changes between two trees in path order."""
+        if old == new:
+            return
+        old_entries = self._entries(old)
+        new_entries = self._entries(new)
+
+        # A tree sorts as if its name ended in a slash, as in Git
+        keys = {
+            (name, entry.is_tree()): None
+            for entries in (old_entries, new_entries)
+            for name, entry in entries.items()
+        }
+        for name, is_tree in sorted(keys, key=lambda k: k[0] + ("/" if k[1] else "")):
+            a = old_entries.get(name)
+            b = new_entries.get(name)
+            a = a if a and a.is_tree() == is_tree else None
+            b = b if b and b.is_tree() == is_tree else None
+            if is_tree:
+                yield from self.between(
+                    a.oid if a else None, b.oid if b else None, f"{prefix}{name}/"
+                )
+            elif a != b:
+                yield Change(f"{prefix}{name}", a, b)
+
+    def to_index(self, tree: Optional[str], index: Index) -> Iterator[Change]:
+        """Yield the changes from a tree to the index in path order."""
+        old: Dict[str, DatabaseEntry] = {}
+        same: List[str] = []
+        self._flatten(tree, index.cache_tree, "", old, same)
+        if same == [""]:
+            return
+
+        # Compare the entries outside the directories known to match
+        changes: List[Change] = []
+        paths: List[bytes] = index.entries.sorted_paths()
+        positions: List[int] = []
+        i: int = 0
+        for prefix in sorted(directory.encode("utf-8") for directory in same):
+            start: int = bisect_left(paths, prefix)
+            positions.extend(range(i, start))
+            i = bisect_left(paths, prefix[:-1] + b"0")
+        positions.extend(range(i, len(paths)))
+
+        for j in positions:
+            entry = index.entries.entry_at(j)
+            path: str = paths[j].decode("utf-8")
+            new = DatabaseEntry(entry.oid, f"{entry.mode:o}")
+            previous: Optional[DatabaseEntry] = old.pop(path, None)
+            if previous != new:
+                changes.append(Change(path, previous, new))
+
+        changes.extend(Change(path, entry, None) for path, entry in old.items())
+        yield from sorted(changes, key=lambda change: change.path.encode("utf-8"))
+
+    def _flatten(
+        self,
+        oid: Optional[str],
+        cache: Optional[CacheTree],
+        prefix: str,
+        out: Dict[str, DatabaseEntry],
+        same: List[str],
+    ) -> None:
+        """
+        Collect the files of a tree by path, except in directories whose
+        cached tree has the same oid, whose prefixes are collected instead.
+        """
+        if cache is not None and cache.entry_count >= 0 and cache.oid == oid:
+            same.append(prefix)
+            return
+        for name, entry in self._entries(oid).items():
+            if entry.is_tree():
+                child = cache.children.get(name) if cache else None
+                self._flatten(entry.oid, child, f"{prefix}{name}/", out, same)
+            else:
+                out[f"{prefix}{name}"] = entry
@@ -0,0 +1,351 @@
+import re
+from typing import Callable, Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+from .histogram import histogram
+from .myers import myers
+
+# Splits data into lines, each with its newline; the last may have none
+LINE = re.compile(rb"[^\n]*\n|[^\n]+")
+
+Algorithm = Callable[
+    [Sequence[int], int, int, Sequence[int], int, int, bytearray, bytearray], None
+]
+
+
+class Hunk(NamedTuple):
+    """A run of changes with the lines of context around them."""
+
+    a_start: int
+    a_end: int
+    b_start: int
+    b_end: int
+
+    # The changed ranges, in order, as (a_start, a_end, b_start, b_end)
+    changes: List[Tuple[int, int, int, int]]
+
+
+class Split(NamedTuple):
+    """
+    The lines around a split between two lines, as xdiff's indent heuristic
+    measures them; an indent of -1 is a blank line, or none at all.
+    """
+
+    end_of_file: bool
+    indent: int
+    pre_blank: int
+    pre_indent: int
+    post_blank: int
+    post_indent: int
+
+
+class Diff:
+    """
+    The lines that differ between two versions of a file.
+
+    Lines are interned to integers, so the algorithms compare small ints
+    rather than bytes. The result is kept, as in Git's xdiff, as a flag for
+    every line of each version saying whether it changed, and runs of
+    changes are then slid along repeated lines to where Git puts them,
+    including by its indent heuristic, which is on by default in Git.
+    """
+
+    MYERS = "myers"
+    HISTOGRAM = "histogram"
+    ALGORITHMS: Dict[str, Algorithm] = {MYERS: myers, HISTOGRAM: histogram}
+
+    # The indent heuristic's limits and weights, as in xdiff
+    MAX_INDENT = 200
+    MAX_BLANKS = 20
+    MAX_SLIDING = 100
+    START_OF_FILE_PENALTY = 1
+    END_OF_FILE_PENALTY = 21
+    TOTAL_BLANK_WEIGHT = -30
+    POST_BLANK_WEIGHT = 6
+    RELATIVE_INDENT_PENALTY = -4
+    RELATIVE_INDENT_WITH_BLANK_PENALTY = 10
+    RELATIVE_OUTDENT_PENALTY = 24
+    RELATIVE_OUTDENT_WITH_BLANK_PENALTY = 17
+    RELATIVE_DEDENT_PENALTY = 23
+    RELATIVE_DEDENT_WITH_BLANK_PENALTY = 17
+    INDENT_WEIGHT = 60
+
+    # The characters C's isspace takes for whitespace
+    WHITESPACE = b" \t\n\v\f\r"
+
+    def __init__(self, a: bytes, b: bytes, algorithm: str = MYERS) -> None:
+        self.a_lines: List[bytes] = LINE.findall(a)
+        self.b_lines: List[bytes] = LINE.findall(b)
+
+        ids: Dict[bytes, int] = {}
+        self.a: List[int] = [ids.setdefault(line, len(ids)) for line in self.a_lines]
+        self.b: List[int] = [ids.setdefault(line, len(ids)) for line in self.b_lines]
+        self.changed_a: bytearray = bytearray(len(self.a))
+        self.changed_b: bytearray = bytearray(len(self.b))
+
+        self.ALGORITHMS[algorithm](
+            self.a,
+            0,
+            len(self.a),
+            self.b,
+            0,
+            len(self.b),
+            self.changed_a,
+            self.changed_b,
+        )
+        self._compact(self.a, self.a_lines, self.changed_a, self.changed_b)
+        self._compact(self.b, self.b_lines, self.changed_b, self.changed_a)
+
+    @classmethod
+    def _compact(
+        cls, lines: List[int], text: List[bytes], changed: bytearray, other: bytearray
+    ) -> None:
+        """
+        Slide every run of changed lines as Git's xdiff does: as far down as
+        its lines allow, merging with the runs it meets, unless it passes a
+        change in the other version on the way, in which case it goes back
+        up to the last one so that the two read as one replacement. A run
+        that could slide but passes no such change is put where the indent
+        heuristic finds its ends read best.
+
+        A run and the gap in the other version it lines up with are tracked
+        together; both versions have as many of these, one before each
+        unchanged line and one at the end.
+        """
+        n, n_other = len(changed), len(other)
+
+        def extend(flags: bytearray, end: int, size: int) -> int:
+            end = flags.find(0, end)
+            return size if end < 0 else end
+
+        def extend_back(flags: bytearray, start: int) -> int:
+            return flags.rfind(0, 0, start) + 1
+
+        start, end = 0, extend(changed, 0, n)
+        o_start, o_end = 0, extend(other, 0, n_other)
+        while True:
+            if end != start:
+                while True:
+                    size: int = end - start
+                    matching: int = -1
+                    while start > 0 and lines[start - 1] == lines[end - 1]:
+                        start -= 1
+                        end -= 1
+                        changed[start], changed[end] = 1, 0
+                        start = extend_back(changed, start)
+                        o_end = o_start - 1
+                        o_start = extend_back(other, o_end)
+                    earliest_end: int = end
+                    if o_end > o_start:
+                        matching = end
+                    while end < n and lines[start] == lines[end]:
+                        changed[start], changed[end] = 0, 1
+                        start += 1
+                        end = extend(changed, end + 1, n)
+                        o_start = o_end + 1
+                        o_end = extend(other, o_start, n_other)
+                        if o_end > o_start:
+                            matching = end
+                    if size == end - start:
+                        break
+
+                if end != earliest_end and matching != -1:
+                    while o_end == o_start:
+                        start -= 1
+                        end -= 1
+                        changed[start], changed[end] = 1, 0
+                        start = extend_back(changed, start)
+                        o_end = o_start - 1
+                        o_start = extend_back(other, o_end)
+                elif end != earliest_end:
+                    best: int = cls._indent_shift(text, end - start, end, earliest_end)
+                    while end > best:
+                        start -= 1
+                        end -= 1
+                        changed[start], changed[end] = 1, 0
+                        start = extend_back(changed, start)
+                        o_end = o_start - 1
+                        o_start = extend_back(other, o_end)
+
+            if end == n:
+                break
+            start = end + 1
+            o_start = o_end + 1
+            if not (start < n and changed[start]) and not (
+                o_start < n_other and other[o_start]
+            ):
+                # Skip the unchanged lines up to the next change in either
+                next_changed: int = changed.find(1, start)
+                next_other: int = other.find(1, o_start)
+                skip: int = min(
+                    (n if next_changed < 0 else next_changed) - start,
+                    (n_other if next_other < 0 else next_other) - o_start,
+                )
+                start += skip
+                o_start += skip
+            end = extend(changed, start, n)
+            o_end = extend(other, o_start, n_other)
+
+    @classmethod
+    def _indent_shift(
+        cls, text: List[bytes], size: int, end: int, earliest_end: int
+    ) -> int:
+        """
+        Return where a run of `size` changed lines that can slide between
+        ending at earliest_end and at end reads best, scoring the split at
+        each of its ends by the indents and blank lines around it.
+        """
+        indents: Dict[int, int] = {}
+
+        def indent(i: int) -> int:
+            if i not in indents:
+                indents[i] = cls._indent(text[i])
+            return indents[i]
+
+        best_shift: int = -1
+        best_indent: int = 0
+        best_penalty: int = 0
+        for shift in range(
+            max(earliest_end, end - size - 1, end - cls.MAX_SLIDING), end + 1
+        ):
+            total_indent: int = 0
+            penalty: int = 0
+            for split in (shift, shift - size):
+                split_indent, split_penalty = cls._score(
+                    cls._measure(indent, len(text), split)
+                )
+                total_indent += split_indent
+                penalty += split_penalty
+            compared: int = (total_indent > best_indent) - (total_indent < best_indent)
+            if (
+                best_shift == -1
+                or cls.INDENT_WEIGHT * compared + penalty - best_penalty <= 0
+            ):
+                best_shift, best_indent, best_penalty = shift, total_indent, penalty
+        return best_shift
+
+    @classmethod
+    def _indent(cls, line: bytes) -> int:
+        """Return a line's indent, with tabs to every 8 columns, or -1 if blank."""
+        indent: int = 0
+        for c in line:
+            if c not in cls.WHITESPACE:
+                return indent
+            if c == 0x20:
+                indent += 1
+            elif c == 0x09:
+                indent += 8 - indent % 8
+            if indent >= cls.MAX_INDENT:
+                return cls.MAX_INDENT
+        return -1
+
+    @classmethod
+    def _measure(cls, indent: Callable[[int], int], n: int, split: int) -> Split:
+        """Measure the lines around the split before line `split` of n."""
+        pre_blank: int = 0
+        pre_indent: int = -1
+        for i in range(split - 1, -1, -1):
+            pre_indent = indent(i)
+            if pre_indent != -1:
+                break
+            pre_blank += 1
+            if pre_blank == cls.MAX_BLANKS:
+                pre_indent = 0
+                break
+
+        post_blank: int = 0
+        post_indent: int = -1
+        for i in range(split + 1, n):
+            post_indent = indent(i)
+            if post_indent != -1:
+                break
+            post_blank += 1
+            if post_blank == cls.MAX_BLANKS:
+                post_indent = 0
+                break
+
+        return Split(
+            split >= n,
+            -1 if split >= n else indent(split),
+            pre_blank,
+            pre_indent,
+            post_blank,
+            post_indent,
+        )
+
+    @classmethod
+    def _score(cls, m: Split) -> Tuple[int, int]:
+        """Return the indent and the penalty xdiff gives a split."""
+        penalty: int = 0
+        if m.pre_indent == -1 and m.pre_blank == 0:
+            penalty += cls.START_OF_FILE_PENALTY
+        if m.end_of_file:
+            penalty += cls.END_OF_FILE_PENALTY
+
+        post_blank: int = 1 + m.post_blank if m.indent == -1 else 0
+        total_blank: int = m.pre_blank + post_blank
+        penalty += cls.TOTAL_BLANK_WEIGHT * total_blank
+        penalty += cls.POST_BLANK_WEIGHT * post_blank
+
+        # The indent changing across the split is penalised, unless there is
+        # nothing but blank lines on one side of it
+        indent: int = m.indent if m.indent != -1 else m.post_indent
+        if indent == -1 or m.pre_indent == -1 or indent == m.pre_indent:
+            return indent, penalty
+        if indent > m.pre_indent:
+            penalty += (
+                cls.RELATIVE_INDENT_WITH_BLANK_PENALTY
+                if total_blank
+                else cls.RELATIVE_INDENT_PENALTY
+            )
+        elif m.post_indent != -1 and m.post_indent > indent:
+            penalty += (
+                cls.RELATIVE_OUTDENT_WITH_BLANK_PENALTY
+                if total_blank
+                else cls.RELATIVE_OUTDENT_PENALTY
+            )
+        else:
+            penalty += (
+                cls.RELATIVE_DEDENT_WITH_BLANK_PENALTY
+                if total_blank
+                else cls.RELATIVE_DEDENT_PENALTY
+            )
+        return indent, penalty
+
+    def changes(self) -> Iterator[Tuple[int, int, int, int]]:
+        """Yield the changed ranges in order, as (a_start, a_end, b_start, b_end)."""
+        changed_a, changed_b = self.changed_a, self.changed_b
+        n, m = len(changed_a), len(changed_b)
+        i = j = 0
+        while i < n or j < m:
+            if i < n and j < m and not changed_a[i] and not changed_b[j]:
+                i += 1
+                j += 1
+                continue
+            a_start, b_start = i, j
+            while i < n and changed_a[i]:
+                i += 1
+            while j < m and changed_b[j]:
+                j += 1
+            yield a_start, i, b_start, j
+
+    def hunks(self, context: int = 3) -> Iterator[Hunk]:
+        """Yield the changes grouped into hunks with lines of context."""
+        group: List[Tuple[int, int, int, int]] = []
+        for change in self.changes():
+            if group and change[0] - group[-1][1] > 2 * context:
+                yield self._hunk(group, context)
+                group = []
+            group.append(change)
+        if group:
+            yield self._hunk(group, context)
+
+    def _hunk(self, group: List[Tuple[int, int, int, int]], context: int) -> Hunk:
+        before: int = min(context, group[0][0])
+        after: int = min(context, len(self.a) - group[-1][1])
+        return Hunk(
+            group[0][0] - before,
+            group[-1][1] + after,
+            group[0][2] - before,
+            group[-1][3] + after,
+            group,
+        )
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .myers import myers
+
+# Lines that occur more often than this in a range are not used as anchors;
+# if nothing rarer is common to both ranges, they are compared with Myers
+MAX_CHAIN_LENGTH = 64
+
+
+def histogram(
+    a: Sequence[int],
+    a_lo: int,
+    a_hi: int,
+    b: Sequence[int],
+    b_lo: int,
+    b_hi: int,
+    changed_a: bytearray,
+    changed_b: bytearray,
+) -> None:
+    """
+    Mark the lines of two ranges that a histogram diff changes.
+
+    As in Git, the longest run of lines common to both ranges that contains
+    the rarest line is kept, and the ranges before and after it are compared
+    the same way. Anchoring on rare lines, such as a function's signature,
+    rather than on frequent ones, such as blank lines and closing braces,
+    gives diffs that follow the structure of the code.
+    """
+    stack: List[Tuple[int, int, int, int]] = [(a_lo, a_hi, b_lo, b_hi)]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        if a_lo == a_hi:
+            changed_b[b_lo:b_hi] = b"\1" * (b_hi - b_lo)
+            continue
+        if b_lo == b_hi:
+            changed_a[a_lo:a_hi] = b"\1" * (a_hi - a_lo)
+            continue
+
+        region, common = _find_region(a, a_lo, a_hi, b, b_lo, b_hi)
+        if region is not None:
+            a_start, a_end, b_start, b_end = region
+            stack.append((a_end, a_hi, b_end, b_hi))
+            stack.append((a_lo, a_start, b_lo, b_start))
+        elif common:
+            myers(a, a_lo, a_hi, b, b_lo, b_hi, changed_a, changed_b)
+        else:
+            changed_a[a_lo:a_hi] = b"\1" * (a_hi - a_lo)
+            changed_b[b_lo:b_hi] = b"\1" * (b_hi - b_lo)
+
+
+def _find_region(
+    a: Sequence[int], a_lo: int, a_hi: int, b: Sequence[int], b_lo: int, b_hi: int
+) -> Tuple[Optional[Tuple[int, int, int, int]], bool]:
+    """
+    Return the common run of lines to split two ranges at, if any, and
+    whether the ranges have any line in common.
+    """
+    positions: Dict[int, List[int]] = {}
+    for i in range(a_lo, a_hi):
+        positions.setdefault(a[i], []).append(i)
+
+    best: Optional[Tuple[int, int, int, int]] = None
+    best_length: int = 1
+    best_count: int = MAX_CHAIN_LENGTH + 1
+    common: bool = False
+
+    j: int = b_lo
+    while j < b_hi:
+        next_j: int = j + 1
+        found: Optional[List[int]] = positions.get(b[j])
+        if found is not None:
+            common = True
+        if found is None or len(found) > best_count:
+            j = next_j
+            continue
+
+        k: int = 0
+        while k < len(found):
+            a_start, b_start = found[k], j
+            a_end, b_end = a_start + 1, b_start + 1
+            count: int = len(found)
+
+            # Grow the run both ways, keeping the count of its rarest line
+            while (
+                a_start > a_lo and b_start > b_lo and a[a_start - 1] == b[b_start - 1]
+            ):
+                a_start -= 1
+                b_start -= 1
+                if count > 1:
+                    count = min(count, len(positions[a[a_start]]))
+            while a_end < a_hi and b_end < b_hi and a[a_end] == b[b_end]:
+                if count > 1:
+                    count = min(count, len(positions[a[a_end]]))
+                a_end += 1
+                b_end += 1
+
+            next_j = max(next_j, b_end)
+            if best_length < a_end - a_start or count < best_count:
+                best = (a_start, a_end, b_start, b_end)
+                best_length = a_end - a_start
+                best_count = count
+
+            # Skip the occurrences inside the run just found
+            k += 1
+            while k < len(found) and found[k] < a_end:
+                k += 1
+        j = next_j
+
+    if best_count > MAX_CHAIN_LENGTH:
+        return None, common
+    return best, common
@@ -0,0 +1,379 @@
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+# Edit costs below this are always searched for exactly; beyond it, and
+# beyond the square root of the size of the input, the search settles for
+# the furthest-reaching paths found so far, as Git's xdiff does
+MIN_MAX_COST = 256
+
+# Past this cost, a search that finds a run of at least SNAKE_LENGTH common
+# lines on a path far enough along splits there instead of going on
+HEURISTIC_MIN_COST = 256
+HEURISTIC_FACTOR = 4
+SNAKE_LENGTH = 20
+
+# Lines found at least this many times in the other range, or fewer if it is
+# small, count as matching many times, and only so many lines either side of
+# one are looked at to decide whether to leave it out
+MAX_EQUAL_LIMIT = 1024
+SCAN_WINDOW = 100
+
+
+def myers(
+    a: Sequence[int],
+    a_lo: int,
+    a_hi: int,
+    b: Sequence[int],
+    b_lo: int,
+    b_hi: int,
+    changed_a: bytearray,
+    changed_b: bytearray,
+) -> None:
+    """
+    Mark the lines of two ranges that a shortest edit script changes.
+
+    As in Git's xdiff, lines common to the start and end of both ranges are
+    left out first, and then so are lines that cannot or had best not be
+    matched: those absent from the other range, which must have changed,
+    and those found there many times over that lie among mostly such lines,
+    where they would only tie the comparison to chance matches. What is
+    left is compared and the result mapped back to its positions.
+    """
+    size_a, size_b = a_hi - a_lo, b_hi - b_lo
+    count_a: Counter = Counter(a[a_lo:a_hi])
+    count_b: Counter = Counter(b[b_lo:b_hi])
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+
+    kept_a: List[int] = _kept(a, a_lo, a_hi, size_a, count_b)
+    kept_b: List[int] = _kept(b, b_lo, b_hi, size_b, count_a)
+    changed_a[a_lo:a_hi] = b"\1" * (a_hi - a_lo)
+    changed_b[b_lo:b_hi] = b"\1" * (b_hi - b_lo)
+
+    kept_changed_a = bytearray(len(kept_a))
+    kept_changed_b = bytearray(len(kept_b))
+    _divide(
+        [a[i] for i in kept_a], [b[j] for j in kept_b], kept_changed_a, kept_changed_b
+    )
+    for n, i in enumerate(kept_a):
+        changed_a[i] = kept_changed_a[n]
+    for n, j in enumerate(kept_b):
+        changed_b[j] = kept_changed_b[n]
+
+
+def _kept(
+    lines: Sequence[int], lo: int, hi: int, size: int, other: Counter
+) -> List[int]:
+    """Return the positions of the lines in a range worth matching."""
+    limit: int = min(_rough_sqrt(size), MAX_EQUAL_LIMIT)
+
+    # 0 for no match in the other range, 2 for many, 1 for a few
+    kinds = bytearray(hi - lo)
+    for i in range(lo, hi):
+        count: int = other[lines[i]]
+        kinds[i - lo] = 0 if count == 0 else 2 if count >= limit else 1
+
+    # Whether a line with no match lies since the last with a few
+    unmatched: bool = False
+    kept: List[int] = []
+    for i, kind in enumerate(kinds):
+        if kind == 1:
+            kept.append(lo + i)
+            unmatched = False
+        elif kind == 0:
+            unmatched = True
+        elif not unmatched or not _among_unmatched(kinds, i):
+            kept.append(lo + i)
+    return kept
+
+
+def _among_unmatched(kinds: bytearray, i: int) -> bool:
+    """
+    Return whether a line with many matches lies in a run of lines with no
+    match or many, with enough of them unmatched on both sides.
+    """
+    start: int = max(0, i - SCAN_WINDOW)
+    end: int = min(len(kinds) - 1, i + SCAN_WINDOW)
+    runs: List[Tuple[int, int]] = []
+    for positions in (range(i - 1, start - 1, -1), range(i + 1, end + 1)):
+        unmatched, repeated = 0, 0
+        for j in positions:
+            if kinds[j] == 0:
+                unmatched += 1
+            elif kinds[j] == 2:
+                repeated += 1
+            else:
+                break
+        if unmatched == 0:
+            return False
+        runs.append((unmatched, repeated))
+    unmatched = runs[0][0] + runs[1][0]
+    repeated = runs[0][1] + runs[1][1] + 2
+    return repeated * 4 < repeated + unmatched
+
+
+def _divide(
+    a: Sequence[int], b: Sequence[int], changed_a: bytearray, changed_b: bytearray
+) -> None:
+    """
+    Mark the lines of two sequences that a shortest edit script changes.
+
+    This is Myers' linear space refinement: a split point on a shortest path
+    is found by searching forwards from the start and backwards from the end
+    at once, and the ranges before and after it are compared the same way.
+    Common prefixes and suffixes are stripped from each range first, which
+    also ends the division once a range is all insertions or all deletions.
+    Ranges are kept on a stack rather than recursed into.
+    """
+    # The furthest point reached on each diagonal k = x - y, forwards and
+    # backwards, indexed from the lowest diagonal less one
+    offset: int = len(b) + 1
+    forward: List[int] = [0] * (len(a) + len(b) + 3)
+    backward: List[int] = [0] * (len(a) + len(b) + 3)
+    max_cost: int = max(_rough_sqrt(len(a) + len(b) + 3), MIN_MAX_COST)
+
+    stack: List[Tuple[int, int, int, int, bool]] = [(0, len(a), 0, len(b), False)]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi, minimal = stack.pop()
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+
+        if a_lo == a_hi:
+            changed_b[b_lo:b_hi] = b"\1" * (b_hi - b_lo)
+        elif b_lo == b_hi:
+            changed_a[a_lo:a_hi] = b"\1" * (a_hi - a_lo)
+        else:
+            x, y, minimal_lo, minimal_hi = _split(
+                a,
+                a_lo,
+                a_hi,
+                b,
+                b_lo,
+                b_hi,
+                forward,
+                backward,
+                offset,
+                max_cost if not minimal else 0,
+            )
+            stack.append((x, a_hi, y, b_hi, minimal_hi))
+            stack.append((a_lo, x, b_lo, y, minimal_lo))
+
+
+def _rough_sqrt(n: int) -> int:
+    """Return the power of two nearest above the square root of a number."""
+    i: int = 1
+    while n > 0:
+        i <<= 1
+        n >>= 2
+    return i
+
+
+def _split(
+    a: Sequence[int],
+    a_lo: int,
+    a_hi: int,
+    b: Sequence[int],
+    b_lo: int,
+    b_hi: int,
+    forward: List[int],
+    backward: List[int],
+    offset: int,
+    max_cost: int,
+) -> Tuple[int, int, bool, bool]:
+    """
+    Return a point to split two ranges at, which must neither be empty nor
+    start or end with the same line, and whether the ranges before and after
+    it must be compared exactly.
+
+    The searches are kept within the box the ranges make, by letting the
+    span of diagonals they cover shrink back at its edges. With a max_cost,
+    the search gives up on the shortest path as Git's does: once it has
+    cost a fair amount, at a long run of common lines on a path that has
+    come far for its cost, and otherwise once it costs max_cost, at
+    whichever path has come furthest.
+    """
+    k_min: int = a_lo - b_hi
+    k_max: int = a_hi - b_lo
+    f_mid: int = a_lo - b_lo
+    b_mid: int = a_hi - b_hi
+    odd: int = (f_mid - b_mid) & 1
+
+    f_min = f_max = f_mid
+    b_min = b_max = b_mid
+    forward[offset + f_mid] = a_lo
+    backward[offset + b_mid] = a_hi
+
+    cost: int = 1
+    while True:
+        snake: bool = False
+        if f_min > k_min:
+            f_min -= 1
+            forward[offset + f_min - 1] = -1
+        else:
+            f_min += 1
+        if f_max < k_max:
+            f_max += 1
+            forward[offset + f_max + 1] = -1
+        else:
+            f_max -= 1
+
+        for k in range(f_max, f_min - 1, -2):
+            if forward[offset + k - 1] >= forward[offset + k + 1]:
+                x: int = forward[offset + k - 1] + 1
+            else:
+                x = forward[offset + k + 1]
+            y: int = x - k
+            start: int = x
+            while x < a_hi and y < b_hi and a[x] == b[y]:
+                x += 1
+                y += 1
+            snake = snake or x - start > SNAKE_LENGTH
+            forward[offset + k] = x
+            if odd and b_min <= k <= b_max and backward[offset + k] <= x:
+                return x, y, True, True
+
+        if b_min > k_min:
+            b_min -= 1
+            backward[offset + b_min - 1] = a_hi + b_hi + 1
+        else:
+            b_min += 1
+        if b_max < k_max:
+            b_max += 1
+            backward[offset + b_max + 1] = a_hi + b_hi + 1
+        else:
+            b_max -= 1
+
+        for k in range(b_max, b_min - 1, -2):
+            if backward[offset + k - 1] < backward[offset + k + 1]:
+                x = backward[offset + k - 1]
+            else:
+                x = backward[offset + k + 1] - 1
+            y = x - k
+            start = x
+            while x > a_lo and y > b_lo and a[x - 1] == b[y - 1]:
+                x -= 1
+                y -= 1
+            snake = snake or start - x > SNAKE_LENGTH
+            backward[offset + k] = x
+            if not odd and f_min <= k <= f_max and x <= forward[offset + k]:
+                return x, y, True, True
+
+        spans = (f_min, f_max, b_min, b_max)
+        if max_cost and snake and cost > HEURISTIC_MIN_COST:
+            split = _good_snake(
+                a, a_lo, a_hi, b, b_lo, b_hi, forward, backward, offset, cost, spans
+            )
+            if split is not None:
+                return split
+        if max_cost and cost >= max_cost:
+            return _furthest(
+                a_lo,
+                a_hi,
+                b_lo,
+                b_hi,
+                forward,
+                backward,
+                offset,
+                spans,
+            )
+        cost += 1
+
+
+def _good_snake(
+    a: Sequence[int],
+    a_lo: int,
+    a_hi: int,
+    b: Sequence[int],
+    b_lo: int,
+    b_hi: int,
+    forward: List[int],
+    backward: List[int],
+    offset: int,
+    cost: int,
+    spans: Tuple[int, int, int, int],
+) -> Optional[Tuple[int, int, bool, bool]]:
+    """
+    Return the end of the path that has come furthest for its cost and
+    just passed a long run of common lines, searching forwards then
+    backwards, if any has come far enough.
+    """
+    f_min, f_max, b_min, b_max = spans
+    f_mid: int = a_lo - b_lo
+    b_mid: int = a_hi - b_hi
+
+    best: int = 0
+    split: Optional[Tuple[int, int, bool, bool]] = None
+    for k in range(f_max, f_min - 1, -2):
+        x: int = forward[offset + k]
+        y: int = x - k
+        progress: int = (x - a_lo) + (y - b_lo) - abs(k - f_mid)
+        if (
+            progress > HEURISTIC_FACTOR * cost
+            and progress > best
+            and a_lo + SNAKE_LENGTH <= x < a_hi
+            and b_lo + SNAKE_LENGTH <= y < b_hi
+            and a[x - SNAKE_LENGTH : x] == b[y - SNAKE_LENGTH : y]
+        ):
+            best = progress
+            split = (x, y, True, False)
+    if split is not None:
+        return split
+
+    for k in range(b_max, b_min - 1, -2):
+        x = backward[offset + k]
+        y = x - k
+        progress = (a_hi - x) + (b_hi - y) - abs(k - b_mid)
+        if (
+            progress > HEURISTIC_FACTOR * cost
+            and progress > best
+            and a_lo < x <= a_hi - SNAKE_LENGTH
+            and b_lo < y <= b_hi - SNAKE_LENGTH
+            and a[x : x + SNAKE_LENGTH] == b[y : y + SNAKE_LENGTH]
+        ):
+            best = progress
+            split = (x, y, False, True)
+    return split
+
+
+def _furthest(
+    a_lo: int,
+    a_hi: int,
+    b_lo: int,
+    b_hi: int,
+    forward: List[int],
+    backward: List[int],
+    offset: int,
+    spans: Tuple[int, int, int, int],
+) -> Tuple[int, int, bool, bool]:
+    """Return the end of whichever search's path has come furthest."""
+    f_min, f_max, b_min, b_max = spans
+
+    f_best, f_x = -1, -1
+    for k in range(f_max, f_min - 1, -2):
+        x: int = min(forward[offset + k], a_hi)
+        y: int = x - k
+        if b_hi < y:
+            x, y = b_hi + k, b_hi
+        if f_best < x + y:
+            f_best, f_x = x + y, x
+
+    b_best, b_x = a_hi + b_hi + 1, a_hi + b_hi + 1
+    for k in range(b_max, b_min - 1, -2):
+        x = max(a_lo, backward[offset + k])
+        y = x - k
+        if y < b_lo:
+            x, y = b_lo + k, b_lo
+        if x + y < b_best:
+            b_best, b_x = x + y, x
+
+    if (a_hi + b_hi) - b_best < f_best - (a_lo + b_lo):
+        return f_x, f_best - f_x, True, False
+    return b_x, b_best - b_x, False, True
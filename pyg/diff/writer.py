@@ -0,0 +1,132 @@
+from typing import BinaryIO, List, NamedTuple, Optional
+
+from .diff import Diff, Hunk
+
+NULL_OID = "0" * 40
+
+
+class Side(NamedTuple):
+    """One version of a file: its blob's oid, its mode and its contents."""
+
+    oid: str
+    mode: str
+    data: bytes
+
+
+class UnifiedWriter:
+    """
+    Writes diffs in Git's unified format to a binary stream.
+
+    Each hunk is written as soon as it is formed, so a large diff is never
+    held in memory as text. Files with a NUL byte near the start are taken
+    to be binary, as Git does, and only reported as differing.
+    """
+
+    CONTEXT = 3
+    ABBREV = 7
+
+    # Bytes looked at for a NUL byte, as in Git's buffer_is_binary
+    BINARY_CHECK_SIZE = 8000
+
+    # Longest function line shown after a hunk header, as in xdiff
+    FUNCTION_LINE_SIZE = 80
+
+    def __init__(self, out: BinaryIO, algorithm: str = Diff.MYERS) -> None:
+        self.out: BinaryIO = out
+        self.algorithm: str = algorithm
+
+        # How far back the last search for a function line went, and what it
+        # found, so the next hunk of the file only searches the lines between
+        self.searched: int = 0
+        self.function: bytes = b""
+
+    @classmethod
+    def is_binary(cls, data: bytes) -> bool:
+        return b"\0" in data[: cls.BINARY_CHECK_SIZE]
+
+    def write(self, path: str, old: Optional[Side], new: Optional[Side]) -> None:
+        """Write the diff of a file between two versions, either of which may be missing."""
+        a_path, b_path = f"a/{path}", f"b/{path}"
+        lines: List[str] = [f"diff --git {a_path} {b_path}"]
+        old_oid: str = old.oid if old else NULL_OID
+        new_oid: str = new.oid if new else NULL_OID
+        index: str = f"index {old_oid[: self.ABBREV]}..{new_oid[: self.ABBREV]}"
+        if old is None and new is not None:
+            lines += [f"new file mode {new.mode}", index]
+        elif new is None and old is not None:
+            lines += [f"deleted file mode {old.mode}", index]
+        elif old is not None and new is not None and old.mode != new.mode:
+            lines += [f"old mode {old.mode}", f"new mode {new.mode}"]
+            if old.oid != new.oid:
+                lines.append(index)
+        else:
+            lines.append(f"{index} {new.mode if new else ''}")
+
+        a_data: bytes = old.data if old else b""
+        b_data: bytes = new.data if new else b""
+        a_name: str = a_path if old else "/dev/null"
+        b_name: str = b_path if new else "/dev/null"
+        if old_oid == new_oid:
+            self._write_lines(lines)
+        elif self.is_binary(a_data) or self.is_binary(b_data):
+            lines.append(f"Binary files {a_name} and {b_name} differ")
+            self._write_lines(lines)
+        else:
+            lines += [f"--- {a_name}", f"+++ {b_name}"]
+            self._write_lines(lines)
+            diff: Diff = Diff(a_data, b_data, self.algorithm)
+            self.searched, self.function = 0, b""
+            for hunk in diff.hunks(self.CONTEXT):
+                self._write_hunk(diff, hunk)
+
+    def _write_lines(self, lines: List[str]) -> None:
+        self.out.write("".join(f"{line}\n" for line in lines).encode("utf-8"))
+
+    def _write_hunk(self, diff: Diff, hunk: Hunk) -> None:
+        a_count: int = hunk.a_end - hunk.a_start
+        b_count: int = hunk.b_end - hunk.b_start
+        header: bytes = b"@@ -%s +%s @@" % (
+            self._range(hunk.a_start, a_count),
+            self._range(hunk.b_start, b_count),
+        )
+        function: bytes = self._function_line(diff.a_lines, hunk.a_start)
+        out: List[bytes] = [header + (b" " + function if function else b"") + b"\n"]
+
+        a_lines, b_lines = diff.a_lines, diff.b_lines
+        i: int = hunk.a_start
+        for a_start, a_end, b_start, b_end in hunk.changes:
+            out.extend(self._lines(b" ", a_lines[i:a_start]))
+            out.extend(self._lines(b"-", a_lines[a_start:a_end]))
+            out.extend(self._lines(b"+", b_lines[b_start:b_end]))
+            i = a_end
+        out.extend(self._lines(b" ", a_lines[i : hunk.a_end]))
+        self.out.write(b"".join(out))
+
+    @staticmethod
+    def _range(start: int, count: int) -> bytes:
+        """Format a hunk's range of lines: an empty one names the line before it."""
+        first: int = start + 1 if count else start
+        return b"%d" % first if count == 1 else b"%d,%d" % (first, count)
+
+    @staticmethod
+    def _lines(prefix: bytes, lines: List[bytes]) -> List[bytes]:
+        out: List[bytes] = []
+        for line in lines:
+            out.append(prefix + line)
+            if not line.endswith(b"\n"):
+                out.append(b"\n\\ No newline at end of file\n")
+        return out
+
+    def _function_line(self, lines: List[bytes], start: int) -> bytes:
+        """
+        Return the nearest line before a hunk that looks like the start of a
+        function, by Git's default rule: one that starts with a letter, an
+        underscore or a dollar sign.
+        """
+        for i in range(start - 1, self.searched - 1, -1):
+            line: bytes = lines[i]
+            if line[:1].isalpha() or line[:1] in (b"_", b"$"):
+                self.function = line[: self.FUNCTION_LINE_SIZE].rstrip()
+                break
+        self.searched = start
+        return self.function
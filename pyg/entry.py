@@ -1,5 +1,4 @@
 from pathlib import Path
-from typing import List
 
 
 class Entry:
@@ -26,14 +25,6 @@ class Entry:
 
         return self.REGULAR_MODE
 
-    def parent_directories(self) -> List[Path]:
-        """Return all parent directories of the entry's name in descnding order."""
-        p = Path(self.pathname)
-        # Skip last item, the entry's path itself
-        q = list(p.parents)[:-1]
-        q.reverse()
-        return q
-
     @property
     def name(self) -> str:
         """
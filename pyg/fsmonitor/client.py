@@ -0,0 +1,57 @@
+import os
+import socket
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .protocol import TRIVIAL
+
+# A new token, and the paths changed since the old one, or None if anything
+# may have changed
+Changes = Tuple[str, Optional[List[str]]]
+
+
+class Client:
+    """Talks to the fsmonitor daemon of a repository, if one is running."""
+
+    TIMEOUT = 5.0
+    RECEIVE_SIZE = 1 << 16
+
+    def __init__(self, socket_path: Path) -> None:
+        self.socket_path: Path = socket_path
+
+    def query(self, token: Optional[str]) -> Optional[Changes]:
+        """
+        Ask which paths changed since a token.
+
+        Returns None if no daemon answers, in which case the caller has to
+        examine every path itself.
+        """
+        answer: Optional[bytes] = self.request(f"query {token or ''}\n".encode())
+        if answer is None:
+            return None
+        line, _, body = answer.partition(b"\n")
+        new_token: str = line.decode("utf-8")
+        if body == TRIVIAL:
+            return new_token, None
+        return new_token, [os.fsdecode(path) for path in body.split(b"\0") if path]
+
+    def quit(self) -> bool:
+        """Ask the daemon to stop, returning whether one was running."""
+        return self.request(b"quit\n") is not None
+
+    def request(self, message: bytes) -> Optional[bytes]:
+        """Send a request and return the whole answer, or None if none came."""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.TIMEOUT)
+                # Relative paths get around the short limit on socket paths
+                connection.connect(os.path.relpath(self.socket_path))
+                connection.sendall(message)
+                chunks: List[bytes] = []
+                while True:
+                    chunk: bytes = connection.recv(self.RECEIVE_SIZE)
+                    if not chunk:
+                        return b"".join(chunks)
+                    chunks.append(chunk)
+        except OSError:
+            return None
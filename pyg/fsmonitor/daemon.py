@@ -0,0 +1,236 @@
+import os
+import selectors
+import socket
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .inotify import (
+    Event,
+    IN_ATTRIB,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DONT_FOLLOW,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MODIFY,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Inotify,
+)
+from .protocol import TRIVIAL, format_token, parse_token
+
+
+class Daemon:
+    """
+    Watches a workspace and answers which paths changed since a token.
+
+    Every directory below the root, except .git, has an inotify watch. Each
+    changed path is logged with the sequence number current when its event
+    was read, and a token names a sequence number of this daemon. Asking what
+    changed since a token first drains the queued events, so that it sees
+    every change made before the question, then answers with the paths logged
+    after that token and a new token for the next question.
+
+    Tokens from another daemon, or from before events were lost, get the
+    trivial answer: anything may have changed, and a full walk is needed.
+    So does every token once the system runs out of watches, since changes
+    below the directories left unwatched would go unseen. A directory that
+    cannot be read is only skipped, as a walk cannot look inside it either,
+    and watched once its permissions change. Either is reported on stderr.
+    """
+
+    IGNORE = [b".git"]
+
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_ONLYDIR
+        | IN_DONT_FOLLOW
+    )
+
+    # Forget the log, making older tokens trivial, once it holds this many paths
+    MAX_LOG_SIZE = 1 << 20
+
+    BACKLOG = 16
+    REQUEST_SIZE = 4096
+
+    def __init__(self, root: Path, socket_path: Path) -> None:
+        self.root: bytes = os.fsencode(root)
+        self.socket_path: Path = socket_path
+        self.instance: str = os.urandom(8).hex()
+
+        # Tokens at or before this sequence number get the trivial answer
+        self.sequence: int = 1
+        self.horizon: int = 0
+        self.log: Dict[bytes, int] = {}
+
+        # Whether every directory is watched, without which no answer but the
+        # trivial one can be trusted
+        self.complete: bool = True
+
+        # Watched directories, by watch descriptor and by relative path
+        self.paths: Dict[int, bytes] = {}
+        self.watches: Dict[bytes, int] = {}
+
+        self.inotify: Inotify = Inotify()
+        self.running: bool = False
+
+    def run(self) -> None:
+        """Watch the workspace and serve requests until asked to quit."""
+        self._watch_tree(b"")
+
+        server: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(os.path.relpath(self.socket_path))
+        server.listen(self.BACKLOG)
+
+        selector = selectors.DefaultSelector()
+        selector.register(self.inotify.fd, selectors.EVENT_READ)
+        selector.register(server, selectors.EVENT_READ)
+
+        self.running = True
+        try:
+            while self.running:
+                for key, _ in selector.select():
+                    if key.fileobj is server:
+                        self._serve(server)
+                    else:
+                        self._drain()
+        finally:
+            selector.close()
+            server.close()
+            self.socket_path.unlink(missing_ok=True)
+            self.inotify.close()
+
+    def _serve(self, server: socket.socket) -> None:
+        """Answer the request of one client."""
+        connection, _ = server.accept()
+        with connection:
+            request: bytes = connection.recv(self.REQUEST_SIZE)
+            command, _, argument = request.rstrip(b"\n").partition(b" ")
+            if command == b"query":
+                connection.sendall(self.query(argument.decode("utf-8")))
+            elif command == b"quit":
+                self.running = False
+                connection.sendall(b"ok\n")
+
+    def query(self, token: str) -> bytes:
+        """Return a new token and the paths changed since a token."""
+        self._drain()
+        since: Optional[int] = parse_token(token, self.instance)
+        answer: bytes = format_token(self.instance, self.sequence) + b"\n"
+        if since is None or since < self.horizon or not self.complete:
+            answer += TRIVIAL
+        else:
+            answer += b"\0".join(p for p, seq in self.log.items() if seq > since)
+
+        # Later changes are logged after the token just handed out
+        self.sequence += 1
+        return answer
+
+    def _drain(self) -> None:
+        """Log every queued event."""
+        for event in self.inotify.read():
+            self._handle(event)
+        if len(self.log) > self.MAX_LOG_SIZE:
+            self._forget()
+
+    def _forget(self) -> None:
+        """Drop the log, so that every token handed out so far is trivial."""
+        self.log = {}
+        self.horizon = self.sequence
+
+    def _handle(self, event: Event) -> None:
+        if event.mask & IN_Q_OVERFLOW:
+            self._forget()
+            return
+
+        directory: Optional[bytes] = self.paths.get(event.wd)
+        if directory is None:
+            return
+        if event.mask & IN_IGNORED:
+            # The directory is gone, though another may have its name by now
+            del self.paths[event.wd]
+            if self.watches.get(directory) == event.wd:
+                del self.watches[directory]
+            return
+
+        path: bytes = self._join(directory, event.name)
+        if not event.name or (not directory and event.name in self.IGNORE):
+            return
+        self.log[path] = self.sequence
+
+        if event.mask & IN_ISDIR:
+            if event.mask & IN_MOVED_FROM:
+                # The directory keeps its watches under its new name, if any
+                for watched in [p for p in self.watches if self._below(p, path)]:
+                    self.inotify.rm_watch(self.watches[watched])
+                    self._unwatch(watched)
+            elif event.mask & (IN_CREATE | IN_MOVED_TO) or (
+                event.mask & IN_ATTRIB and path not in self.watches
+            ):
+                # Anything created before the new watch is in place is logged,
+                # as is what was in a directory that has become readable
+                self._watch_tree(path, log=True)
+
+    def _watch_tree(self, top: bytes, log: bool = False) -> None:
+        """Add watches for a directory and every directory below it."""
+        stack: List[bytes] = [top]
+        while stack:
+            directory: bytes = stack.pop()
+            absolute: bytes = self._join(self.root, directory)
+            try:
+                wd: int = self.inotify.add_watch(absolute, self.MASK)
+            except (FileNotFoundError, NotADirectoryError):
+                # Gone or replaced since it was listed, which is logged
+                continue
+            except PermissionError as error:
+                self._warn(directory, error, "skipping it until it is readable")
+                continue
+            except OSError as error:
+                # Out of watches: changes below here would be missed, so
+                # clients are sent to walk the workspace from now on
+                self._warn(directory, error, "answering every query with a walk")
+                self._forget()
+                self.complete = False
+                continue
+            self.paths[wd] = directory
+            self.watches[directory] = wd
+
+            try:
+                entries = list(os.scandir(absolute))
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            for entry in entries:
+                if not directory and entry.name in self.IGNORE:
+                    continue
+                path: bytes = self._join(directory, entry.name)
+                if log:
+                    self.log[path] = self.sequence
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+
+    def _warn(self, directory: bytes, error: OSError, action: str) -> None:
+        sys.stderr.write(
+            f"warning: fsmonitor cannot watch '{os.fsdecode(directory) or '.'}': "
+            f"{error.strerror}; {action}\n"
+        )
+
+    def _unwatch(self, directory: bytes) -> None:
+        wd: Optional[int] = self.watches.pop(directory, None)
+        if wd is not None:
+            self.paths.pop(wd, None)
+
+    def _join(self, directory: bytes, name: bytes) -> bytes:
+        return directory + b"/" + name if directory else name
+
+    def _below(self, path: bytes, directory: bytes) -> bool:
+        return path == directory or path.startswith(directory + b"/")
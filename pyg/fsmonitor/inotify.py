@@ -0,0 +1,83 @@
+import ctypes
+import os
+import struct
+from typing import Iterator, NamedTuple
+
+# Events, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_FORMAT = "iIII"
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+
+READ_SIZE = 1 << 16
+
+
+class Event(NamedTuple):
+    wd: int
+    mask: int
+    cookie: int
+    name: bytes
+
+
+class Inotify:
+    """
+    A thin wrapper over Linux's inotify, through the C library.
+
+    The descriptor is non-blocking, so that it can be polled along with other
+    descriptors and drained until no events are left.
+    """
+
+    def __init__(self) -> None:
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd: int = self._check(self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def _check(self, result: int) -> int:
+        if result < 0:
+            errno: int = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return result
+
+    def add_watch(self, path: bytes, mask: int) -> int:
+        """Watch a path for events, returning its watch descriptor."""
+        return self._check(self.libc.inotify_add_watch(self.fd, path, mask))
+
+    def rm_watch(self, wd: int) -> None:
+        """Stop watching a watch descriptor, ignoring ones already gone."""
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self) -> Iterator[Event]:
+        """Yield every event queued so far, without blocking."""
+        while True:
+            try:
+                data: bytes = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return
+
+            offset: int = 0
+            while offset < len(data):
+                wd, mask, cookie, size = struct.unpack_from(EVENT_FORMAT, data, offset)
+                offset += EVENT_SIZE
+                name: bytes = data[offset : offset + size].rstrip(b"\0")
+                offset += size
+                yield Event(wd, mask, cookie, name)
+
+    def close(self) -> None:
+        os.close(self.fd)
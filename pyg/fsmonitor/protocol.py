@@ -0,0 +1,28 @@
+from typing import Optional
+
+# Where the daemon listens, within the .git directory
+SOCKET_NAME = "pyg-fsmonitor.sock"
+
+# Where a daemon that was started writes its warnings, within .git
+LOG_NAME = "pyg-fsmonitor.log"
+
+# Sent instead of a list of paths when anything may have changed
+TRIVIAL = b"/"
+
+TOKEN_PREFIX = "pyg"
+
+
+def format_token(instance: str, sequence: int) -> bytes:
+    """Name a sequence number of one run of the daemon."""
+    return f"{TOKEN_PREFIX}:{instance}:{sequence}".encode("utf-8")
+
+
+def parse_token(token: str, instance: str) -> Optional[int]:
+    """Return the sequence number of a token, if this run of the daemon made it."""
+    parts = token.split(":")
+    if len(parts) != 3 or parts[0] != TOKEN_PREFIX or parts[1] != instance:
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
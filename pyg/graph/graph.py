@@ -0,0 +1,65 @@
+from typing import List, Tuple
+
+# A commit-graph file is an 8-byte header ("CGPH", version, hash version,
+# number of chunks, number of base graphs), a table of chunk ids and offsets
+# ending in a zero id, then the chunks, followed by the SHA-1 of everything
+# before it. The chunks hold a fanout table of cumulative counts by first oid
+# byte, the sorted oids and one fixed-width row of commit data per oid.
+#
+# Graphs are written in layers: each layer holds the commits added since the
+# layers below it, which are named in a chain file, base first. Positions of
+# commits run on from one layer to the next.
+
+SIGNATURE = b"CGPH"
+VERSION = 1
+HASH_VERSION = 1
+HEADER_FORMAT = ">4s4B"
+HEADER_SIZE = 8
+
+CHUNK_FORMAT = ">4sQ"
+CHUNK_SIZE = 12
+
+OID_FANOUT = b"OIDF"
+OID_LOOKUP = b"OIDL"
+COMMIT_DATA = b"CDAT"
+EXTRA_EDGES = b"EDGE"
+BASE_GRAPHS = b"BASE"
+
+FANOUT_SIZE = 256 * 4
+OID_SIZE = 20
+
+# Tree oid, first and second parent positions, then the generation number in
+# the top 30 bits of a 64-bit field whose low 34 bits hold the commit time
+DATA_FORMAT = ">20s4I"
+DATA_SIZE = 36
+
+NO_PARENT = 0x70000000
+
+# Set on the second parent of a commit with more than two parents, whose low
+# bits index the list of extra edges, and on the last of those edges
+EXTRA_EDGE = 0x80000000
+
+GENERATION_MAX = 0x3FFFFFFF
+
+GRAPHS_DIR = ("info", "commit-graphs")
+CHAIN_NAME = "commit-graph-chain"
+
+
+def layer_name(checksum: str) -> str:
+    return f"graph-{checksum}.graph"
+
+
+def read_commit(data: bytes) -> Tuple[str, List[str], int]:
+    """Return the tree, parents and commit time of a commit, from its headers."""
+    tree: str = ""
+    parents: List[str] = []
+    time: int = 0
+    for line in data.split(b"\n\n", 1)[0].split(b"\n"):
+        key, _, value = line.partition(b" ")
+        if key == b"tree":
+            tree = value.decode("ascii")
+        elif key == b"parent":
+            parents.append(value.decode("ascii"))
+        elif key == b"committer":
+            time = int(value.rsplit(b" ", 2)[1])
+    return tree, parents, time
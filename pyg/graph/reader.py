@@ -0,0 +1,226 @@
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import warm
+
+from .graph import (
+    BASE_GRAPHS,
+    CHAIN_NAME,
+    CHUNK_FORMAT,
+    CHUNK_SIZE,
+    COMMIT_DATA,
+    DATA_FORMAT,
+    DATA_SIZE,
+    EXTRA_EDGE,
+    EXTRA_EDGES,
+    GRAPHS_DIR,
+    HASH_VERSION,
+    HEADER_FORMAT,
+    HEADER_SIZE,
+    NO_PARENT,
+    OID_FANOUT,
+    OID_LOOKUP,
+    OID_SIZE,
+    SIGNATURE,
+    VERSION,
+    layer_name,
+)
+
+
+class Layer:
+    """
+    One commit-graph file, memory-mapped.
+
+    Commits are found by binary searching the oid table within the range
+    given by the fanout table, and their rows are read where they lie, so a
+    layer is never parsed as a whole.
+    """
+
+    def __init__(self, path: Path, checksum: str, base: int) -> None:
+        self.path: Path = path
+        self.checksum: str = checksum
+
+        # Position of the layer's first commit within the whole graph
+        self.base: int = base
+
+        with open(path, "rb") as f:
+            self.data: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        signature, version, hash_version, chunk_count, self.base_count = (
+            struct.unpack_from(HEADER_FORMAT, self.data)
+        )
+        if (signature, version, hash_version) != (SIGNATURE, VERSION, HASH_VERSION):
+            raise Exception(f"{path} is not a version {VERSION} commit-graph")
+
+        self.chunks: Dict[bytes, int] = {}
+        for i in range(chunk_count):
+            chunk_id, offset = struct.unpack_from(
+                CHUNK_FORMAT, self.data, HEADER_SIZE + i * CHUNK_SIZE
+            )
+            self.chunks[chunk_id] = offset
+        for chunk_id in (OID_FANOUT, OID_LOOKUP, COMMIT_DATA):
+            if chunk_id not in self.chunks:
+                raise Exception(f"{path} has no {chunk_id.decode()} chunk")
+
+        self.count: int = self._fanout(255)
+
+    def _fanout(self, byte: int) -> int:
+        offset: int = self.chunks[OID_FANOUT] + byte * 4
+        return struct.unpack_from(">I", self.data, offset)[0]
+
+    def base_checksums(self) -> List[str]:
+        """Return the checksums of the layers this one was written on top of."""
+        offset: Optional[int] = self.chunks.get(BASE_GRAPHS)
+        if offset is None:
+            return []
+        return [
+            self.data[offset + i * OID_SIZE : offset + (i + 1) * OID_SIZE].hex()
+            for i in range(self.base_count)
+        ]
+
+    def lookup(self, oid: bytes) -> Optional[int]:
+        """Return the index of a commit within the layer, if the layer has it."""
+        first: int = oid[0]
+        low: int = self._fanout(first - 1) if first else 0
+        high: int = self._fanout(first)
+
+        data: mmap.mmap = self.data
+        table: int = self.chunks[OID_LOOKUP]
+        while low < high:
+            mid: int = (low + high) // 2
+            position: int = table + mid * OID_SIZE
+            found: bytes = data[position : position + OID_SIZE]
+            if found < oid:
+                low = mid + 1
+            elif found > oid:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def oid(self, i: int) -> bytes:
+        position: int = self.chunks[OID_LOOKUP] + i * OID_SIZE
+        return self.data[position : position + OID_SIZE]
+
+    def row(self, i: int) -> Tuple[bytes, int, int, int, int]:
+        """Return a commit's tree, raw parent fields and raw generation fields."""
+        return struct.unpack_from(
+            DATA_FORMAT, self.data, self.chunks[COMMIT_DATA] + i * DATA_SIZE
+        )
+
+    def extra_edges(self, index: int) -> List[int]:
+        """Return the parents listed from an index of the extra edges onwards."""
+        offset: int = self.chunks[EXTRA_EDGES] + index * 4
+        parents: List[int] = []
+        while True:
+            edge: int = struct.unpack_from(">I", self.data, offset)[0]
+            parents.append(edge & ~EXTRA_EDGE)
+            if edge & EXTRA_EDGE:
+                return parents
+            offset += 4
+
+    def close(self) -> None:
+        self.data.close()
+
+
+class CommitGraph:
+    """
+    The commits of a repository's history, by position.
+
+    Each commit's tree, parents, generation number and commit time are read
+    from its row, so history can be walked without opening any objects. The
+    graph is made of the layers named in the chain file; a layer that is
+    missing, or that was not written on top of the layers below it, ends the
+    graph there.
+    """
+
+    def __init__(self, layers: Optional[List[Layer]] = None) -> None:
+        self.layers: List[Layer] = layers or []
+        self.bases: List[int] = [layer.base for layer in self.layers]
+        self.count: int = sum(layer.count for layer in self.layers)
+
+    @classmethod
+    def load(cls, objects_path: Path) -> "CommitGraph":
+        """Read the graph of an object database, which may be empty."""
+        graphs_dir: Path = Path(objects_path).joinpath(*GRAPHS_DIR)
+        chain_path: Path = graphs_dir.joinpath(CHAIN_NAME)
+        kept: Optional[CommitGraph] = warm.take(chain_path)
+        if kept:
+            return kept
+        try:
+            with open(chain_path) as f:
+                stat: os.stat_result = os.fstat(f.fileno())
+                checksums: List[str] = f.read().split()
+        except FileNotFoundError:
+            return cls()
+
+        layers: List[Layer] = []
+        base: int = 0
+        for checksum in checksums:
+            try:
+                layer: Layer = Layer(
+                    graphs_dir.joinpath(layer_name(checksum)), checksum, base
+                )
+            except Exception:
+                break
+            if layer.base_checksums() != [prior.checksum for prior in layers]:
+                layer.close()
+                break
+            layers.append(layer)
+            base += layer.count
+        graph: CommitGraph = cls(layers)
+        warm.keep(chain_path, graph, stat)
+        return graph
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _locate(self, position: int) -> Tuple[Layer, int]:
+        layer: Layer = self.layers[bisect_right(self.bases, position) - 1]
+        return layer, position - layer.base
+
+    def lookup(self, oid: str) -> Optional[int]:
+        """Return the position of a commit, if the graph has it."""
+        raw: bytes = bytes.fromhex(oid)
+        for layer in reversed(self.layers):
+            i: Optional[int] = layer.lookup(raw)
+            if i is not None:
+                return layer.base + i
+        return None
+
+    def oid(self, position: int) -> str:
+        layer, i = self._locate(position)
+        return layer.oid(i).hex()
+
+    def tree(self, position: int) -> str:
+        layer, i = self._locate(position)
+        return layer.row(i)[0].hex()
+
+    def parents(self, position: int) -> List[int]:
+        """Return the positions of a commit's parents."""
+        layer, i = self._locate(position)
+        _, first, second, _, _ = layer.row(i)
+        if first == NO_PARENT:
+            return []
+        if second == NO_PARENT:
+            return [first]
+        if second & EXTRA_EDGE:
+            return [first, *layer.extra_edges(second & ~EXTRA_EDGE)]
+        return [first, second]
+
+    def generation(self, position: int) -> int:
+        layer, i = self._locate(position)
+        return layer.row(i)[3] >> 2
+
+    def commit_time(self, position: int) -> int:
+        layer, i = self._locate(position)
+        _, _, _, high, low = layer.row(i)
+        return (high & 3) << 32 | low
+
+    def close(self) -> None:
+        for layer in self.layers:
+            layer.close()
@@ -0,0 +1,254 @@
+import os
+import struct
+import tempfile
+from hashlib import sha1
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from database.database import Database
+from lockfile import Lockfile
+
+from .graph import (
+    BASE_GRAPHS,
+    CHAIN_NAME,
+    CHUNK_FORMAT,
+    CHUNK_SIZE,
+    COMMIT_DATA,
+    DATA_FORMAT,
+    EXTRA_EDGE,
+    EXTRA_EDGES,
+    GENERATION_MAX,
+    GRAPHS_DIR,
+    HASH_VERSION,
+    HEADER_FORMAT,
+    HEADER_SIZE,
+    NO_PARENT,
+    OID_FANOUT,
+    OID_LOOKUP,
+    SIGNATURE,
+    VERSION,
+    layer_name,
+    read_commit,
+)
+from .reader import CommitGraph, Layer
+
+
+class Node(NamedTuple):
+    tree: str
+    parents: List[str]
+    time: int
+    generation: Optional[int]
+
+
+class Writer:
+    """
+    Adds commits to the commit-graph, as a new layer on top of the others.
+
+    Only commits that the graph does not have yet are read from the
+    database. Like Git's split commit-graphs, the new layer is merged with
+    the layers below it for as long as it holds more than half as many
+    commits as the layer under it, so there are O(log n) layers and each
+    commit is rewritten O(log n) times over the life of a repository.
+    """
+
+    SIZE_MULTIPLE = 2
+
+    MODE = 0o444
+
+    def __init__(self, database: Database) -> None:
+        self.database: Database = database
+        self.graphs_dir: Path = Path(database.pathname).joinpath(*GRAPHS_DIR)
+
+    def write(self, tips: Iterable[str]) -> bool:
+        """
+        Add every commit reachable from some commits to the graph.
+
+        Returns False if another process is writing the graph.
+        """
+        self.graphs_dir.mkdir(parents=True, exist_ok=True)
+        lockfile: Lockfile = Lockfile(self.graphs_dir.joinpath(CHAIN_NAME))
+        if not lockfile.hold_for_update():
+            return False
+
+        graph: CommitGraph = CommitGraph.load(self.database.pathname)
+        try:
+            nodes: Dict[str, Node] = self._read_new_commits(graph, tips)
+            if not nodes:
+                lockfile.rollback()
+                return True
+
+            layers: List[Layer] = list(graph.layers)
+            merged: List[Layer] = []
+            while layers and len(nodes) * self.SIZE_MULTIPLE > layers[-1].count:
+                layer: Layer = layers.pop()
+                nodes.update(self._read_layer(graph, layer))
+                merged.append(layer)
+
+            base: CommitGraph = CommitGraph(layers)
+            checksum: str = self._write_layer(base, nodes)
+        except BaseException:
+            lockfile.rollback()
+            graph.close()
+            raise
+
+        for layer in layers:
+            lockfile.write(f"{layer.checksum}\n")
+        lockfile.write(f"{checksum}\n")
+        lockfile.commit()
+
+        graph.close()
+        for layer in merged:
+            layer.path.unlink(missing_ok=True)
+        return True
+
+    def _read_new_commits(
+        self, graph: CommitGraph, tips: Iterable[str]
+    ) -> Dict[str, Node]:
+        """Read the commits reachable from some commits that the graph lacks."""
+        nodes: Dict[str, Node] = {}
+        stack: List[str] = list(tips)
+        while stack:
+            oid: str = stack.pop()
+            if oid in nodes or graph.lookup(oid) is not None:
+                continue
+            obj_type, data = self.database.read_object(oid)
+            if obj_type != "commit":
+                raise Exception(f"{oid} is a {obj_type}, not a commit")
+            tree, parents, time = read_commit(data)
+            nodes[oid] = Node(tree, parents, time, None)
+            stack.extend(parents)
+        return nodes
+
+    def _read_layer(self, graph: CommitGraph, layer: Layer) -> Dict[str, Node]:
+        """Read back the commits of a layer that is to be merged."""
+        nodes: Dict[str, Node] = {}
+        for i in range(layer.count):
+            position: int = layer.base + i
+            nodes[layer.oid(i).hex()] = Node(
+                graph.tree(position),
+                [graph.oid(parent) for parent in graph.parents(position)],
+                graph.commit_time(position),
+                graph.generation(position),
+            )
+        return nodes
+
+    def _generations(self, base: CommitGraph, nodes: Dict[str, Node]) -> None:
+        """
+        Fill in the generation numbers the nodes lack.
+
+        A commit's generation is one more than the highest of its parents',
+        so parents are numbered first, without recursing.
+        """
+        for oid in nodes:
+            stack: List[str] = [oid]
+            while stack:
+                top: Node = nodes[stack[-1]]
+                if top.generation is not None:
+                    stack.pop()
+                    continue
+
+                generation: int = 0
+                pending: List[str] = []
+                for parent in top.parents:
+                    node: Optional[Node] = nodes.get(parent)
+                    if node is None:
+                        position: Optional[int] = base.lookup(parent)
+                        if position is None:
+                            raise Exception(f"Parent {parent} is not in the graph")
+                        generation = max(generation, base.generation(position))
+                    elif node.generation is None:
+                        pending.append(parent)
+                    else:
+                        generation = max(generation, node.generation)
+
+                if pending:
+                    stack.extend(pending)
+                else:
+                    nodes[stack.pop()] = top._replace(
+                        generation=min(generation + 1, GENERATION_MAX)
+                    )
+
+    def _write_layer(self, base: CommitGraph, nodes: Dict[str, Node]) -> str:
+        """Write the nodes as a layer on top of a graph, returning its checksum."""
+        self._generations(base, nodes)
+        oids: List[str] = sorted(nodes)
+        positions: Dict[str, int] = {oid: len(base) + i for i, oid in enumerate(oids)}
+
+        def position(oid: str) -> int:
+            found: Optional[int] = positions.get(oid)
+            if found is None:
+                found = base.lookup(oid)
+            if found is None:
+                raise Exception(f"Parent {oid} is not in the graph")
+            return found
+
+        fanout: List[int] = [0] * 256
+        rows: List[bytes] = []
+        edges: List[int] = []
+        for oid in oids:
+            fanout[int(oid[:2], 16)] += 1
+            node: Node = nodes[oid]
+            parents: List[int] = [position(parent) for parent in node.parents]
+            first: int = parents[0] if parents else NO_PARENT
+            second: int = parents[1] if len(parents) == 2 else NO_PARENT
+            if len(parents) > 2:
+                second = EXTRA_EDGE | len(edges)
+                edges.extend(parents[1:])
+                edges[-1] |= EXTRA_EDGE
+
+            generation: int = node.generation or 1
+            rows.append(
+                struct.pack(
+                    DATA_FORMAT,
+                    bytes.fromhex(node.tree),
+                    first,
+                    second,
+                    generation << 2 | (node.time >> 32 & 3),
+                    node.time & 0xFFFFFFFF,
+                )
+            )
+        for i in range(1, 256):
+            fanout[i] += fanout[i - 1]
+
+        chunks: List[Tuple[bytes, bytes]] = [
+            (OID_FANOUT, struct.pack(">256I", *fanout)),
+            (OID_LOOKUP, b"".join(bytes.fromhex(oid) for oid in oids)),
+            (COMMIT_DATA, b"".join(rows)),
+        ]
+        if edges:
+            chunks.append((EXTRA_EDGES, struct.pack(f">{len(edges)}I", *edges)))
+        if base.layers:
+            chunks.append(
+                (
+                    BASE_GRAPHS,
+                    b"".join(bytes.fromhex(layer.checksum) for layer in base.layers),
+                )
+            )
+
+        parts: List[bytes] = [
+            struct.pack(
+                HEADER_FORMAT,
+                SIGNATURE,
+                VERSION,
+                HASH_VERSION,
+                len(chunks),
+                len(base.layers),
+            )
+        ]
+        offset: int = HEADER_SIZE + (len(chunks) + 1) * CHUNK_SIZE
+        for chunk_id, chunk in chunks:
+            parts.append(struct.pack(CHUNK_FORMAT, chunk_id, offset))
+            offset += len(chunk)
+        parts.append(struct.pack(CHUNK_FORMAT, bytes(4), offset))
+        parts.extend(chunk for _, chunk in chunks)
+
+        data: bytes = b"".join(parts)
+        checksum: bytes = sha1(data).digest()
+
+        fd, temp_name = tempfile.mkstemp(prefix="tmp_graph_", dir=self.graphs_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.write(checksum)
+        Path(temp_name).chmod(self.MODE)
+        Path(temp_name).rename(self.graphs_dir.joinpath(layer_name(checksum.hex())))
+        return checksum.hex()
@@ -0,0 +1,208 @@
+import re
+from pathlib import Path
+from typing import List, Match, Optional, Pattern, Tuple
+
+# A compiled rule set: its expression and whether each group negates
+Compiled = Tuple[Pattern[str], List[bool]]
+
+
+def translate(glob: str) -> str:
+    """
+    Translate a gitignore glob into a regular expression.
+
+    Wildcards never match a slash, except for "**" as a whole path component,
+    which matches any number of directories.
+    """
+    out: List[str] = []
+    i: int = 0
+    n: int = len(glob)
+    while i < n:
+        c: str = glob[i]
+        if glob.startswith("**", i) and (i == 0 or glob[i - 1] == "/"):
+            if i + 2 == n:
+                # Trailing "**" matches everything inside
+                out.append(".*")
+                i += 2
+                continue
+            if glob[i + 2] == "/":
+                # Leading or inner "**/" matches zero or more directories
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+        if c == "*":
+            out.append("[^/]*")
+            while i + 1 < n and glob[i + 1] == "*":
+                i += 1
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            # A "]" straight after the opening bracket is part of the class
+            start: int = i + 2 if glob[i + 1 : i + 2] in ("!", "^") else i + 1
+            end: int = glob.find("]", start + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body: str = glob[i + 1 : end]
+                negate: bool = body[:1] in ("!", "^")
+                if negate:
+                    body = body[1:]
+                for special in ("\\", "[", "^"):
+                    body = body.replace(special, "\\" + special)
+                out.append(f"[^/{body}]" if negate else f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class Rule:
+    """A single pattern line of an ignore file."""
+
+    def __init__(self, line: str) -> None:
+        self.negate: bool = False
+        self.dir_only: bool = False
+
+        if line.startswith("!"):
+            self.negate = True
+            line = line[1:]
+        elif line[:2] in ("\\#", "\\!"):
+            line = line[1:]
+
+        if line.endswith("/"):
+            self.dir_only = True
+            line = line.rstrip("/")
+
+        # Patterns with a slash are relative to the directory of the ignore
+        # file; others match a name at any depth below it
+        anchored: bool = "/" in line
+        line = line.lstrip("/")
+        prefix: str = "" if anchored else "(?:.*/)?"
+        self.pattern: str = prefix + translate(line)
+
+    @classmethod
+    def parse(cls, line: str) -> Optional["Rule"]:
+        """Build a rule from a line, or return None for blanks and comments."""
+        line = line.rstrip("\n")
+        if line.startswith("#"):
+            return None
+
+        # Trailing spaces are dropped unless escaped with a backslash
+        stripped: str = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        if not stripped or stripped == "!":
+            return None
+        return cls(stripped)
+
+
+class RuleSet:
+    """
+    The rules of one ignore file, compiled into regular expressions.
+
+    The last rule to match a path decides whether it is ignored, so the rules
+    are joined in reverse order into one alternation, and the group that
+    matches is the deciding rule. Rules that only apply to directories are
+    left out of the expression used for files.
+    """
+
+    def __init__(self, rules: List[Rule]) -> None:
+        self.files: Optional[Compiled] = self._compile(
+            [rule for rule in rules if not rule.dir_only]
+        )
+        self.dirs: Optional[Compiled] = self._compile(rules)
+
+    @staticmethod
+    def _compile(rules: List[Rule]) -> Optional[Compiled]:
+        """Join rules into one expression, with the negation of each group."""
+        if not rules:
+            return None
+        ordered: List[Rule] = rules[::-1]
+        groups: str = "|".join(f"({rule.pattern})" for rule in ordered)
+        regex: Pattern[str] = re.compile(f"(?:{groups})\\Z", re.DOTALL)
+        return regex, [rule.negate for rule in ordered]
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Return whether the rules ignore a path relative to their directory.
+
+        Returns None when no rule matches, so that outer rules can decide.
+        """
+        compiled: Optional[Compiled] = self.dirs if is_dir else self.files
+        if not compiled:
+            return None
+        regex, negations = compiled
+        found: Optional[Match[str]] = regex.match(path)
+        if not found or not found.lastindex:
+            return None
+        return not negations[found.lastindex - 1]
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["RuleSet"]:
+        """Read the rules of an ignore file, if it exists and has any."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                rules: List[Rule] = [
+                    rule for rule in map(Rule.parse, f) if rule is not None
+                ]
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return cls(rules) if rules else None
+
+
+class Ignore:
+    """
+    Decides which paths of a workspace are ignored.
+
+    Rules come from .git/info/exclude and from the .gitignore file of every
+    directory walked, with deeper files taking precedence. Each set of rules
+    is kept with the directory it applies to, as a path relative to the root.
+    """
+
+    FILE_NAME = ".gitignore"
+
+    def __init__(self, exclude: Optional[RuleSet] = None) -> None:
+        self.frames: List[Tuple[str, RuleSet]] = []
+        if exclude:
+            self.frames.append(("", exclude))
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        """Check a path, relative to the root and separated by slashes."""
+        for base, rules in reversed(self.frames):
+            if base:
+                if not path.startswith(base):
+                    continue
+                relative: str = path[len(base) :]
+            else:
+                relative = path
+            result: Optional[bool] = rules.match(relative, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def enter(self, directory: Path, base: str) -> bool:
+        """
+        Load the .gitignore of a directory whose path has the prefix base.
+
+        Returns whether a frame was added, which must later be removed with
+        leave.
+        """
+        rules: Optional[RuleSet] = RuleSet.load(directory.joinpath(self.FILE_NAME))
+        if not rules:
+            return False
+        self.frames.append((base, rules))
+        return True
+
+    def below(self, directory: Path, base: str) -> "Ignore":
+        """Return the rules for the paths inside a directory, leaving these be."""
+        ignore: Ignore = Ignore()
+        ignore.frames = list(self.frames)
+        ignore.enter(directory, base)
+        return ignore
+
+    def leave(self) -> None:
+        """Drop the rules of the most recently entered directory."""
+        self.frames.pop()
@@ -0,0 +1,145 @@
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from database.tree import Tree
+from database.tree_writer import TreeWriter
+from entry import Entry as WorkspaceEntry
+import tracing
+
+from .checksum import Checksum
+from .store import EntryStore
+
+T = TypeVar("T", bound="CacheTree")
+
+OID_SIZE = 20
+
+
+class CacheTree:
+    """
+    The tree oid of every directory in the index, as in Git's TREE extension.
+
+    Each node records how many index entries its directory covers and the oid
+    of the tree built from them. A node with an entry count of -1 is invalid
+    and must be rebuilt; valid nodes let a commit skip over their entries and
+    reuse their tree without serializing or hashing it again.
+    """
+
+    SIGNATURE = b"TREE"
+
+    def __init__(self, entry_count: int = -1, oid: Optional[str] = None) -> None:
+        self.entry_count: int = entry_count
+        self.oid: Optional[str] = oid
+        self.children: Dict[str, CacheTree] = {}
+
+    def invalidate(self, pathname: Path) -> None:
+        """Invalidate the trees of every directory that contains a path."""
+        node: Optional[CacheTree] = self
+        for part in pathname.parts[:-1]:
+            if node is None:
+                return
+            node.entry_count = -1
+            node = node.children.get(part)
+        if node is not None:
+            node.entry_count = -1
+
+    @tracing.traced("cache_tree.update")
+    def update(self, entries: EntryStore, store: Callable[[Tree], None]) -> str:
+        """
+        Store a tree for every invalid directory and return the root tree's oid.
+
+        Index entries are sorted by path bytes, which is also the order of the
+        entries within every tree, so each directory's entries form one run,
+        and a directory's tree can be stored as soon as its run ends. Only
+        the directories above the current entry are held open.
+        """
+        if self.entry_count < 0:
+            self._update(entries.sorted_paths(), entries, TreeWriter(store))
+        if not isinstance(self.oid, str):
+            raise Exception(f"Tree {self} does not have oid")
+        return self.oid
+
+    def _update(
+        self, paths: List[bytes], entries: EntryStore, writer: TreeWriter
+    ) -> None:
+        """Rebuild this directory and every invalid directory below it."""
+        # The open directories: their nodes, the prefix of their paths, the
+        # position of their first entry and the children found so far
+        stack: List[Tuple[CacheTree, bytes, int, Dict[str, CacheTree]]] = [
+            (self, b"", 0, {})
+        ]
+        i: int = 0
+        while stack:
+            node, prefix, start, children = stack[-1]
+            if i == len(paths) or not paths[i].startswith(prefix):
+                # Every entry of the directory has been added
+                node.oid = writer.leave()
+                node.entry_count = i - start
+                node.children = children
+                stack.pop()
+                continue
+
+            rest: bytes = paths[i][len(prefix) :]
+            slash: int = rest.find(b"/")
+            if slash < 0:
+                entry = entries.entry_at(i)
+                writer.add(rest.decode("utf-8"), entry.oid, f"{entry.mode:o}")
+                i += 1
+                continue
+
+            # Enter the subdirectory, unless its tree is still valid
+            name: str = rest[:slash].decode("utf-8")
+            child: CacheTree = node.children.get(name) or CacheTree()
+            children[name] = child
+            if child.entry_count >= 0:
+                writer.add(name, str(child.oid), WorkspaceEntry.DIRECTORY_MODE)
+                i += child.entry_count
+            else:
+                writer.enter(name)
+                stack.append((child, prefix + rest[: slash + 1], i, {}))
+
+    @classmethod
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Read the tree back from the data of a TREE extension."""
+        _, tree, offset = cls._parse(data, 0)
+        if offset != len(data):
+            raise Exception("Unexpected data after cache tree")
+        return tree
+
+    @classmethod
+    def _parse(cls: Type[T], data: bytes, offset: int) -> Tuple[str, T, int]:
+        """Read one node and its children, returning its name and next offset."""
+        try:
+            null: int = data.index(b"\0", offset)
+            newline: int = data.index(b"\n", null)
+        except ValueError:
+            raise Checksum.EndOfFile("Unexpected end-of-file while reading index")
+
+        name: str = data[offset:null].decode("utf-8")
+        entry_count, subtree_count = map(int, data[null + 1 : newline].split(b" "))
+        offset = newline + 1
+
+        tree: T = cls(entry_count)
+        if entry_count >= 0:
+            tree.oid = data[offset : offset + OID_SIZE].hex()
+            offset += OID_SIZE
+
+        for _ in range(subtree_count):
+            child_name, child, offset = cls._parse(data, offset)
+            tree.children[child_name] = child
+        return name, tree, offset
+
+    def serialize(self, name: str = "") -> bytes:
+        """Return the data of a TREE extension, without its header."""
+        out: List[bytes] = [
+            name.encode("utf-8"),
+            f"\0{self.entry_count} {len(self.children)}\n".encode("utf-8"),
+        ]
+        if self.entry_count >= 0:
+            out.append(bytes.fromhex(str(self.oid)))
+
+        # Git orders subtrees by the length of their name, then by the name
+        for child_name in sorted(
+            self.children, key=lambda n: (len(n.encode("utf-8")), n.encode("utf-8"))
+        ):
+            out.append(self.children[child_name].serialize(child_name))
+        return b"".join(out)
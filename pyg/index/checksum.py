@@ -1,5 +1,5 @@
 from hashlib import sha1
-from typing import BinaryIO
+from typing import Union
 
 
 class Checksum:
@@ -8,21 +8,14 @@ class Checksum:
 
     CHECKSUM_SIZE = 20
 
-    def __init__(self, f: BinaryIO) -> None:
-        self.f = f
-        self.digest = sha1()
-
-    def read(self, size: int) -> bytes:
-        data: bytes = self.f.read(size)
-
-        if len(data) != size:
-            raise self.EndOfFile("Unexpected end-of-file while reading index")
-
-        self.digest.update(data)
-        return data
+    def __init__(self, data: Union[bytes, bytearray]) -> None:
+        self.data = data
 
     def verify_checksum(self) -> None:
-        s = self.f.read(self.CHECKSUM_SIZE)
+        """Check the trailing SHA-1 against the rest of the data in one pass."""
+        if len(self.data) < self.CHECKSUM_SIZE:
+            raise self.EndOfFile("Unexpected end-of-file while reading index")
 
-        if s != self.digest.digest():
+        body = memoryview(self.data)[: -self.CHECKSUM_SIZE]
+        if sha1(body).digest() != self.data[-self.CHECKSUM_SIZE :]:
             raise Exception("Checksum does not match value stored on disk")
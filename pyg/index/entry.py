@@ -1,7 +1,6 @@
 import struct
-from io import BytesIO
 from os import stat_result
-from typing import Final, NamedTuple, Type, TypeVar
+from typing import Final, NamedTuple, Tuple, Type, TypeVar, Union
 from pathlib import Path
 
 REGULAR_MODE = 0o100644
@@ -13,8 +12,65 @@ ENTRY_BLOCK = 8
 ENTRY_MIN_SIZE = 64
 ENTRY_FORMAT = ">10I20sH"
 
+# The stat fields at the start of an entry, in the order stat_fields gives them
+STAT_FORMAT = ">10I"
+
+# Byte offsets of fields within an entry
+ENTRY_MTIME_OFFSET = 8
+ENTRY_SIZE_OFFSET = 36
+ENTRY_OID_OFFSET = 40
+ENTRY_PATH_OFFSET = 62
+
 T = TypeVar("T", bound="Entry")
 
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def mode_for_stat(stat: stat_result) -> int:
+    """Returns the index mode of a file, either regular or executable."""
+    # Check if user has permissions to execute the file
+    return REGULAR_MODE if stat.st_mode & 0o000100 == 0 else EXECUTABLE_MODE
+
+
+def split_time(time_ns: int) -> Tuple[int, int]:
+    """Split a nanosecond timestamp into seconds and leftover nanoseconds."""
+    return divmod(time_ns, 1_000_000_000)
+
+
+def stat_fields(stat: stat_result) -> Tuple[int, ...]:
+    """Return a file's stat as the fields an entry stores, in the same order."""
+    # Written out rather than built from the helpers above, as comparing a
+    # whole workspace against the index calls this once per file
+    ctime, ctime_ns = divmod(stat.st_ctime_ns, 1_000_000_000)
+    mtime, mtime_ns = divmod(stat.st_mtime_ns, 1_000_000_000)
+    return (
+        ctime,
+        ctime_ns,
+        mtime,
+        mtime_ns,
+        stat.st_dev & 0xFFFFFFFF,
+        stat.st_ino & 0xFFFFFFFF,
+        EXECUTABLE_MODE if stat.st_mode & 0o000100 else REGULAR_MODE,
+        stat.st_uid & 0xFFFFFFFF,
+        stat.st_gid & 0xFFFFFFFF,
+        stat.st_size & 0xFFFFFFFF,
+    )
+
+
+def entry_size(path_length: int) -> int:
+    """Returns the size of an entry: its path is null-terminated and padded."""
+    return (ENTRY_PATH_OFFSET + path_length + ENTRY_BLOCK) & ~(ENTRY_BLOCK - 1)
+
+
+def padding(path_length: int) -> bytes:
+    """Returns the null bytes that follow a path of the given length."""
+    return b"\0" * (entry_size(path_length) - ENTRY_PATH_OFFSET - path_length)
+
+
+def uint32(value: int) -> int:
+    """Truncate a stat field to the 32 bits the index has room for."""
+    return value & 0xFFFFFFFF
+
 
 class Entry(NamedTuple):
     """
@@ -52,8 +108,7 @@ class Entry(NamedTuple):
     @classmethod
     def new(cls: Type[T], pathname: Path, oid: str, stat: stat_result) -> T:
         """Create a new entry."""
-        # Check if user has permissions to execute the file
-        mode = REGULAR_MODE if stat.st_mode & 0o000100 == 0 else EXECUTABLE_MODE
+        mode = mode_for_stat(stat)
 
         # Contains length of path or a maximum length
         flags = min([len(bytes(pathname)), MAX_PATH_SIZE])
@@ -61,10 +116,8 @@ class Entry(NamedTuple):
         # TODO may not match behavior on Windows
         # Time in seconds and nanoseconds
         # The value encoded for *_ns needs to exclude the seconds
-        ctime = int(stat.st_ctime)
-        ctime_ns = stat.st_ctime_ns - int(ctime * 1e9)
-        mtime = int(stat.st_mtime)
-        mtime_ns = stat.st_mtime_ns - int(mtime * 1e9)
+        ctime, ctime_ns = split_time(stat.st_ctime_ns)
+        mtime, mtime_ns = split_time(stat.st_mtime_ns)
 
         return cls(
             pathname=pathname,
@@ -75,37 +128,41 @@ class Entry(NamedTuple):
             ctime_ns=ctime_ns,
             mtime=mtime,
             mtime_ns=mtime_ns,
-            dev=stat.st_dev,
-            ino=stat.st_ino,
-            uid=stat.st_uid,
-            gid=stat.st_gid,
-            size=stat.st_size,
+            dev=uint32(stat.st_dev),
+            ino=uint32(stat.st_ino),
+            uid=uint32(stat.st_uid),
+            gid=uint32(stat.st_gid),
+            size=uint32(stat.st_size),
         )
 
     @classmethod
-    def parse(cls: Type[T], binary: bytes) -> T:
-        """Parse a binary representation of an entry into an object."""
-        with BytesIO(binary) as bio:
-            (
-                ctime,
-                ctime_ns,
-                mtime,
-                mtime_ns,
-                dev,
-                ino,
-                mode,
-                uid,
-                gid,
-                size,
-                hex_oid,
-                flags,
-            ) = struct.unpack(ENTRY_FORMAT, bio.read(62))
-
-            # Read variable-length path until null
-            path = b"".join(iter(lambda: bio.read(1), b"\0")).decode("utf-8")
+    def parse(cls: Type[T], binary: Union[bytes, bytearray], offset: int = 0) -> T:
+        """Parse the binary representation of an entry at an offset into an object."""
+        # Read variable-length path until null
+        start: int = offset + ENTRY_PATH_OFFSET
+        path: bytes = bytes(binary[start : binary.index(b"\0", start)])
+        return cls.unpack(binary, offset, path)
+
+    @classmethod
+    def unpack(cls: Type[T], record: Buffer, offset: int, path: bytes) -> T:
+        """Build an entry from its fixed-size fields at an offset and its path."""
+        (
+            ctime,
+            ctime_ns,
+            mtime,
+            mtime_ns,
+            dev,
+            ino,
+            mode,
+            uid,
+            gid,
+            size,
+            hex_oid,
+            flags,
+        ) = struct.unpack_from(ENTRY_FORMAT, record, offset)
 
         # Perform additional processing
-        pathname: Path = Path(path)
+        pathname: Path = Path(path.decode("utf-8"))
         oid: str = hex_oid.hex()
 
         return cls(
@@ -124,15 +181,24 @@ class Entry(NamedTuple):
             size=size,
         )
 
-    def __bytes__(self) -> bytes:
-        """Return binary representation of entry."""
+    def stat_match(self, stat: stat_result) -> bool:
+        """Check whether a file's size, mode and identity match the entry."""
+        return (
+            self.size == uint32(stat.st_size)
+            and self.mode == mode_for_stat(stat)
+            and self.ino == uint32(stat.st_ino)
+            and self.dev == uint32(stat.st_dev)
+        )
 
-        # Perform preprocessing
-        bin_path: bytes = bytes(self.pathname)
-        bin_oid: bytes = bytes.fromhex(self.oid[:40])
+    def times_match(self, stat: stat_result) -> bool:
+        """Check whether a file's ctime and mtime match the entry."""
+        mtime_match = (self.mtime, self.mtime_ns) == split_time(stat.st_mtime_ns)
+        ctime_match = (self.ctime, self.ctime_ns) == split_time(stat.st_ctime_ns)
+        return mtime_match and ctime_match
 
-        # Pack values whose length is known
-        s = struct.pack(
+    def record(self) -> bytes:
+        """Return the fixed-size fields of the entry, as stored on disk."""
+        return struct.pack(
             ENTRY_FORMAT,
             self.ctime,
             self.ctime_ns,
@@ -144,22 +210,14 @@ class Entry(NamedTuple):
             self.uid,
             self.gid,
             self.size,
-            bin_oid,
+            bytes.fromhex(self.oid[:40]),
             self.flags,
         )
 
-        with BytesIO() as bio:
-            # Write values whose length is known
-            bio.write(s)
-
-            # Write variable-length path
-            bio.write(bin_path)
-
-            # Need a null character
-            bio.write(b"\0")
-
-            # Pad to a multiple of ENTRY_BLOCK
-            while len(bio.getvalue()) % ENTRY_BLOCK != 0:
-                bio.write(b"\0")
+    def __bytes__(self) -> bytes:
+        """Return binary representation of entry."""
+        bin_path: bytes = bytes(self.pathname)
 
-            return bio.getvalue()
+        # Write variable-length path, null terminated and padded to a
+        # multiple of ENTRY_BLOCK
+        return self.record() + bin_path + padding(len(bin_path))
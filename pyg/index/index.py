@@ -1,14 +1,31 @@
+import os
 import struct
-from contextlib import contextmanager
 from hashlib import sha1
+from io import BufferedReader
 from os import stat_result
 from pathlib import Path
-from typing import BinaryIO, Dict, Optional, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
+from database.tree import Tree
 from lockfile import Lockfile
+import tracing
+import warm
 
+from .cache_tree import CacheTree
 from .checksum import Checksum
-from .entry import Entry, ENTRY_BLOCK, ENTRY_MIN_SIZE
+from .entry import (
+    Entry,
+    ENTRY_MTIME_OFFSET,
+    ENTRY_PATH_OFFSET,
+    ENTRY_SIZE_OFFSET,
+    Buffer,
+    entry_size,
+    split_time,
+    stat_fields,
+)
+from .monitor_state import MonitorState
+from .store import EntryStore
+from .untracked_cache import UntrackedCache
 
 
 class Index:
@@ -17,14 +34,29 @@ class Index:
     SIGNATURE = "DIRC"
     VERSION = 2
 
+    EXTENSION_HEADER_FORMAT = ">4sI"
+    EXTENSION_HEADER_SIZE = 8
+
+    UNTRACKED_NAME = "pyg-untracked"
+    MONITOR_NAME = "pyg-fsmonitor"
+
     def __init__(self, pathname: Path) -> None:
         self.pathname: Path = pathname
         self.lockfile: Lockfile = Lockfile(pathname, as_bytes=True)
+        self.untracked_path: Path = pathname.with_name(self.UNTRACKED_NAME)
+        self.monitor_path: Path = pathname.with_name(self.MONITOR_NAME)
+        self.untracked: Optional[UntrackedCache] = None
+        self.monitor: Optional[MonitorState] = None
         self.clear()
 
     def clear(self) -> None:
-        self.entries: Dict[Path, Entry] = {}
+        # Entries are kept in compact columns keyed by their path in bytes, and
+        # only turned into Entry objects when they are used
+        self.entries: EntryStore = EntryStore()
+        self.cache_tree: CacheTree = CacheTree()
+        self.checksum: Optional[bytes] = None
         self.changed: bool = False
+        self.timestamp: Optional[Tuple[int, int]] = None
 
     def add(self, pathname: Path, oid: Optional[str], stat: stat_result) -> None:
         """Queue entries for writing to index."""
@@ -32,26 +64,114 @@ class Index:
             raise Exception(f"Null OID for {pathname}")
         entry: Entry = Entry.new(pathname, oid, stat)
         self.store_entry(entry)
+        self.cache_tree.invalidate(pathname)
+        self.changed = True
+
+    def remove(self, pathname: Path) -> None:
+        """Remove the entry for a path, if there is one."""
+        path: bytes = bytes(pathname)
+        if path in self.entries:
+            self.entries.remove(path)
+            self.cache_tree.invalidate(pathname)
+            self.changed = True
+
+    def refresh(self, i: int, stat: stat_result) -> None:
+        """
+        Record the new stat of a file whose contents still match its entry.
+
+        The entry is given by its position within the sorted paths. Its oid
+        is unchanged, so the cached trees stay valid.
+        """
+        self.entries.refresh(i, stat_fields(stat))
         self.changed = True
 
+    @tracing.traced("index.write_updates")
     def write_updates(self) -> bool:
         """Write entries to index."""
         if not self.lockfile.hold_for_update():
             return False
 
+        # Read before the checksum it was written with changes
+        monitor: MonitorState = self.monitor_state()
         self.begin_write()
 
         # Convert into a 12 byte header of ("DIRC", index version, # of entries)
         header: bytes = struct.pack(self.HEADER_FORMAT, b"DIRC", 2, len(self.entries))
-        self.write(header)
+        chunks: List[Buffer] = [header]
+        chunks.extend(self.entries.serialize())
 
-        for key, entry in sorted(self.entries.items()):
-            self.write(bytes(entry))
+        # Keep the tree of every directory, so later commits can reuse them
+        cache_tree: bytes = self.cache_tree.serialize()
+        chunks.append(
+            struct.pack(
+                self.EXTENSION_HEADER_FORMAT, CacheTree.SIGNATURE, len(cache_tree)
+            )
+        )
+        chunks.append(cache_tree)
 
+        self.write(b"".join(chunks))
         self.finish_write()
 
+        if self.untracked:
+            self.untracked.write(self.untracked_path)
+        monitor.write(self.monitor_path, self.digest.digest())
+
         return True
 
+    def write_caches(self) -> None:
+        """
+        Write the untracked cache and fsmonitor state, and give up the lock,
+        leaving the index file as it was loaded.
+
+        For when no entry changed: the index keeps its checksum, which the
+        fsmonitor state stays bound to, and the daemon can go on using the
+        index it has parsed.
+        """
+        if self.checksum is None:
+            raise Exception("No index file to write caches for")
+        if self.untracked and self.untracked.changed:
+            self.untracked.write(self.untracked_path)
+        if self.monitor:
+            self.monitor.write(self.monitor_path, self.checksum)
+        self.release_lock()
+
+    def each_entry(self) -> Iterator[Entry]:
+        """Iterate over entries in the order Git stores them (by path bytes)."""
+        return self.entries.entries()
+
+    def write_tree(self, store: Callable[[Tree], None]) -> str:
+        """
+        Store the trees of the directories that changed and return the root's oid.
+
+        Trees cached for unchanged directories are reused as they are, so only
+        the directories above changed paths are serialized and hashed.
+        """
+        return self.cache_tree.update(self.entries, store)
+
+    def untracked_cache(self) -> UntrackedCache:
+        """
+        Return the cached listings of the workspace's directories.
+
+        Git warns about index extensions it does not know and drops them when
+        it writes the index, so the listings are kept in a file of their own.
+        It is only read when first asked for, and written with the index.
+        """
+        if not self.untracked:
+            self.untracked = UntrackedCache.load(self.untracked_path)
+        return self.untracked
+
+    def monitor_state(self) -> MonitorState:
+        """
+        Return what the fsmonitor daemon has told us about the workspace.
+
+        Like the untracked cache, it is kept in a file of its own, which is
+        only read when first asked for and is written with the index. It only
+        holds for the index it was written with.
+        """
+        if not self.monitor:
+            self.monitor = MonitorState.load(self.monitor_path, self.checksum)
+        return self.monitor
+
     def begin_write(self) -> None:
         """Prepare the hash digest."""
         self.digest = sha1()
@@ -63,20 +183,23 @@ class Index:
 
     def finish_write(self) -> None:
         """Write digest to index and commit it."""
-        self.lockfile.write(self.digest.digest())
+        self.checksum = self.digest.digest()
+        self.lockfile.write(self.checksum)
         self.lockfile.commit()
 
-    def open_index_file(self) -> Optional[BinaryIO]:
+    def open_index_file(self) -> Optional[BufferedReader]:
         try:
             index_file = open(self.pathname, "rb")
             return index_file
         except FileNotFoundError:
             return None
 
-    def read_header(self, reader: Checksum) -> int:
+    def read_header(self, data: bytearray) -> int:
         """Read the header from the index."""
-        data = reader.read(self.HEADER_SIZE)
-        (sig_bytes, version, count) = struct.unpack(
+        if len(data) < self.HEADER_SIZE:
+            raise Checksum.EndOfFile("Unexpected end-of-file while reading index")
+
+        sig_bytes, version, count = struct.unpack_from(
             self.HEADER_FORMAT, data
         )  # type: Tuple[bytes, int, int]
         signature = sig_bytes.decode("utf-8")
@@ -92,35 +215,133 @@ class Index:
 
         return count
 
+    def entry_for_path(self, pathname: Path) -> Optional[Entry]:
+        """Return the entry stored for a path, if there is one."""
+        return self.entries.get(bytes(pathname))
+
+    def is_racy(self, mtime: Tuple[int, int]) -> bool:
+        """
+        Check whether an entry's mtime is no earlier than the index was written.
+
+        Such an entry is "racily clean": the file may have changed again within
+        the same timestamp tick after it was hashed, so its stat data cannot be
+        trusted to prove that its contents are unchanged.
+        """
+        if not self.timestamp:
+            return False
+        return mtime >= self.timestamp
+
+    def is_fresh(self, entry: Entry, stat: stat_result) -> bool:
+        """
+        Check whether an entry still describes a file without rehashing it.
+
+        Racily clean entries are smudged to a size of 0 when the index is
+        loaded, so they never match and are always rehashed.
+        """
+        return entry.size != 0 and entry.stat_match(stat) and entry.times_match(stat)
+
     def store_entry(self, entry: Entry) -> None:
-        """Store an entry in the dictionary of entries."""
-        self.entries[entry.pathname] = entry
+        """Store an entry in the collection of entries."""
+        self.entries.put(entry)
+
+    def read_entries(self, data: bytearray, count: int) -> int:
+        """
+        Read the entries into compact columns, returning the offset past them.
+
+        Only each entry's path is found here; the rest of its fields are
+        copied as they are and parsed on first use. Racily clean entries are
+        smudged by zeroing their size, so that their stat data never matches.
+        """
+        paths: List[bytes] = []
+        records: List[bytearray] = []
+        offset: int = self.HEADER_SIZE
+        end: int = len(data) - Checksum.CHECKSUM_SIZE
+        for _ in range(count):
+            start: int = offset + ENTRY_PATH_OFFSET
+            null: int = data.find(b"\0", start, end)
+            if null < 0:
+                raise Checksum.EndOfFile("Unexpected end-of-file while reading index")
+
+            mtime: Tuple[int, int] = struct.unpack_from(
+                ">2I", data, offset + ENTRY_MTIME_OFFSET
+            )
+            if self.is_racy(mtime):
+                struct.pack_into(">I", data, offset + ENTRY_SIZE_OFFSET, 0)
 
-    def read_entries(self, reader: Checksum, count: int) -> None:
-        """Read entries from index and load them into memory."""
-        for c in range(0, count):
-            # Read the minimum size that an entry could be
-            entry: bytes = reader.read(ENTRY_MIN_SIZE)
+            paths.append(bytes(data[start:null]))
+            records.append(data[offset:start])
+            offset += entry_size(null - start)
 
-            # Keep reading until reaching a null byte
-            while entry[-1] != 0:
-                # Entries are multiples of 8 bytes, so read 8 bytes at a time
-                entry = entry + reader.read(ENTRY_BLOCK)
+        self.entries = EntryStore(paths, b"".join(records))
+        return offset
 
-            self.store_entry(Entry.parse(entry))
+    def read_extensions(self, data: bytearray, offset: int) -> None:
+        """
+        Read the extensions that follow the entries.
 
+        Extensions whose signature starts with an uppercase letter are optional
+        and are skipped if unknown; any other extension is required to read the
+        index.
+        """
+        end: int = len(data) - Checksum.CHECKSUM_SIZE
+        while offset < end:
+            signature, size = struct.unpack_from(
+                self.EXTENSION_HEADER_FORMAT, data, offset
+            )
+            offset += self.EXTENSION_HEADER_SIZE
+            if signature == CacheTree.SIGNATURE:
+                self.cache_tree = CacheTree.parse(bytes(data[offset : offset + size]))
+            elif not signature[:1].isupper():
+                raise Exception(f"Unsupported index extension: {signature!r}")
+            offset += size
+
+    @tracing.traced("index.load")
     def load(self) -> None:
         """Load the existing index into memory."""
         self.clear()
         index_file = self.open_index_file()
-        if index_file:
-            try:
-                reader: Checksum = Checksum(index_file)
-                count = self.read_header(reader)
-                self.read_entries(reader, count)
-                reader.verify_checksum()
-            finally:
-                index_file.close()
+        if not index_file:
+            return
+
+        try:
+            # Entries modified at or after this time are racily clean
+            stat: stat_result = os.fstat(index_file.fileno())
+            self.timestamp = split_time(stat.st_mtime_ns)
+
+            # The same file, parsed and kept by the daemon, if its checksum
+            # agrees as well
+            kept: Optional[Tuple[EntryStore, CacheTree, bytes]] = warm.take(
+                self.pathname, stat
+            )
+            if kept and kept[2] == os.pread(
+                index_file.fileno(),
+                Checksum.CHECKSUM_SIZE,
+                stat.st_size - Checksum.CHECKSUM_SIZE,
+            ):
+                self.entries, self.cache_tree, self.checksum = kept
+                return
+
+            # Read the whole file in one go
+            data: bytearray = bytearray(stat.st_size)
+            if index_file.readinto(data) != stat.st_size:
+                raise Checksum.EndOfFile("Unexpected end-of-file while reading index")
+        finally:
+            index_file.close()
+
+        Checksum(data).verify_checksum()
+        self.checksum = bytes(data[-Checksum.CHECKSUM_SIZE :])
+        count: int = self.read_header(data)
+        offset: int = self.read_entries(data, count)
+        self.read_extensions(data, offset)
+        warm.keep(self.pathname, (self.entries, self.cache_tree, self.checksum), stat)
+
+    def release_lock(self) -> None:
+        """
+        Give up the lock taken by load_for_update without writing, if it is
+        still held, so that it can be called however the update ended.
+        """
+        if self.lockfile.is_held():
+            self.lockfile.rollback()
 
     def load_for_update(self) -> bool:
         """Load the existing index into memory before update."""
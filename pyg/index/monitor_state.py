@@ -0,0 +1,179 @@
+import os
+import struct
+from hashlib import sha1
+from os import stat_result
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Type, TypeVar
+
+from fsmonitor.client import Changes
+from lockfile import Lockfile
+import warm
+
+from .checksum import Checksum
+from .untracked_cache import StatKey
+
+T = TypeVar("T", bound="MonitorState")
+
+
+def is_below(path: str, prefix: str) -> bool:
+    """Check whether a path is a prefix path itself or lies under it."""
+    return not prefix or path == prefix or path.startswith(f"{prefix}/")
+
+
+class MonitorState:
+    """
+    What the fsmonitor daemon has told us about the workspace, kept beside
+    the index.
+
+    A valid state holds a token from the daemon and the paths that may not
+    match the index: every other path that is not ignored was checked against
+    the index when the token was handed out, and has not changed since. So a
+    walk only needs to look at the dirty paths and at what changed since the
+    token.
+
+    The state only holds for the index it was written with, and for the
+    ignore rules at the time, so it is dropped when either changes. Until a
+    complete walk settles every path, there is no state and walks are full.
+    """
+
+    SIGNATURE = b"PYFM"
+    VERSION = 1
+
+    HEADER_FORMAT = ">4sI20sB3II"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+    def __init__(self) -> None:
+        self.token: Optional[str] = None
+        self.dirty: Set[str] = set()
+        self.checksum: bytes = bytes(Checksum.CHECKSUM_SIZE)
+        self.exclude: Optional[StatKey] = None
+
+        # A token handed out while the state was invalid, which becomes the
+        # state's token once a complete walk has settled every path
+        self.next_token: Optional[str] = None
+
+    def is_valid(self) -> bool:
+        return self.token is not None
+
+    def invalidate(self) -> None:
+        self.token = None
+        self.dirty = set()
+
+    def update(self, changes: Optional[Changes], exclude: Optional[StatKey]) -> None:
+        """Fold in the daemon's answer to what changed since the token."""
+        if changes is None:
+            self.invalidate()
+            self.next_token = None
+            return
+
+        token, changed = changes
+        self.next_token = token
+        if (
+            changed is None
+            or exclude != self.exclude
+            or any(Path(path).name == ".gitignore" for path in changed)
+        ):
+            self.invalidate()
+            self.exclude = exclude
+        elif self.is_valid():
+            self.dirty.update(changed)
+            self.token = token
+
+    def candidates(self, prefix: str) -> List[str]:
+        """Return the paths under a prefix that have to be looked at again."""
+        return sorted(path for path in self.dirty if is_below(path, prefix))
+
+    def settle(self, prefix: str, remaining: Iterable[str] = ()) -> None:
+        """
+        Record that every path under a prefix was checked against the index.
+
+        Paths that still do not match the index, such as untracked files that
+        were only listed, stay dirty.
+        """
+        if self.is_valid():
+            self.dirty = {p for p in self.dirty if not is_below(p, prefix)}
+        elif prefix or not self.next_token:
+            return
+        else:
+            self.token = self.next_token
+            self.dirty = set()
+        self.dirty.update(remaining)
+
+    def serialize(self) -> bytes:
+        """Return the state in the form it is stored on disk, without a checksum."""
+        token: bytes = (self.token or "").encode("utf-8")
+        header: bytes = struct.pack(
+            self.HEADER_FORMAT,
+            self.SIGNATURE,
+            self.VERSION,
+            self.checksum,
+            self.exclude is not None,
+            *(self.exclude or (0, 0, 0)),
+            len(token),
+        )
+        paths: bytes = b"".join(
+            p.encode("utf-8", "surrogateescape") + b"\0" for p in sorted(self.dirty)
+        )
+        return header + token + paths
+
+    @classmethod
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Read the state back from its stored form, without a checksum."""
+        if len(data) < cls.HEADER_SIZE:
+            raise Checksum.EndOfFile("Unexpected end-of-file while reading state")
+        signature, version, checksum, has_exclude, sec, ns, size, token_size = (
+            struct.unpack_from(cls.HEADER_FORMAT, data)
+        )
+        if signature != cls.SIGNATURE or version != cls.VERSION:
+            raise Exception(f"Unsupported fsmonitor state: {signature!r} {version}")
+
+        state: T = cls()
+        state.checksum = checksum
+        if has_exclude:
+            state.exclude = (sec, ns, size)
+        offset: int = cls.HEADER_SIZE + token_size
+        state.token = data[cls.HEADER_SIZE : offset].decode("utf-8") or None
+        state.dirty = {
+            p.decode("utf-8", "surrogateescape")
+            for p in data[offset:].split(b"\0")
+            if p
+        }
+        return state
+
+    @classmethod
+    def load(cls: Type[T], path: Path, checksum: Optional[bytes]) -> T:
+        """
+        Read the state from a file, if it was written with an index checksum.
+
+        A missing or bad file, or one written with another index, gives an
+        invalid state.
+        """
+        state: Optional[T] = warm.take(path)
+        if not state:
+            try:
+                with open(path, "rb") as f:
+                    stat: stat_result = os.fstat(f.fileno())
+                    data: bytes = f.read()
+                Checksum(data).verify_checksum()
+                state = cls.parse(data[: -Checksum.CHECKSUM_SIZE])
+            except Exception:
+                return cls()
+            warm.keep(path, state, stat)
+        if state.checksum != checksum:
+            state.invalidate()
+        return state
+
+    def write(self, path: Path, checksum: bytes) -> None:
+        """Replace the state file, binding the state to an index checksum."""
+        if not self.is_valid():
+            path.unlink(missing_ok=True)
+            return
+
+        lockfile: Lockfile = Lockfile(path, as_bytes=True)
+        if not lockfile.hold_for_update():
+            return
+        self.checksum = checksum
+        data: bytes = self.serialize()
+        lockfile.write(data)
+        lockfile.write(sha1(data).digest())
+        lockfile.commit()
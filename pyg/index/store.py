@@ -0,0 +1,175 @@
+import struct
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .entry import (
+    ENTRY_OID_OFFSET,
+    ENTRY_PATH_OFFSET,
+    STAT_FORMAT,
+    Buffer,
+    Entry,
+    padding,
+)
+
+RECORD_SIZE = ENTRY_PATH_OFFSET
+
+
+class EntryStore:
+    """
+    Index entries held in compact columns, sorted by path.
+
+    Instead of one object per entry, the store keeps a sorted list of raw path
+    bytes and a parallel bytearray of fixed-size records. Each record holds
+    an entry's stat fields, raw 20-byte oid and flags exactly as they are laid
+    out on disk, so entries are serialized by slicing rather than packing.
+    Entry objects are only built when one is asked for.
+
+    Replacing an entry overwrites its record in place. New and removed paths
+    are held aside and merged in one pass, before the next time the entries
+    are walked in order, so adding many paths does not shift the columns
+    once per path.
+    """
+
+    def __init__(
+        self, paths: Optional[List[bytes]] = None, records: Buffer = b""
+    ) -> None:
+        self.paths: List[bytes] = paths or []
+        self.records: bytearray = bytearray(records)
+        self.pending: Dict[bytes, bytes] = {}
+        self.removed: Set[bytes] = set()
+
+    def __len__(self) -> int:
+        return len(self.paths) - len(self.removed) + len(self.pending)
+
+    def __contains__(self, path: bytes) -> bool:
+        return path in self.pending or self._position(path) is not None
+
+    def _position(self, path: bytes) -> Optional[int]:
+        """Binary search the sorted paths, ignoring removed ones."""
+        if path in self.removed:
+            return None
+        i: int = bisect_left(self.paths, path)
+        if i < len(self.paths) and self.paths[i] == path:
+            return i
+        return None
+
+    def get(self, path: bytes) -> Optional[Entry]:
+        """Return the entry for a path, if there is one."""
+        record: Optional[bytes] = self.pending.get(path)
+        if record is not None:
+            return Entry.unpack(record, 0, path)
+
+        i: Optional[int] = self._position(path)
+        if i is None:
+            return None
+        return Entry.unpack(self.records, i * RECORD_SIZE, path)
+
+    def put(self, entry: Entry) -> None:
+        """Add an entry, replacing any entry with the same path."""
+        path: bytes = bytes(entry.pathname)
+        record: bytes = entry.record()
+
+        i: Optional[int] = self._position(path)
+        if i is None:
+            self.pending[path] = record
+        else:
+            self.records[i * RECORD_SIZE : (i + 1) * RECORD_SIZE] = record
+
+    def remove(self, path: bytes) -> None:
+        """Remove the entry for a path, if there is one."""
+        if self.pending.pop(path, None) is None and self._position(path) is not None:
+            self.removed.add(path)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Iterate over paths in sorted order."""
+        self._merge()
+        return iter(self.paths)
+
+    def entries(self) -> Iterator[Entry]:
+        """Iterate over entries in sorted order."""
+        self._merge()
+        for i, path in enumerate(self.paths):
+            yield Entry.unpack(self.records, i * RECORD_SIZE, path)
+
+    def sorted_paths(self) -> List[bytes]:
+        """Return every path in sorted order, to be used with entry_at."""
+        self._merge()
+        return self.paths
+
+    def positions_below(self, paths: Iterable[bytes]) -> List[int]:
+        """
+        Return the positions within sorted_paths of the entries at or below
+        some paths, where an empty path stands for every entry.
+        """
+        self._merge()
+        positions: Set[int] = set()
+        for path in paths:
+            if not path:
+                return list(range(len(self.paths)))
+            i: int = bisect_left(self.paths, path)
+            if i < len(self.paths) and self.paths[i] == path:
+                positions.add(i)
+
+            prefix: bytes = path + b"/"
+            i = bisect_left(self.paths, prefix)
+            while i < len(self.paths) and self.paths[i].startswith(prefix):
+                positions.add(i)
+                i += 1
+        return sorted(positions)
+
+    def entry_at(self, i: int) -> Entry:
+        """Return the entry at a position within sorted_paths."""
+        return Entry.unpack(self.records, i * RECORD_SIZE, self.paths[i])
+
+    def stat_at(self, i: int) -> Tuple[int, ...]:
+        """Return the stat fields of the entry at a position within sorted_paths."""
+        return struct.unpack_from(STAT_FORMAT, self.records, i * RECORD_SIZE)
+
+    def oid_at(self, i: int) -> str:
+        """Return the oid of the entry at a position within sorted_paths."""
+        offset: int = i * RECORD_SIZE + ENTRY_OID_OFFSET
+        return self.records[offset : offset + 20].hex()
+
+    def refresh(self, i: int, fields: Tuple[int, ...]) -> None:
+        """Overwrite the stat fields of the entry at a position within sorted_paths."""
+        struct.pack_into(STAT_FORMAT, self.records, i * RECORD_SIZE, *fields)
+
+    def serialize(self) -> Iterator[Buffer]:
+        """Yield the on-disk form of every entry in sorted order."""
+        self._merge()
+        records: memoryview = memoryview(self.records)
+        for i, path in enumerate(self.paths):
+            yield records[i * RECORD_SIZE : (i + 1) * RECORD_SIZE]
+            yield path + padding(len(path))
+
+    def _merge(self) -> None:
+        """Fold pending and removed paths into the sorted columns."""
+        if self.removed:
+            paths: List[bytes] = []
+            records: bytearray = bytearray()
+            for i, path in enumerate(self.paths):
+                if path not in self.removed:
+                    paths.append(path)
+                    records += self.records[i * RECORD_SIZE : (i + 1) * RECORD_SIZE]
+            self.paths, self.records = paths, records
+            self.removed = set()
+
+        if not self.pending:
+            return
+
+        # Copy the runs of existing entries between consecutive new paths
+        merged_paths: List[bytes] = []
+        merged_records: bytearray = bytearray()
+        start: int = 0
+        for path in sorted(self.pending):
+            at: int = bisect_left(self.paths, path, start)
+            merged_paths += self.paths[start:at]
+            merged_records += self.records[start * RECORD_SIZE : at * RECORD_SIZE]
+            merged_paths.append(path)
+            merged_records += self.pending[path]
+            start = at
+        merged_paths += self.paths[start:]
+        merged_records += self.records[start * RECORD_SIZE :]
+
+        self.paths, self.records = merged_paths, merged_records
+        self.pending = {}
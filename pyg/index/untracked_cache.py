@@ -0,0 +1,206 @@
+import os
+import struct
+from hashlib import sha1
+from os import stat_result
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from lockfile import Lockfile
+import warm
+
+from .checksum import Checksum
+from .entry import split_time, uint32
+
+T = TypeVar("T", bound="UntrackedCache")
+
+# The mtime and size of a file, enough to notice that it was rewritten
+StatKey = Tuple[int, int, int]
+
+
+def stat_key(stat: Optional[stat_result]) -> Optional[StatKey]:
+    """Return the parts of a file's stat that the cache compares."""
+    if stat is None:
+        return None
+    return (*split_time(stat.st_mtime_ns), uint32(stat.st_size))
+
+
+class CachedDirectory:
+    """
+    The listing of one directory, as of its mtime.
+
+    Creating, removing or renaming anything in a directory updates its mtime,
+    so while the mtime is unchanged the names of its files and subdirectories
+    are too. Only names that the ignore rules let through are kept.
+    """
+
+    HEADER_FORMAT = ">B7I"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+    VALID = 1
+    HAS_IGNORE = 2
+
+    def __init__(self) -> None:
+        self.mtime: Optional[Tuple[int, int]] = None
+        self.ignore: Optional[StatKey] = None
+        self.files: List[str] = []
+        self.dirs: Dict[str, CachedDirectory] = {}
+
+    def is_valid(self, mtime: Tuple[int, int]) -> bool:
+        """Check whether the listing still describes a directory with an mtime."""
+        return self.mtime is not None and self.mtime == mtime
+
+    def update(
+        self, mtime: Optional[Tuple[int, int]], files: List[str], dirs: List[str]
+    ) -> None:
+        """Replace the listing, keeping what is cached for remaining subdirectories."""
+        self.mtime = mtime
+        self.files = files
+        self.dirs = {name: self.dirs.get(name) or CachedDirectory() for name in dirs}
+
+    def serialize(self, name: str = "") -> bytes:
+        """Return the on-disk form of the directory and everything below it."""
+        flags: int = (self.VALID if self.mtime else 0) | (
+            self.HAS_IGNORE if self.ignore else 0
+        )
+        out: List[bytes] = [
+            name.encode("utf-8", "surrogateescape") + b"\0",
+            struct.pack(
+                self.HEADER_FORMAT,
+                flags,
+                *(self.mtime or (0, 0)),
+                *(self.ignore or (0, 0, 0)),
+                len(self.files),
+                len(self.dirs),
+            ),
+        ]
+        out.extend(f.encode("utf-8", "surrogateescape") + b"\0" for f in self.files)
+        out.extend(
+            child.serialize(child_name) for child_name, child in self.dirs.items()
+        )
+        return b"".join(out)
+
+    @classmethod
+    def parse(cls, data: bytes, offset: int) -> Tuple[str, "CachedDirectory", int]:
+        """Read a directory and its subdirectories, returning its name and end."""
+        null: int = data.find(b"\0", offset)
+        if null < 0 or null + 1 + cls.HEADER_SIZE > len(data):
+            raise Checksum.EndOfFile("Unexpected end-of-file while reading index")
+        name: str = data[offset:null].decode("utf-8", "surrogateescape")
+
+        flags, sec, ns, ignore_sec, ignore_ns, size, file_count, dir_count = (
+            struct.unpack_from(cls.HEADER_FORMAT, data, null + 1)
+        )
+        offset = null + 1 + cls.HEADER_SIZE
+
+        directory: CachedDirectory = cls()
+        if flags & cls.VALID:
+            directory.mtime = (sec, ns)
+        if flags & cls.HAS_IGNORE:
+            directory.ignore = (ignore_sec, ignore_ns, size)
+
+        for _ in range(file_count):
+            null = data.find(b"\0", offset)
+            if null < 0:
+                raise Checksum.EndOfFile("Unexpected end-of-file while reading index")
+            directory.files.append(data[offset:null].decode("utf-8", "surrogateescape"))
+            offset = null + 1
+
+        for _ in range(dir_count):
+            child_name, child, offset = cls.parse(data, offset)
+            directory.dirs[child_name] = child
+        return name, directory, offset
+
+
+class UntrackedCache:
+    """
+    The listings of the workspace's directories, kept beside the index.
+
+    In the spirit of Git's untracked cache, a walk reads a directory from
+    here instead of listing it when its mtime has not changed. Listings
+    depend on the ignore rules, so they are dropped when .git/info/exclude
+    changes, and each directory remembers the stat of its own .gitignore.
+    """
+
+    SIGNATURE = b"PYUC"
+    VERSION = 1
+
+    HEADER_FORMAT = ">4sIB3I"
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+    def __init__(self) -> None:
+        self.exclude: Optional[StatKey] = None
+        self.root: CachedDirectory = CachedDirectory()
+
+        # Whether any listing was read again since the cache was loaded
+        self.changed: bool = False
+
+    def check_exclude(self, exclude: Optional[StatKey]) -> None:
+        """Drop every listing if the exclude file has changed."""
+        if exclude != self.exclude:
+            self.exclude = exclude
+            self.root = CachedDirectory()
+            self.changed = True
+
+    def find(self, parts: Sequence[str]) -> CachedDirectory:
+        """Return the listing of a directory, adding empty ones as needed."""
+        directory: CachedDirectory = self.root
+        for part in parts:
+            directory = directory.dirs.setdefault(part, CachedDirectory())
+        return directory
+
+    def serialize(self) -> bytes:
+        """Return the cache in the form it is stored on disk, without a checksum."""
+        header: bytes = struct.pack(
+            self.HEADER_FORMAT,
+            self.SIGNATURE,
+            self.VERSION,
+            self.exclude is not None,
+            *(self.exclude or (0, 0, 0)),
+        )
+        return header + self.root.serialize()
+
+    @classmethod
+    def parse(cls: Type[T], data: bytes) -> T:
+        """Read the cache back from its stored form, without a checksum."""
+        if len(data) < cls.HEADER_SIZE:
+            raise Checksum.EndOfFile("Unexpected end-of-file while reading cache")
+        signature, version, has_exclude, sec, ns, size = struct.unpack_from(
+            cls.HEADER_FORMAT, data
+        )
+        if signature != cls.SIGNATURE or version != cls.VERSION:
+            raise Exception(f"Unsupported untracked cache: {signature!r} {version}")
+
+        cache: T = cls()
+        if has_exclude:
+            cache.exclude = (sec, ns, size)
+        _, cache.root, offset = CachedDirectory.parse(data, cls.HEADER_SIZE)
+        if offset != len(data):
+            raise Exception("Unexpected data after untracked cache")
+        return cache
+
+    @classmethod
+    def load(cls: Type[T], path: Path) -> T:
+        """Read the cache from a file, starting afresh if it is missing or bad."""
+        kept: Optional[T] = warm.take(path)
+        if kept:
+            return kept
+        try:
+            with open(path, "rb") as f:
+                stat: stat_result = os.fstat(f.fileno())
+                data: bytes = f.read()
+            Checksum(data).verify_checksum()
+            cache: T = cls.parse(data[: -Checksum.CHECKSUM_SIZE])
+        except Exception:
+            return cls()
+        warm.keep(path, cache, stat)
+        return cache
+
+    def write(self, path: Path) -> None:
+        """Replace the cache file, unless another process is writing it."""
+        lockfile: Lockfile = Lockfile(path, as_bytes=True)
+        if not lockfile.hold_for_update():
+            return
+        data: bytes = self.serialize()
+        lockfile.write(data)
+        lockfile.write(sha1(data).digest())
+        lockfile.commit()
@@ -1,6 +1,9 @@
 from pathlib import Path
 from typing import Any, AnyStr, IO, Optional
 
+import tracing
+
+
 # TODO create context manager
 class Lockfile:
     class MissingParent(Exception):
@@ -18,6 +21,7 @@ class Lockfile:
         self.lock: Optional[IO[Any]] = None
         self.as_bytes = as_bytes
 
+    @tracing.traced("lockfile.hold_for_update")
     def hold_for_update(self) -> bool:
         """
         Attemps to claim the lock file.
@@ -35,6 +39,10 @@ class Lockfile:
         except PermissionError as e:
             raise self.NoPermission(e)
 
+    def is_held(self) -> bool:
+        """Returns whether the lock is held and not yet committed or rolled back."""
+        return self.lock is not None
+
     def write(self, string: AnyStr) -> None:
         """Writes string to file."""
         if not self.lock:
@@ -50,3 +58,12 @@ class Lockfile:
         self.lock.close()
         self.lock_path.rename(self.file_path)
         self.lock = None
+
+    def rollback(self) -> None:
+        """Closes and deletes the lock file, leaving the file untouched."""
+        if not self.lock:
+            raise self.StaleLock(f"Not holding lock on file: {self.lock_path}")
+
+        self.lock.close()
+        self.lock_path.unlink()
+        self.lock = None
@@ -0,0 +1,130 @@
+import mmap
+import os
+import struct
+import tempfile
+from hashlib import sha1
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import ewah
+from .pack import (
+    BITMAP_ENTRY_FORMAT,
+    BITMAP_ENTRY_SIZE,
+    BITMAP_FULL_DAG,
+    BITMAP_HEADER_FORMAT,
+    BITMAP_HEADER_SIZE,
+    BITMAP_SIGNATURE,
+    BITMAP_TYPES,
+    BITMAP_VERSION,
+)
+
+
+class Bitmaps:
+    """
+    The reachability bitmaps of a pack, as Git writes them.
+
+    A commit's bitmap has a bit set for every object it reaches, numbered
+    by the object's place in the pack, so what a set of commits reaches is
+    the OR of their bitmaps and how many objects of a type that is, the
+    population count of an AND with the type's bitmap. Bitmaps are only
+    decompressed when first asked for.
+    """
+
+    def __init__(self, path: Path, checksum: bytes) -> None:
+        self.path: Path = path
+
+        with open(path, "rb") as f:
+            self.data: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        signature, version, options, count, pack_checksum = struct.unpack_from(
+            BITMAP_HEADER_FORMAT, self.data
+        )
+        if signature != BITMAP_SIGNATURE or version != BITMAP_VERSION:
+            raise Exception(f"{path} is not a version {BITMAP_VERSION} bitmap index")
+        if not options & BITMAP_FULL_DAG:
+            raise Exception(f"{path} does not cover everything its commits reach")
+        if pack_checksum != checksum:
+            raise Exception(f"{path} does not belong to its pack")
+
+        # Where each type's bitmap, then each commit's entry, starts
+        offset: int = BITMAP_HEADER_SIZE
+        self.type_offsets: Dict[int, int] = {}
+        for type_code in BITMAP_TYPES:
+            self.type_offsets[type_code] = offset
+            offset = ewah.end(self.data, offset)
+
+        # Each commit's bitmap, and how far back the one it is XORed with is,
+        # by its position in the pack's index
+        self.entries: List[Tuple[int, int]] = []
+        self.by_position: Dict[int, int] = {}
+        for i in range(count):
+            position, xor_offset, _ = struct.unpack_from(
+                BITMAP_ENTRY_FORMAT, self.data, offset
+            )
+            offset += BITMAP_ENTRY_SIZE
+            self.entries.append((offset, xor_offset))
+            self.by_position[position] = i
+            offset = ewah.end(self.data, offset)
+
+        self.decoded: Dict[int, int] = {}
+
+    def of_type(self, type_code: int) -> int:
+        """Return the bitmap of every object of a type in the pack."""
+        return ewah.decode(self.data, self.type_offsets[type_code])[0]
+
+    def commit(self, position: int) -> Optional[int]:
+        """
+        Return the bitmap of what the commit at a position in the index
+        reaches, if it has one.
+        """
+        i: Optional[int] = self.by_position.get(position)
+        return None if i is None else self._entry(i)
+
+    def _entry(self, i: int) -> int:
+        bits: Optional[int] = self.decoded.get(i)
+        if bits is None:
+            offset, xor_offset = self.entries[i]
+            bits = ewah.decode(self.data, offset)[0]
+            if xor_offset:
+                bits ^= self._entry(i - xor_offset)
+            self.decoded[i] = bits
+        return bits
+
+
+def write_bitmaps(
+    path: Path,
+    checksum: bytes,
+    size: int,
+    types: Sequence[int],
+    commits: Sequence[Tuple[int, int]],
+    mode: int,
+) -> None:
+    """
+    Write the bitmaps of a pack of `size` objects.
+
+    `types` has the bitmap of each type in BITMAP_TYPES, and `commits` the
+    position in the index and bitmap of each commit. No bitmap is XORed
+    with another.
+    """
+    parts: List[bytes] = [
+        struct.pack(
+            BITMAP_HEADER_FORMAT,
+            BITMAP_SIGNATURE,
+            BITMAP_VERSION,
+            BITMAP_FULL_DAG,
+            len(commits),
+            checksum,
+        )
+    ]
+    parts.extend(ewah.encode(bits, size) for bits in types)
+    for position, bits in commits:
+        parts.append(struct.pack(BITMAP_ENTRY_FORMAT, position, 0, 0))
+        parts.append(ewah.encode(bits, size))
+    data: bytes = b"".join(parts)
+
+    fd, temp_name = tempfile.mkstemp(prefix="tmp_bitmap_", dir=path.parent)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+        f.write(sha1(data).digest())
+    Path(temp_name).chmod(mode)
+    Path(temp_name).rename(path)
@@ -0,0 +1,204 @@
+from typing import Dict, Optional, Tuple
+
+# Size of the blocks of the source that are indexed, and of the window that
+# slides over the target looking for them
+BLOCK_SIZE = 16
+
+# Largest number of bytes a single copy or insert instruction can carry
+MAX_COPY_SIZE = 0xFFFFFF
+MAX_INSERT_SIZE = 0x7F
+
+
+def encode_size(size: int) -> bytes:
+    """Encode a size as little-endian groups of 7 bits, as in delta headers."""
+    out: bytearray = bytearray()
+    while True:
+        byte: int = size & 0x7F
+        size >>= 7
+        if size:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def decode_size(delta: bytes, offset: int) -> Tuple[int, int]:
+    """Decode a size written by encode_size, returning it and the next offset."""
+    size: int = 0
+    shift: int = 0
+    while True:
+        byte: int = delta[offset]
+        offset += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, offset
+
+
+def match_length(a: bytes, i: int, b: bytes, j: int, limit: int) -> int:
+    """
+    Count how many bytes a[i:] and b[j:] have in common, up to limit.
+
+    Compares growing slices so that long matches cost a few comparisons in C
+    rather than one Python step per byte, then binary searches the mismatch.
+    """
+    n: int = 0
+    step: int = 64
+    while n < limit:
+        k: int = min(step, limit - n)
+        if a[i + n : i + n + k] == b[j + n : j + n + k]:
+            n += k
+            step = min(step * 2, 1 << 16)
+            continue
+
+        # The first mismatch lies within the next k bytes
+        lo, hi = 0, k
+        while hi - lo > 1:
+            mid: int = (lo + hi) // 2
+            if a[i + n : i + n + mid] == b[j + n : j + n + mid]:
+                lo = mid
+            else:
+                hi = mid
+        return n + lo
+    return n
+
+
+class DeltaIndex:
+    """
+    An index of the blocks of a source object, used to find copies in targets.
+
+    Every aligned BLOCK_SIZE block of the source is keyed by its contents, so a
+    window sliding over a target can find matching source offsets with one
+    hash lookup per position.
+    """
+
+    def __init__(self, source: bytes) -> None:
+        self.source: bytes = source
+        self.blocks: Dict[bytes, int] = {}
+
+        # Walk backwards so the earliest offset of a repeated block wins
+        for offset in range(len(source) - BLOCK_SIZE, -1, -BLOCK_SIZE):
+            self.blocks[source[offset : offset + BLOCK_SIZE]] = offset
+
+    def create(self, target: bytes, max_size: int) -> Optional[bytes]:
+        """
+        Build a delta that turns the source into the target.
+
+        Returns None if the delta would be larger than max_size.
+        """
+        source: bytes = self.source
+        blocks: Dict[bytes, int] = self.blocks
+        out: bytearray = bytearray(encode_size(len(source)))
+        out += encode_size(len(target))
+
+        # Start of the run of target bytes not yet covered by an instruction
+        pending: int = 0
+        position: int = 0
+        last: int = len(target) - BLOCK_SIZE
+
+        while position <= last:
+            offset: Optional[int] = blocks.get(target[position : position + BLOCK_SIZE])
+            if offset is None:
+                position += 1
+                continue
+
+            # Extend the match forwards past the block
+            length: int = BLOCK_SIZE + match_length(
+                source,
+                offset + BLOCK_SIZE,
+                target,
+                position + BLOCK_SIZE,
+                min(len(source) - offset, len(target) - position) - BLOCK_SIZE,
+            )
+
+            # Extend it backwards over bytes that would otherwise be inserted
+            while (
+                position > pending
+                and offset > 0
+                and source[offset - 1] == target[position - 1]
+            ):
+                offset -= 1
+                position -= 1
+                length += 1
+
+            self._insert(out, target, pending, position)
+            self._copy(out, offset, length)
+            position += length
+            pending = position
+
+            if len(out) > max_size:
+                return None
+
+        self._insert(out, target, pending, len(target))
+        if len(out) > max_size:
+            return None
+        return bytes(out)
+
+    def _insert(self, out: bytearray, target: bytes, start: int, end: int) -> None:
+        """Append instructions that insert target[start:end] literally."""
+        while start < end:
+            size: int = min(end - start, MAX_INSERT_SIZE)
+            out.append(size)
+            out += target[start : start + size]
+            start += size
+
+    def _copy(self, out: bytearray, offset: int, size: int) -> None:
+        """
+        Append instructions that copy size bytes from the source at offset.
+
+        The command byte has its high bit set; its low 4 bits say which bytes
+        of the offset follow and the next 3 bits which bytes of the size.
+        """
+        while size:
+            chunk: int = min(size, MAX_COPY_SIZE)
+            command: int = 0x80
+            args: bytearray = bytearray()
+            for i in range(4):
+                byte: int = (offset >> (8 * i)) & 0xFF
+                if byte:
+                    command |= 1 << i
+                    args.append(byte)
+            for i in range(3):
+                byte = (chunk >> (8 * i)) & 0xFF
+                if byte:
+                    command |= 0x10 << i
+                    args.append(byte)
+            out.append(command)
+            out += args
+            offset += chunk
+            size -= chunk
+
+
+def apply_delta(source: bytes, delta: bytes) -> bytes:
+    """Rebuild a target object from its source and a delta."""
+    source_size, offset = decode_size(delta, 0)
+    if source_size != len(source):
+        raise Exception(f"Delta expects a {source_size} byte source, got {len(source)}")
+    target_size, offset = decode_size(delta, offset)
+
+    out: bytearray = bytearray()
+    while offset < len(delta):
+        command: int = delta[offset]
+        offset += 1
+
+        if command & 0x80:
+            copy_offset: int = 0
+            for i in range(4):
+                if command & (1 << i):
+                    copy_offset |= delta[offset] << (8 * i)
+                    offset += 1
+            size: int = 0
+            for i in range(3):
+                if command & (0x10 << i):
+                    size |= delta[offset] << (8 * i)
+                    offset += 1
+            out += source[copy_offset : copy_offset + (size or 0x10000)]
+        elif command:
+            out += delta[offset : offset + command]
+            offset += command
+        else:
+            raise Exception("Invalid delta instruction 0")
+
+    if len(out) != target_size:
+        raise Exception(f"Delta produced {len(out)} bytes, expected {target_size}")
+    return bytes(out)
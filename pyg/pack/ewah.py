@@ -0,0 +1,87 @@
+"""
+EWAH compressed bitmaps, as Git stores them in pack bitmap indexes.
+
+A bitmap is held in memory as a Python int, with bit i standing for the
+object at position i in pack order. On disk, its 64-bit words are grouped
+into runs: each run starts with a marker word, holding whether its clean
+words are all zeros or all ones in bit 0, how many clean words there are in
+the next 32 bits and how many literal words follow the marker in the top 31
+bits. The words are preceded by the bitmap's size in bits and the number of
+words, and followed by the position of the last marker word, all big-endian.
+"""
+
+import struct
+from typing import List, Tuple
+
+WORD_BITS = 64
+WORD_SIZE = 8
+ALL_ONES = (1 << WORD_BITS) - 1
+
+MAX_RUNNING = (1 << 32) - 1
+MAX_LITERALS = (1 << 31) - 1
+
+SIZE_FORMAT = ">2I"
+SIZE_SIZE = 8
+MARKER_FORMAT = ">I"
+MARKER_SIZE = 4
+
+
+def encode(bits: int, size: int) -> bytes:
+    """Compress a bitmap of `size` bits."""
+    count: int = (size + WORD_BITS - 1) // WORD_BITS
+    words: Tuple[int, ...] = struct.unpack(
+        f"<{count}Q", bits.to_bytes(count * WORD_SIZE, "little")
+    )
+
+    out: List[int] = []
+    marker: int = 0
+    i: int = 0
+    while i < count or not out:
+        # Clean words of one kind, then the literal words up to the next
+        clean: int = words[i] if i < count else 0
+        start: int = i
+        if clean in (0, ALL_ONES):
+            while i < count and words[i] == clean and i - start < MAX_RUNNING:
+                i += 1
+        running: int = i - start
+        start = i
+        while i < count and words[i] not in (0, ALL_ONES) and i - start < MAX_LITERALS:
+            i += 1
+
+        marker = len(out)
+        out.append((running and clean & 1) | running << 1 | (i - start) << 33)
+        out.extend(words[start:i])
+
+    return b"".join(
+        [
+            struct.pack(SIZE_FORMAT, size, len(out)),
+            struct.pack(f">{len(out)}Q", *out),
+            struct.pack(MARKER_FORMAT, marker),
+        ]
+    )
+
+
+def end(data: bytes, offset: int = 0) -> int:
+    """Return the offset past a bitmap, without reading it."""
+    count: int = struct.unpack_from(SIZE_FORMAT, data, offset)[1]
+    return offset + SIZE_SIZE + count * WORD_SIZE + MARKER_SIZE
+
+
+def decode(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    """Read a bitmap at an offset, returning it and the offset past it."""
+    count: int = struct.unpack_from(SIZE_FORMAT, data, offset)[1]
+    words: Tuple[int, ...] = struct.unpack_from(f">{count}Q", data, offset + SIZE_SIZE)
+
+    # Little-endian words, so that the int reads them in order
+    pieces: List[bytes] = []
+    i: int = 0
+    while i < count:
+        marker: int = words[i]
+        running: int = (marker >> 1) & MAX_RUNNING
+        literals: int = marker >> 33
+        if running:
+            pieces.append((b"\xff" if marker & 1 else b"\0") * (running * WORD_SIZE))
+        pieces.append(struct.pack(f"<{literals}Q", *words[i + 1 : i + 1 + literals]))
+        i += 1 + literals
+
+    return int.from_bytes(b"".join(pieces), "little"), end(data, offset)
@@ -0,0 +1,69 @@
+# A version 2 packfile is a 12-byte header ("PACK", version, number of
+# objects), followed by each object's type-and-size header and zlib-compressed
+# contents, followed by the SHA-1 of everything before it. Its index (.idx)
+# maps sorted oids to offsets within the pack.
+
+SIGNATURE = b"PACK"
+VERSION = 2
+HEADER_FORMAT = ">4s2I"
+HEADER_SIZE = 12
+
+COMMIT = 1
+TREE = 2
+BLOB = 3
+TAG = 4
+OFS_DELTA = 6
+REF_DELTA = 7
+
+TYPE_CODES = {"commit": COMMIT, "tree": TREE, "blob": BLOB}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+IDX_SIGNATURE = b"\377tOc"
+IDX_VERSION = 2
+IDX_HEADER_FORMAT = ">4sI"
+IDX_HEADER_SIZE = 8
+IDX_FANOUT_SIZE = 256 * 4
+
+# Offsets of at least this size are stored in the 64-bit offset table
+IDX_MAX_OFFSET = 0x80000000
+
+OID_SIZE = 20
+
+
+def encode_header(type_code: int, size: int) -> bytes:
+    """
+    Encode an object's type and inflated size as a pack entry header.
+
+    The first byte holds a continuation bit, the 3-bit type and the low 4
+    bits of the size; each following byte holds 7 more bits of the size.
+    """
+    byte: int = (type_code << 4) | (size & 0x0F)
+    size >>= 4
+    header: bytearray = bytearray()
+    while size:
+        header.append(byte | 0x80)
+        byte = size & 0x7F
+        size >>= 7
+    header.append(byte)
+    return bytes(header)
+
+
+# A reachability bitmap index (.bitmap) sits beside a pack's index. It holds
+# a header ("BITM", version, options, number of commits, pack checksum), an
+# EWAH bitmap of the objects of each type, then for each commit its position
+# in the index, how many entries back the bitmap it is XORed with lies, flags
+# and the EWAH bitmap of everything it reaches, and finally its own SHA-1.
+# Bits are numbered by the order of objects in the pack.
+BITMAP_SIGNATURE = b"BITM"
+BITMAP_VERSION = 1
+BITMAP_HEADER_FORMAT = ">4s2HI20s"
+BITMAP_HEADER_SIZE = 32
+BITMAP_ENTRY_FORMAT = ">I2B"
+BITMAP_ENTRY_SIZE = 6
+BITMAP_SUFFIX = ".bitmap"
+
+# Every object reachable from a commit with a bitmap is in the pack
+BITMAP_FULL_DAG = 0x1
+
+# The type bitmaps, in the order they are stored
+BITMAP_TYPES = (COMMIT, TREE, BLOB, TAG)
@@ -0,0 +1,258 @@
+import mmap
+import struct
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from database.cache import Cache
+
+from .bitmap import Bitmaps
+from .delta import apply_delta, decode_size
+from .pack import (
+    BITMAP_SUFFIX,
+    HEADER_FORMAT,
+    IDX_FANOUT_SIZE,
+    IDX_HEADER_FORMAT,
+    IDX_HEADER_SIZE,
+    IDX_MAX_OFFSET,
+    IDX_SIGNATURE,
+    IDX_VERSION,
+    OFS_DELTA,
+    OID_SIZE,
+    REF_DELTA,
+    SIGNATURE,
+    TYPE_NAMES,
+    VERSION,
+)
+
+
+class Reader:
+    """
+    Reads objects from a packfile, looking them up through its index.
+
+    Both files are memory-mapped once. Lookups binary search the oid table
+    within the range given by the fanout table, so they touch O(log n) pages
+    and never parse the index as a whole.
+    """
+
+    # Compressed data is fed to zlib in pieces of this size
+    INFLATE_STEP = 1 << 16
+
+    # Enough bytes for the sizes of a delta's base and result, which start it
+    DELTA_HEADER_SIZE = 20
+
+    def __init__(self, idx_path: Path, cache: Cache) -> None:
+        self.idx_path: Path = idx_path
+        self.cache: Cache = cache
+
+        with open(idx_path, "rb") as f:
+            self.idx: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(idx_path.with_suffix(".pack"), "rb") as f:
+            self.pack: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        signature, version = struct.unpack_from(IDX_HEADER_FORMAT, self.idx)
+        if signature != IDX_SIGNATURE or version != IDX_VERSION:
+            raise Exception(f"{idx_path} is not a version {IDX_VERSION} pack index")
+
+        signature, version, _ = struct.unpack_from(HEADER_FORMAT, self.pack)
+        if signature != SIGNATURE or version != VERSION:
+            raise Exception(f"{idx_path} does not belong to a version {VERSION} pack")
+
+        # Cumulative counts by first oid byte; the last one is the total
+        self.count: int = self._fanout(255)
+        self.oid_table: int = IDX_HEADER_SIZE + IDX_FANOUT_SIZE
+        self.offset_table: int = self.oid_table + self.count * (OID_SIZE + 4)
+        self.large_offset_table: int = self.offset_table + self.count * 4
+
+        # Loaded on first use: the order of objects in the pack, by their
+        # position in the index, and the pack's bitmaps, or False for none
+        self.pack_order: Optional[List[int]] = None
+        self.bitmap_index: Union[Bitmaps, bool, None] = None
+
+    def _fanout(self, byte: int) -> int:
+        return struct.unpack_from(">I", self.idx, IDX_HEADER_SIZE + byte * 4)[0]
+
+    def lookup(self, oid: bytes) -> Optional[int]:
+        """Return the offset of an object in the pack, if the pack has it."""
+        position: Optional[int] = self.position(oid)
+        return None if position is None else self._offset(position)
+
+    def position(self, oid: bytes) -> Optional[int]:
+        """Return the position of an object in the index, if the pack has it."""
+        first: int = oid[0]
+        low: int = self._fanout(first - 1) if first else 0
+        high: int = self._fanout(first)
+
+        idx: mmap.mmap = self.idx
+        while low < high:
+            mid: int = (low + high) // 2
+            position: int = self.oid_table + mid * OID_SIZE
+            found: bytes = idx[position : position + OID_SIZE]
+            if found < oid:
+                low = mid + 1
+            elif found > oid:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def oid(self, position: int) -> str:
+        """Return the oid at a position in the index."""
+        start: int = self.oid_table + position * OID_SIZE
+        return self.idx[start : start + OID_SIZE].hex()
+
+    def checksum(self) -> bytes:
+        """Return the checksum that ends the pack, and names it."""
+        return self.pack[-OID_SIZE:]
+
+    def pack_position(self, position: int) -> int:
+        """
+        Return where the object at a position in the index lies in the pack,
+        counting objects in the order they were written.
+
+        The order is worked out from the offsets on first use, like Git's
+        reverse index, which pyg does not write.
+        """
+        if self.pack_order is None:
+            order: List[int] = sorted(range(self.count), key=self._offset)
+            self.pack_order = [0] * self.count
+            for pack_position, index_position in enumerate(order):
+                self.pack_order[index_position] = pack_position
+        return self.pack_order[position]
+
+    def bitmaps(self) -> Optional[Bitmaps]:
+        """Return the reachability bitmaps written for the pack, if there are any."""
+        if self.bitmap_index is None:
+            path: Path = self.idx_path.with_suffix(BITMAP_SUFFIX)
+            self.bitmap_index = (
+                Bitmaps(path, self.checksum()) if path.exists() else False
+            )
+        return self.bitmap_index or None
+
+    def _offset(self, position: int) -> int:
+        entry: int = self.offset_table + 4 * position
+        offset: int = struct.unpack_from(">I", self.idx, entry)[0]
+        if offset & IDX_MAX_OFFSET:
+            large: int = self.large_offset_table + 8 * (offset & ~IDX_MAX_OFFSET)
+            offset = struct.unpack_from(">Q", self.idx, large)[0]
+        return offset
+
+    def read(self, offset: int) -> Tuple[str, bytes]:
+        """
+        Read the object at an offset, resolving any chain of deltas.
+
+        The chain is followed down to a whole object or one already in the
+        cache, then the deltas are applied on the way back up. Every object
+        rebuilt along the way is cached, since it is likely to be the base of
+        the next object read.
+        """
+        chain: List[Tuple[int, int, int]] = []
+        while True:
+            cached: Optional[Tuple[str, bytes]] = self.cache.get((self, offset))
+            if cached:
+                obj_type, data = cached
+                break
+
+            type_code, size, position = self._read_header(offset)
+            if type_code == OFS_DELTA:
+                base_offset, position = self._read_base_offset(offset, position)
+                chain.append((offset, position, size))
+                offset = base_offset
+            elif type_code == REF_DELTA:
+                base_oid: bytes = self.pack[position : position + OID_SIZE]
+                chain.append((offset, position + OID_SIZE, size))
+                found: Optional[int] = self.lookup(base_oid)
+                if found is None:
+                    raise Exception(f"Delta base {base_oid.hex()} is not in the pack")
+                offset = found
+            else:
+                obj_type = TYPE_NAMES[type_code]
+                data = self._inflate(position, size)
+                self.cache.put((self, offset), (obj_type, data))
+                break
+
+        for offset, position, size in reversed(chain):
+            data = apply_delta(data, self._inflate(position, size))
+            self.cache.put((self, offset), (obj_type, data))
+
+        return obj_type, data
+
+    def read_info(self, offset: int) -> Tuple[str, int]:
+        """
+        Read the type and size of the object at an offset.
+
+        The type comes from the end of any chain of deltas and the size from
+        the header of the first delta, so at most the start of one delta is
+        inflated.
+        """
+        type_code, size, position = self._read_header(offset)
+        result_size: Optional[int] = None
+        while type_code in (OFS_DELTA, REF_DELTA):
+            if type_code == OFS_DELTA:
+                base_offset, position = self._read_base_offset(offset, position)
+            else:
+                base_oid: bytes = self.pack[position : position + OID_SIZE]
+                found: Optional[int] = self.lookup(base_oid)
+                if found is None:
+                    raise Exception(f"Delta base {base_oid.hex()} is not in the pack")
+                base_offset, position = found, position + OID_SIZE
+            if result_size is None:
+                result_size = self._delta_result_size(position)
+            offset = base_offset
+            type_code, size, position = self._read_header(offset)
+        return TYPE_NAMES[type_code], size if result_size is None else result_size
+
+    def _delta_result_size(self, position: int) -> int:
+        """Read the size of the object a delta makes from its header."""
+        decompressor = zlib.decompressobj()
+        head: bytes = b""
+        while len(head) < self.DELTA_HEADER_SIZE and not decompressor.eof:
+            chunk: bytes = self.pack[position : position + self.DELTA_HEADER_SIZE]
+            if not chunk:
+                break
+            head += decompressor.decompress(chunk)
+            position += len(chunk)
+        _, offset = decode_size(head, 0)
+        return decode_size(head, offset)[0]
+
+    def _read_header(self, offset: int) -> Tuple[int, int, int]:
+        """Read an entry's type and size, returning them and the data offset."""
+        pack: mmap.mmap = self.pack
+        byte: int = pack[offset]
+        type_code: int = (byte >> 4) & 0x07
+        size: int = byte & 0x0F
+        shift: int = 4
+        while byte & 0x80:
+            offset += 1
+            byte = pack[offset]
+            size |= (byte & 0x7F) << shift
+            shift += 7
+        return type_code, size, offset + 1
+
+    def _read_base_offset(self, offset: int, position: int) -> Tuple[int, int]:
+        """Decode an OFS_DELTA's distance back to its base."""
+        pack: mmap.mmap = self.pack
+        byte: int = pack[position]
+        distance: int = byte & 0x7F
+        while byte & 0x80:
+            position += 1
+            byte = pack[position]
+            distance = ((distance + 1) << 7) | (byte & 0x7F)
+        return offset - distance, position + 1
+
+    def _inflate(self, position: int, size: int) -> bytes:
+        """Decompress an entry's data, feeding zlib only as much as it needs."""
+        decompressor = zlib.decompressobj()
+        chunks: List[bytes] = []
+        while not decompressor.eof:
+            chunk: bytes = self.pack[position : position + self.INFLATE_STEP]
+            if not chunk:
+                raise Exception(
+                    f"Unexpected end of {self.idx_path.with_suffix('.pack')}"
+                )
+            chunks.append(decompressor.decompress(chunk))
+            position += self.INFLATE_STEP
+        data: bytes = b"".join(chunks)
+        if len(data) != size:
+            raise Exception(f"Expected {size} bytes but inflated {len(data)}")
+        return data
@@ -0,0 +1,320 @@
+import os
+import struct
+import tempfile
+import zlib
+from collections import deque
+from hashlib import sha1
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, List, NamedTuple, Optional, Sequence
+
+from database.database import Database
+from database.tree import Tree
+
+from .delta import DeltaIndex
+from .pack import (
+    HEADER_FORMAT,
+    IDX_HEADER_FORMAT,
+    IDX_MAX_OFFSET,
+    IDX_SIGNATURE,
+    IDX_VERSION,
+    OFS_DELTA,
+    SIGNATURE,
+    TREE,
+    TYPE_CODES,
+    VERSION,
+    encode_header,
+)
+
+
+class Record(NamedTuple):
+    """Where an object was written in a pack, as needed for the pack index."""
+
+    oid: bytes
+    offset: int
+    crc: int
+
+
+class Entry(NamedTuple):
+    """An object queued for packing, with what is needed to pick delta bases."""
+
+    oid: str
+    type_code: int
+    size: int
+    name_hash: int
+
+
+class Slot:
+    """An object in the delta search window, with its lazily built index."""
+
+    def __init__(self, entry: Entry, data: bytes, offset: int, depth: int) -> None:
+        self.entry: Entry = entry
+        self.data: bytes = data
+        self.offset: int = offset
+        self.depth: int = depth
+        self.index: Optional[DeltaIndex] = None
+
+    def delta_index(self) -> DeltaIndex:
+        if not self.index:
+            self.index = DeltaIndex(self.data)
+        return self.index
+
+
+def name_hash(name: str) -> int:
+    """
+    Hash a file name so that names with the same ending sort close together.
+
+    This is Git's pack name hash: later characters carry the most weight, so
+    files of the same kind (say, every Makefile) end up in the same window.
+    """
+    value: int = 0
+    for c in name:
+        if not c.isspace():
+            value = ((value >> 2) + (ord(c) << 24)) & 0xFFFFFFFF
+    return value
+
+
+class Writer:
+    """
+    Streams objects from the database into a packfile and its index.
+
+    Objects are sorted by type, name hash and decreasing size, and each one is
+    tried as an OFS_DELTA against the previous `window` objects of the same
+    type. Bases are always written before the deltas that use them, and delta
+    chains are limited to `depth` links so reads stay cheap.
+    """
+
+    COMPRESSION_LEVEL = zlib.Z_DEFAULT_COMPRESSION
+
+    # Packs and their indexes are never modified once written
+    MODE = 0o444
+
+    DEFAULT_WINDOW = 10
+    DEFAULT_DEPTH = 50
+
+    # Larger objects are streamed into the pack without looking for deltas
+    DELTA_SIZE_LIMIT = 64 << 20
+
+    def __init__(
+        self,
+        database: Database,
+        window: int = DEFAULT_WINDOW,
+        depth: int = DEFAULT_DEPTH,
+    ) -> None:
+        self.database: Database = database
+        self.pack_dir: Path = Path(database.pathname).joinpath("pack")
+        self.window: int = window
+        self.depth: int = depth
+
+    def write(self, oids: Sequence[str]) -> Path:
+        """Write the given objects to a new pack, returning the path of the pack."""
+        self.pack_dir.mkdir(exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(prefix="tmp_pack_", dir=self.pack_dir)
+        temp_path: Path = Path(temp_name)
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self.file: BinaryIO = f
+                self.digest = sha1()
+                self.offset: int = 0
+                self.crc: int = 0
+
+                self._write(struct.pack(HEADER_FORMAT, SIGNATURE, VERSION, len(oids)))
+                records: List[Record] = self._write_objects(self._sort_objects(oids))
+
+                checksum: bytes = self.digest.digest()
+                f.write(checksum)
+        except BaseException:
+            temp_path.unlink()
+            raise
+
+        # Name the pack after its checksum, and move the index into place last
+        # because its presence is what makes the pack visible to readers
+        name: str = f"pack-{checksum.hex()}"
+        pack_path: Path = self.pack_dir.joinpath(f"{name}.pack")
+        temp_path.chmod(self.MODE)
+        temp_path.rename(pack_path)
+        self._write_index(self.pack_dir.joinpath(f"{name}.idx"), records, checksum)
+
+        return pack_path
+
+    def _write(self, data: bytes) -> None:
+        """Write data to the pack, updating the checksum, offset and entry CRC."""
+        self.file.write(data)
+        self.digest.update(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.offset += len(data)
+
+    def _sort_objects(self, oids: Sequence[str]) -> List[Entry]:
+        """
+        Read the type and size of every object, and name blobs and trees after
+        the tree entries that point at them, in the order to search for deltas.
+        """
+        names: Dict[str, str] = {}
+        entries: List[Entry] = []
+        for oid in oids:
+            with self.database.open_object(oid) as (obj_type, size, contents):
+                type_code: int = TYPE_CODES[obj_type]
+                if type_code == TREE:
+                    tree: Tree = Tree.parse(b"".join(contents))
+                    for name, entry in tree.entries.items():
+                        if entry:
+                            names.setdefault(entry.oid, name)
+            entries.append(Entry(oid, type_code, size, 0))
+
+        entries = [
+            entry._replace(name_hash=name_hash(names.get(entry.oid, "")))
+            for entry in entries
+        ]
+        entries.sort(key=lambda e: (e.type_code, e.name_hash, -e.size))
+        return entries
+
+    def _write_objects(self, entries: List[Entry]) -> List[Record]:
+        """Write objects in order, as deltas against the window where that helps."""
+        window: Deque[Slot] = deque(maxlen=self.window)
+        records: List[Record] = []
+
+        for entry in entries:
+            if not self.window or entry.size > self.DELTA_SIZE_LIMIT:
+                records.append(self._write_object(entry.oid))
+                continue
+
+            with self.database.open_object(entry.oid) as (_, _, contents):
+                data: bytes = b"".join(contents)
+
+            base: Optional[Slot] = None
+            delta: Optional[bytes] = None
+            for slot in reversed(window):
+                candidate: Optional[bytes] = self._try_delta(slot, entry, data, delta)
+                if candidate is not None:
+                    base, delta = slot, candidate
+
+            offset: int = self.offset
+            if base and delta is not None:
+                records.append(self._write_delta(entry, base, delta))
+                depth: int = base.depth + 1
+            else:
+                records.append(self._write_data(entry, data))
+                depth = 0
+
+            window.append(Slot(entry, data, offset, depth))
+
+        return records
+
+    def _try_delta(
+        self, base: Slot, entry: Entry, data: bytes, best: Optional[bytes]
+    ) -> Optional[bytes]:
+        """Delta an object against a window slot if it beats the best so far."""
+        if base.entry.type_code != entry.type_code or base.depth >= self.depth:
+            return None
+
+        # A delta is only worth it if it saves at least half of the object,
+        # and it must improve on the best delta found so far
+        max_size: int = entry.size // 2 - 20
+        if best is not None:
+            max_size = min(max_size, len(best) - 1)
+        if max_size <= 0:
+            return None
+
+        # Cheap rejections before indexing the base: the size difference alone
+        # would need to be inserted, and tiny targets copy little of big bases
+        base_size: int = base.entry.size
+        if entry.size - base_size >= max_size or entry.size < base_size // 32:
+            return None
+
+        return base.delta_index().create(data, max_size)
+
+    def _write_data(self, entry: Entry, data: bytes) -> Record:
+        """Write a whole object from memory."""
+        offset: int = self.offset
+        self.crc = 0
+        self._write(encode_header(entry.type_code, len(data)))
+        self._write(zlib.compress(data, self.COMPRESSION_LEVEL))
+        return Record(bytes.fromhex(entry.oid), offset, self.crc)
+
+    def _write_delta(self, entry: Entry, base: Slot, delta: bytes) -> Record:
+        """
+        Write an object as an OFS_DELTA against an earlier object in the pack.
+
+        The header is followed by the distance back to the base, encoded in
+        big-endian groups of 7 bits where each continuation adds one, so that
+        every distance has exactly one encoding.
+        """
+        offset: int = self.offset
+        self.crc = 0
+
+        distance: int = offset - base.offset
+        encoded: bytearray = bytearray([distance & 0x7F])
+        distance >>= 7
+        while distance:
+            distance -= 1
+            encoded.insert(0, 0x80 | (distance & 0x7F))
+            distance >>= 7
+
+        self._write(encode_header(OFS_DELTA, len(delta)))
+        self._write(bytes(encoded))
+        self._write(zlib.compress(delta, self.COMPRESSION_LEVEL))
+        return Record(bytes.fromhex(entry.oid), offset, self.crc)
+
+    def _write_object(self, oid: str) -> Record:
+        """Copy a loose object into the pack, recompressing its contents."""
+        offset: int = self.offset
+        self.crc = 0
+
+        with self.database.open_object(oid) as (obj_type, size, contents):
+            self._write(encode_header(TYPE_CODES[obj_type], size))
+
+            compressor = zlib.compressobj(self.COMPRESSION_LEVEL)
+            total: int = 0
+            for chunk in contents:
+                total += len(chunk)
+                self._write(compressor.compress(chunk))
+            self._write(compressor.flush())
+
+        if total != size:
+            raise Exception(f"Object {oid}: expected {size} bytes but read {total}")
+
+        return Record(bytes.fromhex(oid), offset, self.crc)
+
+    def _write_index(self, path: Path, records: List[Record], checksum: bytes) -> None:
+        """
+        Write a version 2 pack index.
+
+        The index holds a fanout table of cumulative counts by first oid byte,
+        the sorted oids, their CRC32s and their offsets, with offsets that do
+        not fit in 31 bits moved to a table of 64-bit offsets.
+        """
+        records = sorted(records)
+
+        fanout: List[int] = [0] * 256
+        for record in records:
+            fanout[record.oid[0]] += 1
+        for i in range(1, 256):
+            fanout[i] += fanout[i - 1]
+
+        offsets: List[int] = []
+        large_offsets: List[int] = []
+        for record in records:
+            if record.offset < IDX_MAX_OFFSET:
+                offsets.append(record.offset)
+            else:
+                offsets.append(IDX_MAX_OFFSET | len(large_offsets))
+                large_offsets.append(record.offset)
+
+        count: int = len(records)
+        parts: List[bytes] = [
+            struct.pack(IDX_HEADER_FORMAT, IDX_SIGNATURE, IDX_VERSION),
+            struct.pack(">256I", *fanout),
+            b"".join(record.oid for record in records),
+            struct.pack(f">{count}I", *(record.crc for record in records)),
+            struct.pack(f">{count}I", *offsets),
+            struct.pack(f">{len(large_offsets)}Q", *large_offsets),
+            checksum,
+        ]
+        data: bytes = b"".join(parts)
+
+        fd, temp_name = tempfile.mkstemp(prefix="tmp_idx_", dir=self.pack_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.write(sha1(data).digest())
+        Path(temp_name).chmod(self.MODE)
+        Path(temp_name).rename(path)
@@ -0,0 +1,141 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from database.chunked import Manifest
+from database.database import Database
+from database.tree import Tree
+from graph.graph import read_commit
+
+# The mode of a tree entry naming a commit of another repository, which is
+# not stored here
+GITLINK_MODE = "160000"
+
+
+class Reachable:
+    """
+    Finds every object reachable from a set of roots.
+
+    Commits lead to their trees and parents, and trees to their entries.
+    Each commit and tree is remembered with what it points at, so that what
+    any commit reaches can be worked out again without reading it twice.
+    Blobs are not read, except for the manifests of chunked blobs, for the
+    chunks they list; those are kept apart, as to Git they are blobs that
+    nothing points at.
+    """
+
+    def __init__(self, database: Database) -> None:
+        self.database: Database = database
+
+        # The type of every object found, the tree of every commit, and the
+        # parents of each commit or the entries of each tree
+        self.types: Dict[str, str] = {}
+        self.trees: Dict[str, str] = {}
+        self.links: Dict[str, List[str]] = {}
+        self.chunks: Set[str] = set()
+
+    def mark(self, roots: Iterable[str]) -> None:
+        """Find every object reachable from the roots."""
+        stack: List[str] = list(roots)
+        while stack:
+            oid: str = stack.pop()
+            if oid in self.types:
+                continue
+            obj_type, data = self.database.read_object(oid)
+            self.types[oid] = obj_type
+            if obj_type == "commit":
+                tree, parents, _ = read_commit(data)
+                self.trees[oid] = tree
+                self.links[oid] = parents
+                stack.append(tree)
+                stack.extend(parents)
+            elif obj_type == "tree":
+                children: List[str] = []
+                for entry in Tree.parse(data).entries.values():
+                    if not entry or entry.mode == GITLINK_MODE:
+                        continue
+                    children.append(entry.oid)
+                    if entry.is_tree():
+                        stack.append(entry.oid)
+                    elif entry.oid not in self.types:
+                        self.types[entry.oid] = "blob"
+                        self._mark_chunks(entry.oid, None)
+                self.links[oid] = children
+            else:
+                self._mark_chunks(oid, data)
+
+    def _mark_chunks(self, oid: str, data: Optional[bytes]) -> None:
+        """Find the chunks of a blob, if it is a chunked blob's manifest."""
+        if self.database.is_chunked(oid):
+            if data is None:
+                data = self.database.read_object(oid)[1]
+            self.chunks.update(chunk for chunk, _ in Manifest.parse(data).chunks)
+
+    def commits(self) -> List[str]:
+        """Return the commits found, each after all of its ancestors."""
+        order: List[str] = []
+        done: Set[str] = set()
+        for start in self.trees:
+            stack: List[str] = [start]
+            while stack:
+                oid: str = stack[-1]
+                if oid in done:
+                    stack.pop()
+                    continue
+                pending: List[str] = [p for p in self.links[oid] if p not in done]
+                if pending:
+                    stack.extend(pending)
+                else:
+                    done.add(oid)
+                    order.append(oid)
+                    stack.pop()
+        return order
+
+    def bitmaps(
+        self, commits: Sequence[str], positions: Dict[str, int], size: int
+    ) -> Dict[str, int]:
+        """
+        Work out what each of some commits reaches, as a bitmap of `size`
+        bits with the bit of each object at its position.
+
+        The commits are taken ancestors first, so that each walk stops at
+        the commits it has already done and ORs in their bitmaps. Trees
+        already in the bitmap are not walked again, as everything below
+        them is in it too. Chunks are left out, as Git would leave them out.
+        """
+        done: Dict[str, int] = {}
+        for commit in commits:
+            bits: int = 0
+            walked: List[str] = []
+            seen: Set[str] = {commit}
+            stack: List[str] = [commit]
+            while stack:
+                oid: str = stack.pop()
+                if oid in done:
+                    bits |= done[oid]
+                    continue
+                walked.append(oid)
+                for parent in self.links[oid]:
+                    if parent not in seen:
+                        seen.add(parent)
+                        stack.append(parent)
+
+            # Set bits in a byte array, where testing a bit costs the same
+            # however many objects there are
+            marks: bytearray = bytearray(bits.to_bytes((size + 7) // 8, "little"))
+            for oid in walked:
+                position: int = positions[oid]
+                marks[position >> 3] |= 1 << (position & 7)
+                trees: List[str] = [self.trees[oid]]
+                while trees:
+                    tree: str = trees.pop()
+                    position = positions[tree]
+                    if marks[position >> 3] >> (position & 7) & 1:
+                        continue
+                    marks[position >> 3] |= 1 << (position & 7)
+                    for child in self.links[tree]:
+                        if self.types[child] == "tree":
+                            trees.append(child)
+                        else:
+                            position = positions[child]
+                            marks[position >> 3] |= 1 << (position & 7)
+            done[commit] = int.from_bytes(marks, "little")
+        return done
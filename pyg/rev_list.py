@@ -0,0 +1,160 @@
+import heapq
+from typing import Iterator, List, Optional, Set, Tuple, Union
+
+from database.database import Database
+from graph.graph import read_commit
+from graph.reader import CommitGraph
+from pack.bitmap import Bitmaps
+from pack.pack import COMMIT
+from pack.reader import Reader
+
+# A commit is walked by its position in the commit-graph, or by its oid if
+# the graph does not have it yet
+Node = Union[int, str]
+
+
+class RevList:
+    """
+    Walks the history of a commit, newest commits first.
+
+    Commits in the commit-graph are never opened: their parents, commit
+    times and generation numbers come from the graph's rows. Only commits
+    made since the graph was last written are read from the database.
+    Counting and ancestry checks use the reachability bitmaps `pyg gc`
+    writes, where there are any, so they only walk to the nearest bitmaps.
+    """
+
+    def __init__(self, database: Database, graph: CommitGraph) -> None:
+        self.database: Database = database
+        self.graph: CommitGraph = graph
+
+    def _node(self, oid: str) -> Node:
+        position: Optional[int] = self.graph.lookup(oid)
+        return oid if position is None else position
+
+    def _oid(self, node: Node) -> str:
+        return node if isinstance(node, str) else self.graph.oid(node)
+
+    def _parents(self, node: Node) -> List[Node]:
+        if isinstance(node, int):
+            return list(self.graph.parents(node))
+        _, parents, _ = read_commit(self.database.read_object(node)[1])
+        return [self._node(parent) for parent in parents]
+
+    def _time(self, node: Node) -> int:
+        if isinstance(node, int):
+            return self.graph.commit_time(node)
+        return read_commit(self.database.read_object(node)[1])[2]
+
+    def each(self, oid: str) -> Iterator[str]:
+        """Yield the oids of a commit and its ancestors, by commit time."""
+        start: Node = self._node(oid)
+        seen: Set[Node] = {start}
+
+        # Ties in commit time go to the commit queued first
+        queue: List[Tuple[int, int, Node]] = [(-self._time(start), 0, start)]
+        counter: int = 1
+        while queue:
+            _, _, node = heapq.heappop(queue)
+            yield self._oid(node)
+            for parent in self._parents(node):
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(queue, (-self._time(parent), counter, parent))
+                    counter += 1
+
+    def _reach(
+        self, start: Node, pack: Reader, bitmaps: Bitmaps
+    ) -> Tuple[int, Set[Node]]:
+        """
+        Find what a commit reaches with a pack's bitmaps, returning a bitmap
+        of the packed objects it reaches and the commits it reaches that the
+        pack does not have.
+
+        The walk stops at each commit with a bitmap and ORs that in, so it
+        only goes as far back as the nearest bitmaps. The commits it passes
+        on the way are set in the bitmap too.
+        """
+        bits: int = 0
+        walked: List[int] = []
+        unpacked: Set[Node] = set()
+        seen: Set[Node] = {start}
+        stack: List[Node] = [start]
+        while stack:
+            node: Node = stack.pop()
+            position: Optional[int] = pack.position(bytes.fromhex(self._oid(node)))
+            if position is None:
+                unpacked.add(node)
+            else:
+                found: Optional[int] = bitmaps.commit(position)
+                if found is not None:
+                    bits |= found
+                    continue
+                walked.append(pack.pack_position(position))
+            for parent in self._parents(node):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+
+        marks: bytearray = bytearray((pack.count + 7) // 8)
+        for position in walked:
+            marks[position >> 3] |= 1 << (position & 7)
+        return bits | int.from_bytes(marks, "little"), unpacked
+
+    def count(self, oid: str) -> int:
+        """
+        Count a commit and its ancestors.
+
+        With bitmaps, this is the number of commits set in what the commit
+        reaches, and any it reaches that are not packed.
+        """
+        start: Node = self._node(oid)
+        pack: Optional[Reader] = self.database.bitmapped_pack()
+        bitmaps: Optional[Bitmaps] = pack.bitmaps() if pack else None
+        if pack and bitmaps:
+            bits, unpacked = self._reach(start, pack, bitmaps)
+            return bin(bits & bitmaps.of_type(COMMIT)).count("1") + len(unpacked)
+
+        seen: Set[Node] = {start}
+        stack: List[Node] = [start]
+        while stack:
+            for parent in self._parents(stack.pop()):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return len(seen)
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """
+        Check whether a commit is reachable from another.
+
+        With bitmaps, this is whether the ancestor is set in what the
+        descendant reaches. Without, a commit's ancestors all have lower generation numbers than it, so
+        the walk does not go below the generation of the ancestor sought.
+        """
+        target: Node = self._node(ancestor)
+        pack: Optional[Reader] = self.database.bitmapped_pack()
+        bitmaps: Optional[Bitmaps] = pack.bitmaps() if pack else None
+        if pack and bitmaps:
+            bits, unpacked = self._reach(self._node(descendant), pack, bitmaps)
+            position: Optional[int] = pack.position(bytes.fromhex(ancestor))
+            if position is None:
+                return target in unpacked
+            return bool(bits >> pack.pack_position(position) & 1)
+
+        cutoff: int = self.graph.generation(target) if isinstance(target, int) else 0
+
+        start: Node = self._node(descendant)
+        seen: Set[Node] = {start}
+        stack: List[Node] = [start]
+        while stack:
+            node: Node = stack.pop()
+            if node == target:
+                return True
+            if isinstance(node, int) and self.graph.generation(node) < cutoff:
+                continue
+            for parent in self._parents(node):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
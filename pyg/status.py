@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from os import stat_result
+from stat import S_ISDIR
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from database.database import Database
+from index.entry import stat_fields
+from index.index import Index
+from index.monitor_state import MonitorState
+from workspace import Workspace
+
+# The position of an entry, what became of its file and, if the file's
+# contents are unchanged, its new stat
+Result = Tuple[int, str, Optional[stat_result]]
+
+
+class Status:
+    """
+    Compares the workspace against the index.
+
+    Each entry's file is stat'ed and its stat compared with the fields stored
+    in the entry's record, without building Entry objects. Only files whose
+    stat no longer matches, and racily clean entries, whose size was smudged
+    when the index was loaded, are read and hashed. Files whose contents turn
+    out to be unchanged have their entries refreshed with the new stat, so an
+    index written afterwards spares the next run from hashing them again.
+
+    The stat calls and hashing release the GIL, so entries are checked in
+    batches on a pool of threads.
+    """
+
+    MODIFIED = "M"
+    DELETED = "D"
+    UNCHANGED = ""
+
+    BATCH_SIZE = 1024
+
+    # Positions of the mode and size within an entry's stat fields
+    MODE_FIELD = 6
+    SIZE_FIELD = 9
+
+    def __init__(
+        self,
+        workspace: Workspace,
+        index: Index,
+        database: Database,
+        jobs: Optional[int] = None,
+    ) -> None:
+        self.workspace: Workspace = workspace
+        self.index: Index = index
+        self.database: Database = database
+        self.jobs: int = jobs or os.cpu_count() or 1
+        self.root: bytes = os.path.join(os.fsencode(workspace.pathname), b"")
+        self.paths: List[bytes] = index.entries.sorted_paths()
+
+        # Tracked paths that differ from the index, in path order, with a code
+        self.changed: Dict[str, str] = {}
+        self.untracked: List[str] = []
+
+    def run(self, monitor: Optional[MonitorState] = None) -> None:
+        """
+        Find the modified, deleted and untracked files of the workspace.
+
+        With a valid fsmonitor state, only the paths it holds as dirty are
+        looked at. Otherwise every entry is checked, and the untracked files
+        are found with a scan that reuses the untracked cache.
+        """
+        positions: Sequence[int]
+        names: Iterable[str]
+        if monitor and monitor.is_valid():
+            candidates: List[str] = monitor.candidates("")
+            positions = self.positions_below(candidates)
+            names = (p.as_posix() for p, _ in self.workspace.walk_paths(candidates))
+        else:
+            positions = range(len(self.paths))
+            names = self.workspace.scan(None, self.index.untracked_cache())
+
+        tracked: Set[bytes] = set(self.paths)
+        self.untracked = sorted(n for n in names if os.fsencode(n) not in tracked)
+        self.check_tracked(positions)
+
+    def check_tracked(self, positions: Optional[Sequence[int]] = None) -> None:
+        """
+        Find the modified and deleted files among the entries at some
+        positions, or among every entry, refreshing the entries of files that
+        turn out to be unchanged.
+        """
+        if positions is None:
+            positions = range(len(self.paths))
+        for i, code, stat in self._check_all(positions):
+            if code == self.UNCHANGED and stat:
+                self.index.refresh(i, stat)
+            elif code:
+                self.changed[os.fsdecode(self.paths[i])] = code
+
+    def positions_below(self, candidates: List[str]) -> List[int]:
+        """Return the positions of the entries at or below some paths."""
+        return self.index.entries.positions_below(map(os.fsencode, candidates))
+
+    def _check_all(self, positions: Sequence[int]) -> List[Result]:
+        """Check the entries at some positions, keeping only those to act on."""
+        batches: List[Sequence[int]] = [
+            positions[n : n + self.BATCH_SIZE]
+            for n in range(0, len(positions), self.BATCH_SIZE)
+        ]
+        if self.jobs == 1 or len(batches) < 2:
+            return [result for batch in batches for result in self._check(batch)]
+
+        with ThreadPoolExecutor(self.jobs) as pool:
+            return [
+                result
+                for results in pool.map(self._check, batches)
+                for result in results
+            ]
+
+    def _check(self, positions: Sequence[int]) -> List[Result]:
+        """Compare the files of some entries with the entries."""
+        entries = self.index.entries
+        stat_at = entries.stat_at
+        root: bytes = self.root
+        paths: List[bytes] = self.paths
+        results: List[Result] = []
+        for i in positions:
+            pathname: bytes = root + paths[i]
+            try:
+                stat: stat_result = os.stat(pathname)
+            except (FileNotFoundError, NotADirectoryError):
+                results.append((i, self.DELETED, None))
+                continue
+
+            # Entries match on every stored field, except smudged entries,
+            # which only match empty files and are hashed to be sure
+            fields: Tuple[int, ...] = stat_fields(stat)
+            recorded: Tuple[int, ...] = stat_at(i)
+            size: int = recorded[self.SIZE_FIELD]
+            if size != 0 and fields == recorded:
+                continue
+
+            if S_ISDIR(stat.st_mode):
+                results.append((i, self.DELETED, None))
+                continue
+
+            # A different mode or size is a change whatever the contents
+            if fields[self.MODE_FIELD] != recorded[self.MODE_FIELD] or (
+                size != 0 and fields[self.SIZE_FIELD] != size
+            ):
+                results.append((i, self.MODIFIED, None))
+                continue
+
+            with open(pathname, "rb") as f:
+                oid: str = self.database.hash_stream(f, stat.st_size)
+            if oid != entries.oid_at(i):
+                results.append((i, self.MODIFIED, None))
+            elif fields != recorded:
+                results.append((i, self.UNCHANGED, stat))
+        return results
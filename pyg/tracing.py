@@ -0,0 +1,201 @@
+"""
+Timing of pyg's phases, turned on with the PYG_TRACE environment variable.
+
+Set to 1, PYG_TRACE writes a line of JSON to stderr for every span as it
+ends; set to an absolute path, it appends them to that file. With
+PYG_TRACE_FORMAT=chrome, the spans are instead written at exit as one trace
+in Chrome's trace event format, which chrome://tracing and Perfetto open.
+Either way, a table of the time, bytes and objects of each kind of span is
+written to stderr at exit, and the whole run is a span of its own.
+
+When PYG_TRACE is unset, `traced` returns functions as they are, `span`
+returns a shared context manager that does nothing, and `count` returns
+straight away, so tracing costs next to nothing.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+TRACE_VARIABLE = "PYG_TRACE"
+FORMAT_VARIABLE = "PYG_TRACE_FORMAT"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+    """A timed piece of work, with counts of what it did."""
+
+    __slots__ = ("name", "counts")
+
+    def __init__(self, name: str, counts: Dict[str, int]) -> None:
+        self.name: str = name
+        self.counts: Dict[str, int] = counts
+
+
+class Tracer:
+    """
+    Records spans, nested per thread, and writes them out.
+
+    Counts are added to the innermost open span, and each span's counts are
+    added to its parent's when it ends, so a span counts everything done
+    inside it.
+    """
+
+    def __init__(self, out: IO[str], chrome: bool) -> None:
+        self.out: IO[str] = out
+        self.chrome: bool = chrome
+        self.events: List[Dict[str, Any]] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.local: threading.local = threading.local()
+        self.origin: float = time.perf_counter()
+
+        # Calls, seconds and counts of every span, by name
+        self.totals: Dict[str, Dict[str, float]] = {}
+
+        self.root: Span = Span("pyg " + " ".join(sys.argv[1:2]), {})
+        self._stack().append(self.root)
+        atexit.register(self.finish)
+
+    def _stack(self) -> List[Span]:
+        stack: List[Span] = getattr(self.local, "stack", None) or []
+        self.local.stack = stack
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **counts: int) -> Iterator[Span]:
+        stack: List[Span] = self._stack()
+        span: Span = Span(name, counts)
+        stack.append(span)
+        start: float = time.perf_counter()
+        try:
+            yield span
+        finally:
+            end: float = time.perf_counter()
+            stack.pop()
+            if stack:
+                self._add(stack[-1], span.counts)
+            self._record(span, start, end, len(stack))
+
+    def count(self, **counts: int) -> None:
+        stack: List[Span] = self._stack()
+        if stack:
+            self._add(stack[-1], counts)
+
+    @staticmethod
+    def _add(span: Span, counts: Dict[str, int]) -> None:
+        for key, value in counts.items():
+            span.counts[key] = span.counts.get(key, 0) + value
+
+    def _record(self, span: Span, start: float, end: float, depth: int) -> None:
+        event: Dict[str, Any] = {
+            "name": span.name,
+            "ph": "X",
+            "ts": round((start - self.origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {"depth": depth, **span.counts},
+        }
+        with self.lock:
+            total: Dict[str, float] = self.totals.setdefault(
+                span.name, {"calls": 0, "seconds": 0.0}
+            )
+            total["calls"] += 1
+            total["seconds"] += end - start
+            for key, value in span.counts.items():
+                total[key] = total.get(key, 0) + value
+
+            if self.chrome:
+                self.events.append(event)
+            else:
+                self.out.write(json.dumps(event) + "\n")
+                self.out.flush()
+
+    def finish(self) -> None:
+        """End the span of the whole run and write out what is left."""
+        self._record(self.root, self.origin, time.perf_counter(), 0)
+        if self.chrome:
+            json.dump({"traceEvents": self.events}, self.out)
+            self.out.write("\n")
+        self.out.flush()
+        sys.stderr.write(self.summary())
+
+    def summary(self) -> str:
+        keys: List[str] = sorted(
+            {key for total in self.totals.values() for key in total}
+            - {"calls", "seconds"}
+        )
+        width: int = max(len(name) for name in self.totals)
+        lines: List[str] = [
+            f"{'span':<{width}} {'calls':>8} {'ms':>10}"
+            + "".join(f" {key:>12}" for key in keys)
+        ]
+        for name, total in sorted(
+            self.totals.items(), key=lambda item: -item[1]["seconds"]
+        ):
+            lines.append(
+                f"{name:<{width}} {total['calls']:>8} {total['seconds'] * 1000:>10.1f}"
+                + "".join(f" {total.get(key, 0):>12}" for key in keys)
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _open_tracer() -> Optional[Tracer]:
+    target: str = os.environ.get(TRACE_VARIABLE, "")
+    if target in ("", "0", "false"):
+        return None
+    out: IO[str] = open(target, "a") if os.path.isabs(target) else sys.stderr
+    return Tracer(out, os.environ.get(FORMAT_VARIABLE) == "chrome")
+
+
+_tracer: Optional[Tracer] = _open_tracer()
+_disabled: ContextManager[None] = nullcontext()
+
+
+def span(name: str, **counts: int) -> ContextManager[Any]:
+    """Time a block of code as a span."""
+    if _tracer is None:
+        return _disabled
+    return _tracer.span(name, **counts)
+
+
+def count(**counts: int) -> None:
+    """Add counts, such as bytes or objects, to the innermost open span."""
+    if _tracer is not None:
+        _tracer.count(**counts)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Time every call to a function as a span."""
+
+    def decorate(function: F) -> F:
+        if _tracer is None:
+            return function
+
+        tracer: Tracer = _tracer
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorate
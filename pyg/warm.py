@@ -0,0 +1,80 @@
+"""
+Repository files kept parsed in memory by the pyg daemon between commands.
+
+The daemon loads the index, the caches beside it and the commit-graph with
+keeping turned on, and each is kept with the identity of the file it was
+parsed from: its inode, size, mtime and ctime, all of which a rewrite
+changes. Each command the daemon runs in a forked child, where loading one
+of those files takes the kept value instead of parsing it again, as long as
+the file is still the one it was parsed from. The child has a copy of the
+daemon's memory, so a command can change what it took without the daemon or
+any other command seeing it, and a value is only taken once per command.
+
+Outside the daemon nothing is kept, and taking costs a lookup in an empty
+dict.
+"""
+
+import os
+from os import stat_result
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# The inode, size, mtime and ctime of a file, in nanoseconds
+FileKey = Tuple[int, int, int, int]
+
+# Whether values are kept as they are loaded; set by the daemon
+keeping: bool = False
+
+# Values by the path they were loaded from, with their file's key, or None
+# for a value that does not go stale, such as one made of objects
+_kept: Dict[Path, Tuple[Optional[FileKey], Any]] = {}
+
+
+def file_key(stat: stat_result) -> FileKey:
+    """Return the parts of a file's stat that change when it is rewritten."""
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+
+
+def keep(path: Path, value: Any, stat: Optional[stat_result] = None) -> None:
+    """
+    Keep a value loaded from a file with a stat, if values are being kept.
+
+    Without a stat, the value is handed out for as long as it is kept.
+    """
+    if keeping:
+        _kept[path] = (file_key(stat) if stat else None, value)
+
+
+def take(path: Path, stat: Optional[stat_result] = None) -> Any:
+    """
+    Return the value kept for a file, if the file is still the one it was
+    loaded from, or None.
+
+    The file is only looked at when a value is kept for it, and a stat
+    given is taken to be the file's. The value is forgotten unless values
+    are being kept, so that it is only used once.
+    """
+    if path not in _kept:
+        return None
+    key, value = _kept[path] if keeping else _kept.pop(path)
+    if key is None:
+        return value
+    if stat is None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+    return value if file_key(stat) == key else None
+
+
+def is_current(path: Path) -> bool:
+    """Check whether a value is kept for a file that has not changed since."""
+    if path not in _kept:
+        return False
+    key, _ = _kept[path]
+    if key is None:
+        return True
+    try:
+        return file_key(os.stat(path)) == key
+    except OSError:
+        return False
@@ -1,68 +1,321 @@
 import os
+import time
+from io import BufferedReader
 from pathlib import Path
-from typing import List, Optional
+from stat import S_ISDIR
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ignore import Ignore, RuleSet
+from index.entry import split_time
+from index.untracked_cache import CachedDirectory, StatKey, UntrackedCache, stat_key
+import tracing
 
 
 class Workspace:
     IGNORE = [".git"]
+    EXCLUDE = (".git", "info", "exclude")
+
+    # How recently a directory may have changed and still have its listing
+    # cached, allowing for filesystems that only keep mtimes to the second
+    RACY_WINDOW = 2_000_000_000
 
     def __init__(self, pathname: Path) -> None:
         self.pathname: Path = pathname
 
-    def _list_files(self, path: Path) -> List[Path]:
-        if path.is_dir():
-            # Remove ignored filenames
-            filenames = os.listdir(path)
-            for i in self.IGNORE:
-                if i in filenames:
-                    filenames.remove(i)
-
-            # Recursively find all files below directory
-            # Does not include directories
-            r = []
-            for name in filenames:
-                p = Path(path).joinpath(name)
-                for f in self._list_files(p):
-                    r.append(f)
-            return r
+    def walk(
+        self, path: Optional[Path] = None, cache: Optional[UntrackedCache] = None
+    ) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Yield every file below a path that is not ignored, with its stat."""
+        root: str = str(self.pathname)
+        for name in self.scan(path, cache):
+            yield Path(name), os.stat(os.path.join(root, name))
+
+    def walk_paths(
+        self, paths: Iterable[str], cache: Optional[UntrackedCache] = None
+    ) -> Iterator[Tuple[Path, os.stat_result]]:
+        """
+        Yield the files among some paths that exist and are not ignored.
+
+        Paths that are now directories are walked in full, as everything in
+        them may be new.
+        """
+        root: str = str(self.pathname)
+        rules: Dict[str, Optional[Ignore]] = {}
+        seen: Set[str] = set()
+        for path in sorted(paths):
+            if path in seen:
+                continue
+            try:
+                stat: os.stat_result = os.stat(os.path.join(root, path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+            is_dir: bool = S_ISDIR(stat.st_mode)
+            ignore: Optional[Ignore] = self._rules_inside(
+                path.rpartition("/")[0], rules
+            )
+            if not ignore or ignore.is_ignored(path, is_dir):
+                continue
 
+            if not is_dir:
+                seen.add(path)
+                yield Path(path), stat
+                continue
+
+            for name in self.scan(Path(root, path), cache):
+                if name not in seen:
+                    seen.add(name)
+                    yield Path(name), os.stat(os.path.join(root, name))
+
+    def _rules_inside(
+        self, directory: str, rules: Dict[str, Optional[Ignore]]
+    ) -> Optional[Ignore]:
+        """Return the ignore rules inside a directory, or None if it is ignored."""
+        if directory in rules:
+            return rules[directory]
+
+        ignore: Optional[Ignore]
+        if not directory:
+            exclude: Optional[RuleSet] = RuleSet.load(
+                self.pathname.joinpath(*self.EXCLUDE)
+            )
+            ignore = Ignore(exclude).below(self.pathname, "")
         else:
-            return [path.relative_to(self.pathname)]
-
-    #    def _list_files(self, directory: Path) -> List[Path]:
-    #        # Get all files in directory, removing ignored filenames
-    #        filenames = os.listdir(directory)
-    #        for i in self.IGNORE:
-    #            if i in filenames:
-    #                filenames.remove(i)
-    #
-    #        # Recursively find all files below directory
-    #        r = []
-    #        for name in filenames:
-    #            path = Path(directory).joinpath(name)
-    #
-    #            if path.is_dir():
-    #                # Recursively append all files below dir
-    #                for f in self._list_files(path):
-    #                    r.append(f)
-    #            else:
-    #                # Append file
-    #                r.append(path.relative_to(self.pathname))
-    #        return r
+            outer: Optional[Ignore] = self._rules_inside(
+                directory.rpartition("/")[0], rules
+            )
+            if not outer or outer.is_ignored(directory, True):
+                ignore = None
+            else:
+                ignore = outer.below(Path(self.pathname, directory), f"{directory}/")
 
-    def list_files(self, path: Optional[Path] = None) -> List[Path]:
-        """Recursively list files and directories, ignoring certain files."""
-        # Default to workspace
+        rules[directory] = ignore
+        return ignore
+
+    def exclude_key(self) -> Optional[StatKey]:
+        """Return the stat of the exclude file that cached listings depend on."""
+        return self._stat_key(Path(self.pathname).joinpath(*self.EXCLUDE))
+
+    def scan(
+        self, path: Optional[Path] = None, cache: Optional[UntrackedCache] = None
+    ) -> Iterator[str]:
+        """
+        Yield the path of every file below a path that is not ignored.
+
+        Paths are relative to the workspace. Directories are read with
+        scandir, whose entries already know whether they are directories, and
+        ignored directories are never entered.
+
+        With a cache, a directory whose mtime has not changed is not read at
+        all: its listing comes from the cache, at the cost of one stat.
+        Directories modified within RACY_WINDOW of the scan are not cached, as
+        a coarse mtime could miss changes made in the same tick.
+        """
+        root: Path = Path(self.pathname)
         if not path:
-            path = self.pathname
-        return self._list_files(path)
+            path = root
+        relative: Path = path.relative_to(root)
+        if not path.is_dir():
+            # A file named outright is subject to the same rules as any other
+            name: str = relative.as_posix()
+            rules: Optional[Ignore] = self._rules_inside(name.rpartition("/")[0], {})
+            if rules and not rules.is_ignored(name, False):
+                yield name
+            return
+
+        if cache is None:
+            cache = UntrackedCache()
+        cache.check_exclude(self.exclude_key())
+        ignore: Ignore = self._ignore_above(relative)
+        prefix: str = "" if relative == Path(".") else f"{relative.as_posix()}/"
+        racy: int = time.time_ns() - self.RACY_WINDOW
+
+        # Each directory is pushed with the prefix of the paths below it, its
+        # listing and whether that listing must be read again because the
+        # ignore rules above it changed; None marks where the rules of a
+        # directory's .gitignore stop applying
+        stack: List[Optional[Tuple[str, str, CachedDirectory, bool]]] = [
+            (str(path), prefix, cache.find(relative.parts), False)
+        ]
+        while stack:
+            item: Optional[Tuple[str, str, CachedDirectory, bool]] = stack.pop()
+            if item is None:
+                ignore.leave()
+                continue
+
+            directory, prefix, listing, stale = item
+            stat: os.stat_result = os.stat(directory)
+            mtime: Tuple[int, int] = split_time(stat.st_mtime_ns)
+
+            # A .gitignore edited in place does not change the directory's mtime
+            ignore_key: Optional[StatKey] = None
+            if listing.ignore:
+                ignore_key = self._stat_key(Path(directory, Ignore.FILE_NAME))
+
+            if not stale and listing.is_valid(mtime) and ignore_key == listing.ignore:
+                if listing.ignore and ignore.enter(Path(directory), prefix):
+                    stack.append(None)
+            else:
+                if ignore.enter(Path(directory), prefix):
+                    stack.append(None)
+                ignore_key = self._list_directory(
+                    directory, prefix, listing, ignore, mtime
+                )
+                stale = stale or ignore_key != listing.ignore
+                listing.ignore = ignore_key
 
+                # Listings of recently changed directories, or with recently
+                # changed rules, are kept for this walk only
+                if stat.st_mtime_ns >= racy or (
+                    ignore_key and ignore_key[0] * 1_000_000_000 + ignore_key[1] >= racy
+                ):
+                    listing.mtime = None
+                    listing.ignore = None
+                else:
+                    cache.changed = True
+
+            for name in listing.files:
+                yield prefix + name
+            for name, child in listing.dirs.items():
+                stack.append(
+                    (os.path.join(directory, name), f"{prefix}{name}/", child, stale)
+                )
+
+    def _list_directory(
+        self,
+        directory: str,
+        prefix: str,
+        listing: CachedDirectory,
+        ignore: Ignore,
+        mtime: Tuple[int, int],
+    ) -> Optional[StatKey]:
+        """
+        Read a directory into its listing, returning the stat of its .gitignore.
+
+        The listing keeps its previous .gitignore stat, so that the caller can
+        tell whether the rules for the directories below it have changed.
+        """
+        files: List[str] = []
+        dirs: List[str] = []
+        ignore_key: Optional[StatKey] = None
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name in self.IGNORE:
+                    continue
+                name: str = prefix + entry.name
+                if entry.is_dir():
+                    if not ignore.is_ignored(name, True):
+                        dirs.append(entry.name)
+                elif not ignore.is_ignored(name, False):
+                    files.append(entry.name)
+                if entry.name == Ignore.FILE_NAME:
+                    ignore_key = stat_key(entry.stat())
+
+        listing.update(mtime, files, dirs)
+        return ignore_key
+
+    def _stat_key(self, path: Path) -> Optional[StatKey]:
+        """Return the stat that the cache compares for a file, if it exists."""
+        try:
+            return stat_key(os.stat(path))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def _ignore_above(self, relative: Path) -> Ignore:
+        """Load the ignore rules that apply above a directory of the workspace."""
+        root: Path = Path(self.pathname)
+        ignore: Ignore = Ignore(RuleSet.load(root.joinpath(*self.EXCLUDE)))
+        base: str = ""
+        directory: Path = root
+        for part in relative.parts:
+            ignore.enter(directory, base)
+            base += f"{part}/"
+            directory = directory.joinpath(part)
+        return ignore
+
+    @tracing.traced("workspace.list_files")
+    def list_files(self, path: Optional[Path] = None) -> List[Path]:
+        """Recursively list files below a path, skipping ignored ones."""
+        return [pathname for pathname, _ in self.walk(path)]
+
+    @tracing.traced("workspace.read_file")
     def read_file(self, path: Path) -> bytes:
         """Read the contents of a file as bytes."""
         with open(path, "rb") as p:
             contents = p.read()
+        tracing.count(bytes_read=len(contents))
         return contents
 
+    @tracing.traced("workspace.write_file")
+    def write_file(
+        self, path: Path, chunks: Iterable[bytes], executable: bool
+    ) -> os.stat_result:
+        """
+        Write a file afresh from its contents and return its stat.
+
+        Any file already at the path is removed first, so that the new file
+        takes its mode from the executable bit and the umask alone.
+        """
+        pathname: str = os.path.join(self.pathname, path)
+        try:
+            os.unlink(pathname)
+        except FileNotFoundError:
+            pass
+
+        flags: int = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+        mode: int = 0o777 if executable else 0o666
+        try:
+            fd: int = os.open(pathname, flags, mode)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(pathname), exist_ok=True)
+            fd = os.open(pathname, flags, mode)
+
+        size: int = 0
+        with open(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+            f.flush()
+            stat: os.stat_result = os.fstat(fd)
+        tracing.count(bytes_written=size)
+        return stat
+
+    def remove_file(self, path: Path) -> None:
+        """Remove a file, if it is still there."""
+        try:
+            os.unlink(os.path.join(self.pathname, path))
+        except FileNotFoundError:
+            pass
+
+    def make_directories(self, paths: Iterable[Path]) -> None:
+        """
+        Make the directories that some files need in a single pass, each one
+        once and before those inside it, leaving existing ones as they are.
+        """
+        directories: Set[Path] = set()
+        for path in paths:
+            directories.update(list(path.parents)[:-1])
+        for directory in sorted(directories):
+            try:
+                os.mkdir(os.path.join(self.pathname, directory))
+            except FileExistsError:
+                pass
+
+    def remove_empty_directories(self, paths: Iterable[Path]) -> None:
+        """Remove the directories of some removed files that are left empty."""
+        directories: Set[Path] = set()
+        for path in paths:
+            directories.update(list(path.parents)[:-1])
+        for directory in sorted(directories, key=lambda d: len(d.parts), reverse=True):
+            try:
+                os.rmdir(os.path.join(self.pathname, directory))
+            except OSError:
+                pass
+
+    def open_file(self, path: Path) -> BufferedReader:
+        """Open a file for reading its contents as a stream of bytes."""
+        return open(path, "rb")
+
     def stat_file(self, path: Path) -> os.stat_result:
         """Returns the file type and permissions of a file."""
         return Path(self.pathname).joinpath(path).stat()
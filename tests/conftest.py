@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import pytest
+
+PYG_PATH: Path = Path(__file__).resolve().parents[1].joinpath("pyg")
+sys.path.insert(0, str(PYG_PATH))
+
+# The environment every command runs with: a fixed author, and no trace or
+# daemon left over from the shell running the tests
+AUTHOR: Dict[str, str] = {
+    "GIT_AUTHOR_NAME": "A. U. Thor",
+    "GIT_AUTHOR_EMAIL": "author@example.com",
+}
+
+
+def pyg_env(extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Return the environment to run pyg with."""
+    env: Dict[str, str] = {
+        key: value for key, value in os.environ.items() if not key.startswith("PYG_")
+    }
+    env.update(AUTHOR)
+    env.update(extra or {})
+    return env
+
+
+@pytest.fixture
+def pyg() -> Callable[..., subprocess.CompletedProcess]:
+    """Run a pyg command in a repository, failing the test if it fails."""
+
+    def run(
+        root: Path,
+        *args: str,
+        stdin: str = "",
+        env: Optional[Dict[str, str]] = None,
+        check: bool = True,
+    ) -> subprocess.CompletedProcess:
+        argv: List[str] = [sys.executable, str(PYG_PATH.joinpath("main.py")), *args]
+        return subprocess.run(
+            argv,
+            cwd=root,
+            input=stdin.encode(),
+            capture_output=True,
+            env=pyg_env(env),
+            check=check,
+        )
+
+    return run
+
+
+@pytest.fixture
+def repo(tmp_path: Path, pyg: Callable[..., subprocess.CompletedProcess]) -> Path:
+    """An empty repository."""
+    root: Path = tmp_path.joinpath("repo")
+    root.mkdir()
+    pyg(root, "init")
+    return root
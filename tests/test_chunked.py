@@ -0,0 +1,37 @@
+import io
+import random
+from hashlib import sha1
+from typing import List
+
+from database.chunked import Chunker
+
+ROWS = 160_000
+
+
+def chunk_oids(data: bytes) -> List[str]:
+    chunks: List[bytes] = list(Chunker().split(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= Chunker.MAX_SIZE for chunk in chunks)
+    return [sha1(chunk).hexdigest() for chunk in chunks]
+
+
+def test_insertion_into_text_keeps_most_chunks() -> None:
+    rng: random.Random = random.Random(0)
+    lines: List[bytes] = [
+        b"%d,%s,%d,%.4f\n"
+        % (
+            i,
+            rng.choice([b"alpha", b"beta", b"gamma"]),
+            rng.randrange(10**6),
+            rng.random(),
+        )
+        for i in range(ROWS)
+    ]
+    old: List[str] = chunk_oids(b"".join(lines))
+    lines.insert(10, b"10,inserted,0,0.0000\n")
+    new: List[str] = chunk_oids(b"".join(lines))
+
+    # Cut by content rather than at MAX_SIZE, and only the first chunk differs
+    assert len(old) > 3
+    assert len(set(new) - set(old)) == 1
+    assert new[1:] == old[1:]
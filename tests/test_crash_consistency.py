@@ -0,0 +1,188 @@
+"""
+Kill add and commit part way through, under each PYG_FSYNC mode, and check
+that whatever is left on disk refers only to objects that are whole.
+
+The command runs in a child process that kills itself just before its n-th
+rename, fsync or unlink, the steps at which what it has written becomes
+visible, for crash points spread over the whole run.
+"""
+
+import shutil
+import signal
+import subprocess
+import sys
+import zlib
+from hashlib import sha1
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pytest
+
+from conftest import PYG_PATH, pyg_env
+from database.chunked import Manifest
+from database.database import Database
+from index.index import Index
+from reachable import Reachable
+
+DRIVER = """
+import os, runpy, signal, sys
+
+limit = int(os.environ["CRASH_AFTER"])
+calls = 0
+
+def crashing(name):
+    real = getattr(os, name)
+
+    def call(*args, **kwargs):
+        global calls
+        calls += 1
+        if calls == limit:
+            os.kill(os.getpid(), signal.SIGKILL)
+        return real(*args, **kwargs)
+
+    setattr(os, name, call)
+
+for name in ("rename", "replace", "fsync", "unlink"):
+    crashing(name)
+
+if not limit:
+    import atexit
+    atexit.register(lambda: open(os.environ["CRASH_COUNT"], "w").write(str(calls)))
+
+main = sys.argv[1]
+sys.path.insert(0, os.path.dirname(main))
+sys.argv = sys.argv[1:]
+runpy.run_path(main, run_name="__main__")
+"""
+
+# Crash points tried for each command and mode, spread evenly over its run
+CRASH_POINTS = 12
+
+FILES = 40
+
+
+def run_crashing(
+    root: Path, args: List[str], mode: str, limit: int, stdin: str = ""
+) -> Optional[int]:
+    """
+    Run a command that kills itself at its limit-th step, or, with a limit
+    of 0, runs to the end and returns how many steps it took.
+    """
+    count_path: Path = root.parent.joinpath("steps")
+    process = subprocess.run(
+        [sys.executable, "-c", DRIVER, str(PYG_PATH.joinpath("main.py")), *args],
+        cwd=root,
+        input=stdin.encode(),
+        capture_output=True,
+        env=pyg_env(
+            {
+                Database.FSYNC_VARIABLE: mode,
+                "CRASH_AFTER": str(limit),
+                "CRASH_COUNT": str(count_path),
+            }
+        ),
+    )
+    if limit:
+        assert process.returncode in (0, -signal.SIGKILL), process.stderr
+        return None
+    assert process.returncode == 0, process.stderr
+    return int(count_path.read_text())
+
+
+def check_object(database: Database, oid: str) -> None:
+    """Check that an object is stored whole, with the contents its oid names."""
+    obj_type, data = database.read_object(oid)
+    header: bytes = b"%s %d\0" % (obj_type.encode(), len(data))
+    assert sha1(header + data).hexdigest() == oid
+    if database.is_chunked(oid):
+        for chunk, _ in Manifest.parse(data).chunks:
+            check_object(database, chunk)
+
+
+def check_repository(root: Path) -> None:
+    """
+    Check that every loose object is whole, and that every object the index
+    and HEAD refer to is stored whole.
+    """
+    git_path: Path = root.joinpath(".git")
+    database: Database = Database(git_path.joinpath("objects"))
+
+    for dirname in git_path.joinpath("objects").iterdir():
+        if len(dirname.name) != 2:
+            continue
+        for path in dirname.iterdir():
+            if path.name.startswith(Database.TEMP_PREFIX):
+                continue
+            data: bytes = zlib.decompress(path.read_bytes())
+            assert sha1(data).hexdigest() == dirname.name + path.name
+
+    index: Index = Index(git_path.joinpath("index"))
+    index.load()
+    for entry in index.each_entry():
+        check_object(database, entry.oid)
+
+    head_path: Path = git_path.joinpath("HEAD")
+    if head_path.exists():
+        head: str = head_path.read_text()
+        assert len(head) == 41 and head.endswith("\n")
+        reachable: Reachable = Reachable(database)
+        reachable.mark([head.strip()])
+        for oid in reachable.types:
+            check_object(database, oid)
+
+
+def write_files(root: Path, version: int) -> None:
+    for i in range(FILES):
+        directory: Path = root.joinpath(f"dir{i % 4}")
+        directory.mkdir(exist_ok=True)
+        directory.joinpath(f"file{i}.txt").write_text(f"{version} {i}\n" * (i + 1))
+
+
+@pytest.fixture
+def committed(repo: Path, pyg: Callable[..., subprocess.CompletedProcess]) -> Path:
+    """A repository with one commit, and every file since changed."""
+    write_files(repo, 1)
+    pyg(repo, "add", ".")
+    pyg(repo, "commit", stdin="first\n")
+    write_files(repo, 2)
+    return repo
+
+
+def crash_points(steps: int) -> List[int]:
+    return sorted({1 + i * steps // CRASH_POINTS for i in range(CRASH_POINTS)})
+
+
+@pytest.mark.parametrize("mode", Database.FSYNC_MODES)
+def test_add_killed_part_way(committed: Path, tmp_path: Path, mode: str) -> None:
+    trial: Path = tmp_path.joinpath("trial", "repo")
+    shutil.copytree(committed, trial)
+    steps: Optional[int] = run_crashing(trial, ["add", "-j1", "."], mode, 0)
+    assert steps
+    check_repository(trial)
+
+    for limit in crash_points(steps):
+        shutil.rmtree(trial.parent)
+        shutil.copytree(committed, trial)
+        run_crashing(trial, ["add", "-j1", "."], mode, limit)
+        check_repository(trial)
+
+
+@pytest.mark.parametrize("mode", Database.FSYNC_MODES)
+def test_commit_killed_part_way(
+    committed: Path,
+    tmp_path: Path,
+    mode: str,
+    pyg: Callable[..., subprocess.CompletedProcess],
+) -> None:
+    pyg(committed, "add", ".")
+    trial: Path = tmp_path.joinpath("trial", "repo")
+    shutil.copytree(committed, trial)
+    steps: Optional[int] = run_crashing(trial, ["commit"], mode, 0, "second\n")
+    assert steps
+    check_repository(trial)
+
+    for limit in crash_points(steps):
+        shutil.rmtree(trial.parent)
+        shutil.copytree(committed, trial)
+        run_crashing(trial, ["commit"], mode, limit, "second\n")
+        check_repository(trial)
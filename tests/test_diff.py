@@ -0,0 +1,82 @@
+import io
+import random
+import shutil
+import subprocess
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from diff.diff import Diff
+from diff.writer import Side, UnifiedWriter
+
+GIT_FLAGS = {Diff.MYERS: "--diff-algorithm=myers", Diff.HISTOGRAM: "--histogram"}
+
+# Lines of source, with the braces, blank lines and indents that runs of
+# changes slide along and the indent heuristic weighs
+LINES: List[bytes] = [
+    b"{\n",
+    b"}\n",
+    b"\n",
+    b"a\n",
+    b"b\n",
+    b"    x\n",
+    b"    y\n",
+    b"\tz\n",
+    b"        return\n",
+]
+
+CASES = 150
+
+
+def versions(seed: int) -> Tuple[bytes, bytes]:
+    """Make a file and an edited copy of it."""
+    rng: random.Random = random.Random(seed)
+    old: List[bytes] = [rng.choice(LINES) for _ in range(rng.randint(5, 60))]
+    new: List[bytes] = list(old)
+    for _ in range(rng.randint(1, 6)):
+        i: int = rng.randrange(len(new) + 1)
+        kind: float = rng.random()
+        if kind < 0.4:
+            new[i:i] = [rng.choice(LINES) for _ in range(rng.randint(1, 4))]
+        elif kind < 0.7:
+            del new[i : i + rng.randint(1, 3)]
+        elif i < len(new):
+            new[i] = rng.choice(LINES)
+    return b"".join(old), b"".join(new)
+
+
+def hunks(patch: bytes) -> bytes:
+    return patch[patch.find(b"@@") :]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+@pytest.mark.parametrize("algorithm", Diff.ALGORITHMS)
+def test_hunks_match_git(tmp_path: Path, algorithm: str) -> None:
+    differing: List[int] = []
+    for seed in range(CASES):
+        old, new = versions(seed)
+        if old == new:
+            continue
+        tmp_path.joinpath("old").write_bytes(old)
+        tmp_path.joinpath("new").write_bytes(new)
+        theirs: bytes = subprocess.run(
+            ["git", "diff", "--no-index", GIT_FLAGS[algorithm], "old", "new"],
+            cwd=tmp_path,
+            capture_output=True,
+        ).stdout
+
+        out: io.BytesIO = io.BytesIO()
+        UnifiedWriter(out, algorithm).write(
+            "file", Side("1" * 40, "100644", old), Side("2" * 40, "100644", new)
+        )
+        if hunks(out.getvalue()) != hunks(theirs):
+            differing.append(seed)
+    assert differing == []
+
+
+def test_indent_heuristic_keeps_blank_line_with_insertion() -> None:
+    # Slid as far down as it goes, the insertion would start with the blank
+    # line; the heuristic has it end with the blank line instead, as Git does
+    diff: Diff = Diff(b"a\n}\n", b"a\n\na\n}\n")
+    assert list(diff.changes()) == [(0, 0, 0, 2)]
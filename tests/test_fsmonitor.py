@@ -0,0 +1,161 @@
+import errno
+import os
+import subprocess
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pytest
+
+from fsmonitor.client import Client
+from fsmonitor.daemon import Daemon
+from fsmonitor.protocol import SOCKET_NAME, TRIVIAL, format_token
+
+
+@pytest.fixture
+def workspace(repo: Path) -> Path:
+    repo.joinpath("a.txt").write_text("a\n")
+    repo.joinpath("lib").mkdir()
+    repo.joinpath("lib", "b.txt").write_text("b\n")
+    return repo
+
+
+@pytest.fixture
+def client(
+    workspace: Path, pyg: Callable[..., subprocess.CompletedProcess]
+) -> Iterator[Client]:
+    """A client of a daemon started on the workspace, stopped afterwards."""
+    pyg(workspace, "fsmonitor", "start")
+    client: Client = Client(workspace.joinpath(".git", SOCKET_NAME))
+    try:
+        yield client
+    finally:
+        client.quit()
+
+
+def changes(client: Client, token: Optional[str]) -> Tuple[str, Optional[List[str]]]:
+    answer = client.query(token)
+    assert answer is not None
+    token, paths = answer
+    return token, None if paths is None else sorted(paths)
+
+
+def test_first_query_is_trivial(client: Client) -> None:
+    token, paths = changes(client, None)
+    assert paths is None
+    assert changes(client, token)[1] == []
+
+
+def test_reports_touched_created_and_deleted_paths(
+    workspace: Path, client: Client
+) -> None:
+    token, _ = changes(client, None)
+
+    os.utime(workspace.joinpath("a.txt"))
+    token, paths = changes(client, token)
+    assert paths == ["a.txt"]
+
+    workspace.joinpath("lib", "c.txt").write_text("c\n")
+    workspace.joinpath("new").mkdir()
+    workspace.joinpath("new", "d.txt").write_text("d\n")
+    token, paths = changes(client, token)
+    assert paths == ["lib/c.txt", "new", "new/d.txt"]
+
+    # A directory created after the daemon started is watched too
+    workspace.joinpath("new", "d.txt").unlink()
+    workspace.joinpath("lib", "b.txt").unlink()
+    token, paths = changes(client, token)
+    assert paths == ["lib/b.txt", "new/d.txt"]
+
+    # Nothing changed since the last token, and .git is never reported
+    workspace.joinpath(".git", "scratch").write_text("")
+    assert changes(client, token)[1] == []
+
+
+def test_tokens_advance_and_stay_valid(workspace: Path, client: Client) -> None:
+    first, _ = changes(client, None)
+    second, _ = changes(client, first)
+    assert second != first
+
+    workspace.joinpath("a.txt").write_text("changed\n")
+    assert changes(client, second)[1] == ["a.txt"]
+    assert changes(client, first)[1] == ["a.txt"]
+
+
+def test_token_of_another_daemon_is_trivial(client: Client) -> None:
+    token, _ = changes(client, None)
+    instance: str = token.split(":")[1]
+    other: str = format_token("0" * len(instance), 1).decode()
+    assert changes(client, other)[1] is None
+
+
+def test_out_of_watches_reports_everything(
+    workspace: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    daemon: Daemon = Daemon(workspace, workspace.joinpath(".git", SOCKET_NAME))
+    add_watch = daemon.inotify.add_watch
+
+    def limited(path: bytes, mask: int) -> int:
+        if path.endswith(b"/lib"):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+        return add_watch(path, mask)
+
+    monkeypatch.setattr(daemon.inotify, "add_watch", limited)
+    try:
+        daemon._watch_tree(b"")
+        token: str = daemon.query("").split(b"\n", 1)[0].decode()
+        workspace.joinpath("a.txt").write_text("changed\n")
+        answer: bytes = daemon.query(token)
+        assert answer.split(b"\n", 1)[1] == TRIVIAL
+    finally:
+        daemon.inotify.close()
+
+
+def test_add_keeps_deleted_paths_dirty(
+    workspace: Path, client: Client, pyg: Callable[..., subprocess.CompletedProcess]
+) -> None:
+    pyg(workspace, "add", ".")
+
+    # Looked at again because the daemon reports it
+    workspace.joinpath("a.txt").unlink()
+    pyg(workspace, "add", ".")
+    assert pyg(workspace, "status").stdout == b" D a.txt\n"
+
+    # Looked at again by a full walk, as the ignore rules changed
+    workspace.joinpath(".gitignore").write_text("*.log\n")
+    workspace.joinpath("lib", "b.txt").unlink()
+    pyg(workspace, "add", ".")
+    assert pyg(workspace, "status").stdout == b" D a.txt\n D lib/b.txt\n"
+
+
+def test_unreadable_directory_is_watched_once_readable(
+    workspace: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    daemon: Daemon = Daemon(workspace, workspace.joinpath(".git", SOCKET_NAME))
+    add_watch = daemon.inotify.add_watch
+    readable: List[bool] = [False]
+
+    def unreadable(path: bytes, mask: int) -> int:
+        if path.endswith(b"/lib") and not readable[0]:
+            raise PermissionError(errno.EACCES, os.strerror(errno.EACCES))
+        return add_watch(path, mask)
+
+    monkeypatch.setattr(daemon.inotify, "add_watch", unreadable)
+    try:
+        daemon._watch_tree(b"")
+        assert "cannot watch 'lib'" in capsys.readouterr().err
+
+        # The rest of the workspace is still watched
+        token: str = daemon.query("").split(b"\n", 1)[0].decode()
+        workspace.joinpath("a.txt").write_text("changed\n")
+        answer: bytes = daemon.query(token)
+        assert answer.split(b"\n", 1)[1] == b"a.txt"
+
+        # A change of permissions reports the directory and watches it
+        token = answer.split(b"\n", 1)[0].decode()
+        readable[0] = True
+        os.chmod(workspace.joinpath("lib"), 0o755)
+        workspace.joinpath("lib", "c.txt").write_text("c\n")
+        paths: List[bytes] = daemon.query(token).split(b"\n", 1)[1].split(b"\0")
+        assert sorted(paths) == [b"lib", b"lib/b.txt", b"lib/c.txt"]
+    finally:
+        daemon.inotify.close()
@@ -0,0 +1,76 @@
+"""
+Check that a loaded index holds at least 5 times less memory in its compact
+columns than in the layout it replaced, a dict of Entry named tuples keyed by
+Path, measured as benchmarks/index_memory.py does.
+"""
+
+import gc
+import tracemalloc
+from hashlib import sha1
+from pathlib import Path
+from typing import Callable, Dict
+
+from index.entry import Entry
+from index.index import Index
+
+ENTRIES = 100_000
+
+# The columns hold about 6 times less, at any number of entries
+MIN_RATIO = 5
+
+
+def generate_index(path: Path, count: int) -> None:
+    """Write an index of count entries spread over a few directory levels."""
+    index: Index = Index(path)
+    for i in range(count):
+        pathname: Path = Path(f"dir{i % 97}/sub{i % 13}/file{i}.txt")
+        oid: str = sha1(str(i).encode()).hexdigest()
+        index.store_entry(
+            Entry(
+                pathname, oid, 0o100644, len(str(pathname)), 0, 0, 0, 0, 0, i, 0, 0, i
+            )
+        )
+    index.write_updates()
+
+
+def legacy_load(path: Path) -> Dict[Path, Entry]:
+    """Load every entry as a named tuple keyed by Path, as Index used to."""
+    data: bytes = path.read_bytes()
+    entries: Dict[Path, Entry] = {}
+    offset: int = Index.HEADER_SIZE
+    for _ in range(Index(path).read_header(bytearray(data))):
+        entry: Entry = Entry.parse(data, offset)
+        entries[entry.pathname] = entry
+        offset += len(bytes(entry))
+    return entries
+
+
+def held(load: Callable[[], object]) -> int:
+    """Return the bytes still allocated by what load returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result: object = load()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def load_columns(path: Path) -> Index:
+    index: Index = Index(path)
+    index.load()
+    return index
+
+
+def test_columns_hold_five_times_less_than_entries(tmp_path: Path) -> None:
+    path: Path = tmp_path.joinpath("index")
+    generate_index(path, ENTRIES)
+
+    assert len(legacy_load(path)) == len(load_columns(path).entries) == ENTRIES
+
+    legacy: int = held(lambda: legacy_load(path))
+    columns: int = held(lambda: load_columns(path))
+    assert legacy >= MIN_RATIO * columns, f"{legacy} bytes against {columns}"
@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import List
+
+from workspace import Workspace
+
+
+def scan(root: Path, path: str) -> List[str]:
+    return list(Workspace(root).scan(root.joinpath(path)))
+
+
+def test_scan_skips_ignored_file_named_outright(repo: Path) -> None:
+    repo.joinpath(".gitignore").write_text("*.log\nbuild/\n")
+    repo.joinpath("a.log").write_text("x\n")
+    repo.joinpath("build").mkdir()
+    repo.joinpath("build", "out.o").write_text("y\n")
+    repo.joinpath("src").mkdir()
+    repo.joinpath("src", ".gitignore").write_text("local.txt\n")
+    repo.joinpath("src", "local.txt").write_text("z\n")
+    repo.joinpath("src", "main.py").write_text("pass\n")
+
+    assert scan(repo, "a.log") == []
+    assert scan(repo, "build/out.o") == []
+    assert scan(repo, "src/local.txt") == []
+    assert scan(repo, "src/main.py") == ["src/main.py"]
+    assert sorted(scan(repo, "src")) == ["src/.gitignore", "src/main.py"]